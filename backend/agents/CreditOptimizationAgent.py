@@ -1,11 +1,12 @@
 from typing import List, Optional, Dict, Any
 import json
 from dotenv import load_dotenv
-import os
 from models.UserProfile import UserProfile
 from models.FinancialGoal import FinancialGoal
 from models.SpendingReport import SpendingReport
-from dedalus_labs import AsyncDedalus
+from services.LLMClient import LLMClient
+from services.PromptContext import prompt_context
+from services.Tracing import span, traced
 
 load_dotenv()
 
@@ -13,50 +14,7 @@ class CreditOptimizationAgent:
     """Credit card recommendations and stack optimization"""
 
     @staticmethod
-    def _build_spending_context(spending_report: Optional[SpendingReport]) -> str:
-        """
-        Build a detailed spending context from the CSV data if available.
-        """
-        if not spending_report:
-            return ""
-        
-        context_parts = [
-            f"\n--- SPENDING DATA FROM BANK STATEMENT ---",
-            f"Period: {spending_report.period}",
-            f"Total Income: ${spending_report.total_income:,.2f}",
-            f"Total Expenses: ${spending_report.total_spending:,.2f}",
-            f"Savings: ${spending_report.total_income - spending_report.total_spending:,.2f}",
-            f"\nSpending by Category:"
-        ]
-        
-        # Sort categories by amount (highest to lowest)
-        sorted_categories = sorted(
-            spending_report.category_breakdown.items(), 
-            key=lambda x: x[1], 
-            reverse=True
-        )
-        
-        for category, amount in sorted_categories:
-            percentage = (amount / spending_report.total_spending * 100) if spending_report.total_spending > 0 else 0
-            context_parts.append(f"  - {category}: ${amount:,.2f} ({percentage:.1f}%)")
-        
-        # Add subscriptions if any
-        if spending_report.subscriptions:
-            context_parts.append(f"\nRecurring Subscriptions ({len(spending_report.subscriptions)}):")
-            for sub in spending_report.subscriptions:
-                context_parts.append(f"  - {sub['name']}: ${sub['amount']:.2f}/{sub.get('frequency', 'monthly')}")
-        
-        # Add insights
-        if spending_report.insights:
-            context_parts.append(f"\nSpending Insights:")
-            for insight in spending_report.insights:
-                context_parts.append(f"  - {insight.title}: {insight.description}")
-        
-        context_parts.append("--- END SPENDING DATA ---\n")
-        
-        return "\n".join(context_parts)
-
-    @staticmethod
+    @traced("CreditOptimizationAgent.extract_current_loadout")
     async def extract_current_loadout(conversation_history: List[Dict]) -> Dict:
         """
         Extract any credit cards mentioned so far in the conversation to build a live loadout.
@@ -89,22 +47,20 @@ class CreditOptimizationAgent:
         messages.append({"role": "user", "content": "Extract the credit cards recommended so far as JSON."})
         
         try:
-            client = AsyncDedalus(api_key=os.environ.get("DEDALUS_API_KEY"))
-            chat_completion = await client.chat.completions.create(
-                model="openai/gpt-4-turbo",
-                messages=messages
-            )
+            chat_completion = await LLMClient.complete("CreditOptimizationAgent", "extract_current_loadout", messages, task="extract")
             ai_content = chat_completion.choices[0].message.content
             
-            try:
-                loadout = json.loads(ai_content)
-            except:
-                import re
-                match = re.search(r'\{.*\}', ai_content, re.DOTALL)
-                if match:
-                    loadout = json.loads(match.group(0))
-                else:
-                    loadout = {"cards": [], "tree_name": None}
+            with span("CreditOptimizationAgent.extract_current_loadout.parse_response") as parse_span:
+                try:
+                    loadout = json.loads(ai_content)
+                except:
+                    import re
+                    parse_span.set("repaired", True)
+                    match = re.search(r'\{.*\}', ai_content, re.DOTALL)
+                    if match:
+                        loadout = json.loads(match.group(0))
+                    else:
+                        loadout = {"cards": [], "tree_name": None}
             
             return loadout
         except Exception as e:
@@ -112,6 +68,7 @@ class CreditOptimizationAgent:
             return {"cards": [], "tree_name": None}
 
     @staticmethod
+    @traced("CreditOptimizationAgent.chat")
     async def chat(
         user_profile: UserProfile,
         goals: List[FinancialGoal],
@@ -204,28 +161,15 @@ class CreditOptimizationAgent:
         if user_message:
             conversation_history.append({"role": "user", "content": user_message})
 
-        # Build context for LLM with spending data if available
-        income = spending_report.total_income if spending_report and spending_report.total_income > 0 else user_profile.annual_income
-        
-        context = (
-            f"User profile: Age {user_profile.age}, Income ${income:,.2f}, Debts: {json.dumps(user_profile.debts)}.\n"
-            f"Goals: {json.dumps([g.dict() for g in goals], default=str)}.\n"
-        )
-        
-        # Add spending data context if available
-        if spending_report:
-            context += CreditOptimizationAgent._build_spending_context(spending_report)
+        # Profile, goals and spending data, cached until one of them changes
+        context = prompt_context.render(user_profile, goals, spending_report)
         
         messages = [
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": context}
         ] + conversation_history
 
-        client = AsyncDedalus(api_key=os.environ.get("DEDALUS_API_KEY"))
-        chat_completion = await client.chat.completions.create(
-            model="openai/gpt-4-turbo",
-            messages=messages
-        )
+        chat_completion = await LLMClient.complete("CreditOptimizationAgent", "chat", messages, task="chat")
         ai_content = chat_completion.choices[0].message.content
         conversation_history.append({"role": "assistant", "content": ai_content})
         
@@ -239,6 +183,7 @@ class CreditOptimizationAgent:
         }
 
     @staticmethod
+    @traced("CreditOptimizationAgent.finalize_stack")
     async def finalize_stack(
         user_profile: UserProfile,
         goals: List[FinancialGoal],
@@ -282,16 +227,9 @@ class CreditOptimizationAgent:
             "The tree_name should be creative and reflect the user's primary spending categories or lifestyle."
         )
         
-        income = spending_report.total_income if spending_report and spending_report.total_income > 0 else user_profile.annual_income
-        
-        context = (
-            f"User profile: Age {user_profile.age}, Income ${income:,.2f}, Debts: {json.dumps(user_profile.debts)}.\n"
-            f"Goals: {json.dumps([g.dict() for g in goals], default=str)}.\n"
-        )
+        context = prompt_context.render(user_profile, goals, spending_report)
         
-        # Add spending data context if available
         if spending_report:
-            context += CreditOptimizationAgent._build_spending_context(spending_report)
             context += (
                 "\nIMPORTANT: Use the actual spending amounts above to calculate realistic reward values. "
                 "For example, if they spend $800/month on Food & Dining, recommend cards with high multipliers "
@@ -304,21 +242,20 @@ class CreditOptimizationAgent:
         ] + conversation_history
         messages.append({"role": "user", "content": "Please return the recommended credit card stack as JSON."})
 
-        client = AsyncDedalus(api_key=os.environ.get("DEDALUS_API_KEY"))
-        chat_completion = await client.chat.completions.create(
-            model="openai/gpt-4-turbo",
-            messages=messages
-        )
+        chat_completion = await LLMClient.complete("CreditOptimizationAgent", "finalize_stack", messages, task="plan")
         ai_content = chat_completion.choices[0].message.content
 
-        try:
-            stack = json.loads(ai_content)
-        except Exception:
-            import re
-            match = re.search(r'\{.*\}', ai_content, re.DOTALL)
-            if match:
-                stack = json.loads(match.group(0))
-            else:
-                raise ValueError("AI response could not be parsed as JSON: " + ai_content)
+        with span("CreditOptimizationAgent.finalize_stack.parse_response") as parse_span:
+            try:
+                stack = json.loads(ai_content)
+            except Exception:
+                import re
+                parse_span.set("repaired", True)
+                match = re.search(r'\{.*\}', ai_content, re.DOTALL)
+                if match:
+                    stack = json.loads(match.group(0))
+                else:
+                    LLMClient.record_failure("CreditOptimizationAgent", "finalize_stack", "invalid_json")
+                    raise ValueError("AI response could not be parsed as JSON: " + ai_content)
 
         return stack
\ No newline at end of file
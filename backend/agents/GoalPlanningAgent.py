@@ -3,10 +3,11 @@ from typing import List, Dict
 from datetime import date
 import json
 from dotenv import load_dotenv
-import os
 from models.UserProfile import UserProfile
 from models.FinancialGoal import FinancialGoal
-from dedalus_labs import AsyncDedalus
+from services.LLMClient import LLMClient
+from services.PromptContext import prompt_context
+from services.Tracing import span, traced
 
 load_dotenv()
 
@@ -14,6 +15,7 @@ class GoalPlanningAgent:
     """Long-term financial goal modeling agent with Financial Planner MCP integration"""
 
     @staticmethod
+    @traced("GoalPlanningAgent.chat")
     async def chat(
         user_profile: UserProfile,
         conversation_history: List[Dict] = None,
@@ -57,17 +59,14 @@ class GoalPlanningAgent:
             conversation_history.append({"role": "user", "content": user_message})
 
         # Build context for LLM
-        context = (
-            f"User profile: Age {user_profile.age}, Income ${user_profile.annual_income:,.2f}, "
-            f"Debts: {json.dumps(user_profile.debts)}.\n"
-        )
+        context = prompt_context.render(user_profile, include_goals=False)
 
         messages = [{"role": "system", "content": system_prompt + "\n\n" + context}] + conversation_history
 
-        client = AsyncDedalus(api_key=os.environ.get("DEDALUS_API_KEY"))
-        chat_completion = await client.chat.completions.create(
-            model="openai/gpt-4-turbo",
-            messages=messages,
+        chat_completion = await LLMClient.complete(
+            "GoalPlanningAgent", "chat",
+            messages,
+            task="chat",
             mcp_servers=["mohanputti/financial-planner-mcp"]
         )
         ai_content = chat_completion.choices[0].message.content
@@ -75,6 +74,7 @@ class GoalPlanningAgent:
         return {"response": ai_content, "conversation_history": conversation_history}
 
     @staticmethod
+    @traced("GoalPlanningAgent.finalize_goals")
     async def finalize_goals(conversation_history: List[Dict]) -> List[FinancialGoal]:
         """
         After gathering info via chat, extract and return a list of FinancialGoal objects.
@@ -94,25 +94,27 @@ class GoalPlanningAgent:
         messages = [{"role": "system", "content": system_prompt}] + conversation_history
         messages.append({"role": "user", "content": "Please return the list of goals as JSON."})
 
-        client = AsyncDedalus(api_key=os.environ.get("DEDALUS_API_KEY"))
-
-        chat_completion = await client.chat.completions.create(
-            model="openai/gpt-4-turbo",
-            messages=messages,
+        chat_completion = await LLMClient.complete(
+            "GoalPlanningAgent", "finalize_goals",
+            messages,
+            task="extract",
             mcp_servers=["mohanputti/financial-planner-mcp"]
         )
 
         ai_content = chat_completion.choices[0].message.content
   
-        try:
-            goals_data = json.loads(ai_content)
-        except Exception:
-            import re
-            match = re.search(r'\[.*\]', ai_content, re.DOTALL)
-            if match:
-                goals_data = json.loads(match.group(0))
-            else:
-                raise ValueError("AI response could not be parsed as JSON: " + ai_content)
+        with span("GoalPlanningAgent.finalize_goals.parse_response") as parse_span:
+            try:
+                goals_data = json.loads(ai_content)
+            except Exception:
+                import re
+                parse_span.set("repaired", True)
+                match = re.search(r'\[.*\]', ai_content, re.DOTALL)
+                if match:
+                    goals_data = json.loads(match.group(0))
+                else:
+                    LLMClient.record_failure("GoalPlanningAgent", "finalize_goals", "invalid_json")
+                    raise ValueError("AI response could not be parsed as JSON: " + ai_content)
 
         goals = []
         for g in goals_data:
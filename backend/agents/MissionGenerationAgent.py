@@ -7,15 +7,20 @@ from models.UserProfile import UserProfile
 from models.FinancialGoal import FinancialGoal
 from models.Mission import Mission
 from models.MissionType import MissionType
-from dedalus_labs import AsyncDedalus
+from services.LLMClient import LLMClient
+from services.Tracing import span, traced
 
 load_dotenv()
 
+# Seconds a request waits for an LLM roadmap before answering with the template roadmap
+ROADMAP_BUDGET_SECONDS = float(os.environ.get('ROADMAP_BUDGET_SECONDS', '8'))
+
 
 class MissionGenerationAgent:
     """Generate a complete roadmap of missions to achieve long-term financial goals"""
 
     @staticmethod
+    @traced("MissionGenerationAgent.generate_mission_roadmap")
     async def generate_mission_roadmap(
         user_profile: UserProfile,
         goal: FinancialGoal,
@@ -32,30 +37,8 @@ class MissionGenerationAgent:
             List of Mission objects forming a complete roadmap
         """
         
-        current_date = datetime.now().date()
-        target_date = goal.target_date if isinstance(goal.target_date, date) else date.fromisoformat(str(goal.target_date))
-        
-        # Calculate the time span
-        days_until_goal = (target_date - current_date).days
-        if days_until_goal <= 0:
-            days_until_goal = 30  # Default to 30 days if goal is past or today
-        
-        # Determine mission frequency based on goal timeline
-        if days_until_goal <= 90:
-            mission_interval_days = 7  # Weekly for medium-term goals
-            num_missions = min(12, days_until_goal // 7)
-        elif days_until_goal <= 365:
-            mission_interval_days = 14  # Bi-weekly for longer goals
-            num_missions = min(20, days_until_goal // 14)
-        elif days_until_goal <= 720:
-            mission_interval_days = 30  # Monthly for 2-year goals
-            num_missions = min(24, days_until_goal // 30)
-        else:
-            mission_interval_days = 180  #
-            num_missions = min(24, days_until_goal // 180)
-        
-        num_missions = max(3, num_missions)  # At least 3 missions
-        num_missions = min(12, num_missions) # At most 12
+        current_date, days_until_goal, mission_interval_days, num_missions = \
+            MissionGenerationAgent._roadmap_schedule(goal)
         
         # Calculate monthly savings needed
         months_until_goal = max(1, days_until_goal / 30)
@@ -78,7 +61,7 @@ GOAL DETAILS:
 - Target Amount: ${goal.target_amount:,.0f}
 - Current Progress: ${current_amount:,.0f}
 - Remaining: ${remaining_amount:,.0f}
-- Target Date: {target_date}
+- Target Date: {goal.target_date}
 - Days Until Goal: {days_until_goal}
 - Estimated Monthly Savings Needed: ${monthly_savings_needed:,.0f}
 - Priority: {goal.priority}
@@ -124,27 +107,33 @@ Order missions chronologically with days_from_start indicating when each mission
             {"role": "user", "content": f"Generate a complete mission roadmap for achieving the goal: {goal.title}"}
         ]
 
-        client = AsyncDedalus(api_key=os.environ.get("DEDALUS_API_KEY"))
-        chat_completion = await client.chat.completions.create(
-            model="openai/gpt-4-turbo",
-            messages=messages
-        )
+        try:
+            chat_completion = await LLMClient.complete("MissionGenerationAgent", "generate_mission_roadmap", messages, task="plan")
+        except Exception as e:
+            # Breaker open, out of time or every model in the chain failed: a template roadmap beats no roadmap
+            print(f"Roadmap generation unavailable ({type(e).__name__}), using fallback missions")
+            return MissionGenerationAgent._generate_fallback_missions(
+                user_profile, goal, current_date, num_missions, mission_interval_days
+            )
         
         ai_content = chat_completion.choices[0].message.content
         
         # Parse the JSON response
-        try:
-            missions_data = json.loads(ai_content)
-        except json.JSONDecodeError:
-            import re
-            match = re.search(r'\[.*\]', ai_content, re.DOTALL)
-            if match:
-                missions_data = json.loads(match.group(0))
-            else:
-                # Fallback to basic missions if parsing fails
-                return MissionGenerationAgent._generate_fallback_missions(
-                    user_profile, goal, current_date, num_missions, mission_interval_days
-                )
+        with span("MissionGenerationAgent.generate_mission_roadmap.parse_response") as parse_span:
+            try:
+                missions_data = json.loads(ai_content)
+            except json.JSONDecodeError:
+                import re
+                parse_span.set("repaired", True)
+                match = re.search(r'\[.*\]', ai_content, re.DOTALL)
+                if match:
+                    missions_data = json.loads(match.group(0))
+                else:
+                    # Fallback to basic missions if parsing fails
+                    LLMClient.record_failure("MissionGenerationAgent", "generate_mission_roadmap", "invalid_json")
+                    return MissionGenerationAgent._generate_fallback_missions(
+                        user_profile, goal, current_date, num_missions, mission_interval_days
+                    )
         
         # Convert to Mission objects
         missions = []
@@ -158,7 +147,9 @@ Order missions chronologically with days_from_start indicating when each mission
             mission_type_map = {
                 "SAVINGS": MissionType.SAVINGS,
                 "SPENDING": MissionType.SPENDING,
+                "SPENDING_REDUCTION": MissionType.SPENDING_REDUCTION,
                 "LEARNING": MissionType.LEARNING,
+                "CHALLENGE": MissionType.CHALLENGE,
                 "INVESTMENT": MissionType.INVESTMENT,
                 "DEBT": MissionType.DEBT
             }
@@ -178,6 +169,62 @@ Order missions chronologically with days_from_start indicating when each mission
         
         return missions
 
+    @staticmethod
+    def _roadmap_schedule(goal: FinancialGoal):
+        """Start date, days until the goal, days between missions and number of missions for a roadmap"""
+        current_date = datetime.now().date()
+        target_date = goal.target_date if isinstance(goal.target_date, date) else date.fromisoformat(str(goal.target_date))
+    
+        # Calculate the time span
+        days_until_goal = (target_date - current_date).days
+        if days_until_goal <= 0:
+            days_until_goal = 30  # Default to 30 days if goal is past or today
+    
+        # Determine mission frequency based on goal timeline
+        if days_until_goal <= 90:
+            mission_interval_days = 7  # Weekly for medium-term goals
+            num_missions = min(12, days_until_goal // 7)
+        elif days_until_goal <= 365:
+            mission_interval_days = 14  # Bi-weekly for longer goals
+            num_missions = min(20, days_until_goal // 14)
+        elif days_until_goal <= 720:
+            mission_interval_days = 30  # Monthly for 2-year goals
+            num_missions = min(24, days_until_goal // 30)
+        else:
+            mission_interval_days = 180  #
+            num_missions = min(24, days_until_goal // 180)
+    
+        num_missions = max(3, num_missions)  # At least 3 missions
+        num_missions = min(12, num_missions) # At most 12
+        
+        return current_date, days_until_goal, mission_interval_days, num_missions
+
+    @staticmethod
+    def generate_fallback_roadmap(user_profile: UserProfile, goal: FinancialGoal) -> List[Mission]:
+        """The template roadmap on the same schedule as generate_mission_roadmap, without calling the LLM"""
+        current_date, _, mission_interval_days, num_missions = MissionGenerationAgent._roadmap_schedule(goal)
+        return MissionGenerationAgent._generate_fallback_missions(
+            user_profile, goal, current_date, num_missions, mission_interval_days
+        )
+
+    @staticmethod
+    def merge_roadmap(previous: List[Mission], generated: List[Mission]) -> List[Mission]:
+        """
+        Replace a provisional roadmap with a newly generated one, position by
+        position. Missions the user already finished (completed or failed)
+        are kept as they are; the rest take the new content under the old
+        mission_id so links and scheduled deadlines stay valid.
+        """
+        merged = []
+        for i in range(max(len(previous), len(generated))):
+            old = previous[i] if i < len(previous) else None
+            new = generated[i] if i < len(generated) else None
+            if old is not None and old.status != "active":
+                merged.append(old)
+            elif new is not None:
+                merged.append(new.model_copy(update={"mission_id": old.mission_id}) if old is not None else new)
+        return merged
+
     @staticmethod
     def _generate_fallback_missions(
         user_profile: UserProfile,
@@ -256,11 +303,7 @@ Return a JSON array with 2 missions:
                 {"role": "user", "content": "Generate 2 missions for this week."}
             ]
 
-            client = AsyncDedalus(api_key=os.environ.get("DEDALUS_API_KEY"))
-            chat_completion = await client.chat.completions.create(
-                model="openai/gpt-4-turbo",
-                messages=messages
-            )
+            chat_completion = await LLMClient.complete("MissionGenerationAgent", "generate_weekly_missions", messages, task="plan")
             
             ai_content = chat_completion.choices[0].message.content
             
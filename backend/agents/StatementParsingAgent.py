@@ -1,19 +1,40 @@
 
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 import json
 from dotenv import load_dotenv
 import os
 import csv
 import io
+import itertools
+import asyncio
 import boto3
 from botocore.exceptions import BotoCoreError, ClientError, NoCredentialsError
 from models.Transaction import Transaction
 from models.SpendingReport import SpendingReport
 from models.SpendingInsight import SpendingInsight
-from dedalus_labs import AsyncDedalus
+from services.RecurringChargeDetector import RecurringChargeDetector
+from services.BankProfile import CsvSchema
+from services.PdfStatementExtractor import PdfStatementExtractor
+from services.CompressedUpload import CompressedUpload
+from services.LLMClient import LLMClient
+from services.Metrics import COMPREHEND_SECONDS, COMPREHEND_DOCUMENTS, timed
+from services.Resilience import Resilience, CircuitOpenError, DeadlineExceeded
+from services.MerchantClassifier import merchant_classifier
+from services.MerchantResolver import merchant_resolvers
+from services.TransferMatcher import TransferMatcher, TRANSFER_WINDOW_DAYS
+from services.Tracing import span, traced
 
 load_dotenv()
 
+VALID_CATEGORIES = ['Food & Dining', 'Transportation', 'Housing', 'Utilities', 
+                    'Entertainment', 'Shopping', 'Health & Medical', 'Travel', 'Other']
+
+# PDF pages sent to the LLM per request, and how many requests run at once
+PDF_PAGES_PER_CHUNK = int(os.environ.get('PDF_PAGES_PER_CHUNK', '2'))
+PDF_CHUNK_CONCURRENCY = int(os.environ.get('PDF_CHUNK_CONCURRENCY', '4'))
+# Seconds allowed for one Comprehend batch call before it counts against the breaker
+COMPREHEND_TIMEOUT_SECONDS = float(os.environ.get('COMPREHEND_TIMEOUT_SECONDS', '10'))
+
 # Initialize AWS Comprehend client
 comprehend_client = None
 try:
@@ -61,11 +82,11 @@ class StatementParsingAgent:
             return None  # Return None to trigger fallback
     
     @staticmethod
-    def _batch_analyze_with_comprehend(texts: list) -> list | None:
+    async def _batch_analyze_with_comprehend(texts: list) -> list | None:
         """
         Batch analyze multiple transaction descriptions with AWS Comprehend.
         More efficient for processing many transactions.
-        Returns None if Comprehend is not available or fails.
+        Returns None if Comprehend is not available, its breaker is open or it fails.
         """
         if not texts:
             return []
@@ -81,17 +102,23 @@ class StatementParsingAgent:
             for i in range(0, len(texts), batch_size):
                 batch = texts[i:i + batch_size]
                 
+                COMPREHEND_DOCUMENTS.inc(amount=len(batch))
+                
                 # Batch detect entities
-                entities_response = comprehend_client.batch_detect_entities(
-                    TextList=batch,
-                    LanguageCode='en'
-                )
+                with timed(COMPREHEND_SECONDS, 'batch_detect_entities'):
+                    entities_response = await Resilience.call_sync(
+                        "comprehend", "batch_detect_entities",
+                        lambda: comprehend_client.batch_detect_entities(TextList=batch, LanguageCode='en'),
+                        timeout=COMPREHEND_TIMEOUT_SECONDS
+                    )
                 
                 # Batch detect key phrases
-                key_phrases_response = comprehend_client.batch_detect_key_phrases(
-                    TextList=batch,
-                    LanguageCode='en'
-                )
+                with timed(COMPREHEND_SECONDS, 'batch_detect_key_phrases'):
+                    key_phrases_response = await Resilience.call_sync(
+                        "comprehend", "batch_detect_key_phrases",
+                        lambda: comprehend_client.batch_detect_key_phrases(TextList=batch, LanguageCode='en'),
+                        timeout=COMPREHEND_TIMEOUT_SECONDS
+                    )
                 
                 for j, (entity_result, kp_result) in enumerate(zip(
                     entities_response.get("ResultList", []),
@@ -103,6 +130,8 @@ class StatementParsingAgent:
                     })
             
             return results
+        except CircuitOpenError:
+            return None  # Comprehend has been failing, go straight to the fallback
         except (BotoCoreError, ClientError, NoCredentialsError) as e:
             print(f"AWS Comprehend batch error: {e}")
             return None  # Return None to trigger fallback
@@ -178,128 +207,323 @@ class StatementParsingAgent:
         return 'Other'
     
     @staticmethod
-    async def parse_csv_statement(file_content: bytes, user_id: str) -> SpendingReport:
-        """Parse CSV bank statement with AWS Comprehend enhancement"""
-        # Decode bytes to string
-        csv_string = file_content.decode('utf-8')
-        csv_reader = csv.DictReader(io.StringIO(csv_string))
+    def _read_csv_rows(lines) -> list:
+        """
+        Read transaction rows from any iterable of CSV text lines.
+        The bank profile (columns, date format, sign convention) is detected once
+        from the header and a sample of rows, then every row goes through the
+        same pre-bound parser.
+        """
+        csv_reader = csv.reader(lines)
+        header = next(csv_reader, None)
+        if not header:
+            return []
+        sample = list(itertools.islice(csv_reader, CsvSchema.SAMPLE_SIZE))
+        schema = CsvSchema.detect(header, sample)
+        parse_row = schema.bind()
+        width = schema.width
+        print(f"Detected CSV profile '{schema.profile}' with date format {schema.date_format}")
         
-        # First pass: collect all rows
+        first_rows = [header] + sample if schema.headerless else sample
         raw_rows = []
-        for row in csv_reader:
-            date_str = row.get('Date') or row.get('date') or row.get('Transaction Date')
-            description = row.get('Description') or row.get('description') or row.get('Memo')
-            amount_str = row.get('Amount') or row.get('amount') or row.get('Debit') or row.get('Credit')
-            category = row.get('Category') or row.get('category') or ''
-            
-            if not date_str or not amount_str:
+        skipped = 0
+        for row in itertools.chain(first_rows, csv_reader):
+            if len(row) < width:
+                continue  # Blank line or footer
+            try:
+                tx_date, description, amount, category = parse_row(row)
+            except ValueError:
+                skipped += 1
                 continue
-            
             raw_rows.append({
-                'date_str': date_str,
-                'description': description or '',
-                'amount_str': amount_str,
+                'date': tx_date,
+                'description': description,
+                'amount': amount,
                 'category': category
             })
         
-        # Use AWS Comprehend to batch analyze all descriptions that need categorization
-        descriptions_to_analyze = [
+        if skipped:
+            print(f"Skipped {skipped} CSV rows with unparseable dates or amounts")
+        return raw_rows
+    
+    @staticmethod
+    @traced("StatementParsingAgent.parse_csv_statement")
+    async def parse_csv_statement(file_content: bytes, user_id: str) -> SpendingReport:
+        """Parse CSV bank statement, plain or compressed, with AWS Comprehend enhancement"""
+        raw_rows = await StatementParsingAgent._read_csv_stream(CompressedUpload.open(file_content), file_content)
+        return await StatementParsingAgent._build_report(raw_rows, user_id)
+    
+    @staticmethod
+    async def _read_csv_stream(stream, file_content: bytes) -> list:
+        """
+        Parse CSV rows from a binary stream of the upload. Text is decoded
+        incrementally, so a compressed upload is never inflated into memory
+        as a whole.
+        """
+        with span("StatementParsingAgent.read_csv", bytes=len(file_content),
+                  compression=CompressedUpload.detect(file_content) or "none") as read_span:
+            text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+            # Parsing is CPU-bound, so files read in worker threads overlap with the PDF and LLM work
+            raw_rows = await asyncio.to_thread(StatementParsingAgent._read_csv_rows, text)
+            read_span.set("rows", len(raw_rows))
+        return raw_rows
+    
+    @staticmethod
+    async def _build_report(raw_rows: list, user_id: str) -> SpendingReport:
+        """Categorize parsed rows and build the full SpendingReport"""
+        transactions = await StatementParsingAgent._categorize_rows(raw_rows, user_id)
+        report = SpendingReport(
+            user_id=user_id,
+            report_id=f"report_{datetime.now().timestamp()}",
+            period=f"{datetime.now().date()}",
+            total_spending=0.0
+        )
+        await StatementParsingAgent._apply_transactions(report, transactions)
+        return report
+    
+    @staticmethod
+    @traced("StatementParsingAgent.merge_statements")
+    async def merge_statements(report: SpendingReport, files: list) -> int:
+        """Merge several (account, file content) statements into an existing report. Returns the number added."""
+        raw_rows = await StatementParsingAgent._read_files(files)
+        return await StatementParsingAgent.merge_rows(report, raw_rows)
+    
+    @staticmethod
+    async def merge_rows(report: SpendingReport, raw_rows: list) -> int:
+        """Merge parsed rows into an existing report, skipping overlaps. Returns the number added."""
+        if report.transactions and not report.fingerprints:
+            StatementParsingAgent._rebuild_merge_state(report)
+        # Fingerprints are counted, so two identical purchases on the same day
+        # survive as long as the upload really contains both
+        seen_in_upload = {}
+        new_rows = []
+        for row in raw_rows:
+            fingerprint = StatementParsingAgent._fingerprint(row['date'], row['amount'], row['description'])
+            seen_in_upload[fingerprint] = seen_in_upload.get(fingerprint, 0) + 1
+            if seen_in_upload[fingerprint] > report.fingerprints.get(fingerprint, 0):
+                new_rows.append(row)
+        
+        transactions = await StatementParsingAgent._categorize_rows(new_rows, report.user_id)
+        await StatementParsingAgent._apply_transactions(report, transactions)
+        return len(transactions)
+    
+    @staticmethod
+    def _rebuild_merge_state(report: SpendingReport):
+        """Recompute the fingerprints and merchant groups a report loaded from disk does not carry"""
+        for transaction in report.transactions:
+            fingerprint = StatementParsingAgent._fingerprint(transaction.date, transaction.amount, transaction.description)
+            report.fingerprints[fingerprint] = report.fingerprints.get(fingerprint, 0) + 1
+            if transaction.amount <= 0 and not transaction.is_transfer:
+                merchant = RecurringChargeDetector.merchant_key(transaction)
+                report.merchant_groups.setdefault(merchant, []).append(transaction)
+    
+    @staticmethod
+    def _fingerprint(tx_date: date, amount: float, description: str) -> str:
+        """Identity of a transaction across overlapping statement exports"""
+        return f"{tx_date.isoformat()}|{round(amount * 100)}|{' '.join(description.lower().split())}"
+    
+    @staticmethod
+    @traced("StatementParsingAgent._categorize_rows")
+    async def _categorize_rows(raw_rows: list, user_id: str) -> list:
+        """
+        Turn parsed rows into categorized Transactions. Rows without a category
+        go to the local merchant classifier first; only the ones it is unsure
+        about are sent to Comprehend or Dedalus.
+        """
+        uncategorized = [
             row['description'] for row in raw_rows 
             if not row['category'] or row['category'] == 'Other'
         ]
         
-        # Batch analyze with Comprehend (returns None if unavailable)
+        # Confident local predictions, keyed by description
+        local_categories = {}
+        if uncategorized:
+            await merchant_classifier.load()
+            with span("StatementParsingAgent.classify_local", documents=len(uncategorized)) as classify_span:
+                for description, prediction in zip(uncategorized, merchant_classifier.classify(uncategorized)):
+                    if prediction is not None:
+                        local_categories[description] = prediction.category
+                classify_span.set("confident", len(local_categories))
+        descriptions_to_analyze = [d for d in uncategorized if d not in local_categories]
+        
+        # Batch analyze the rest with Comprehend (returns None if unavailable)
         comprehend_results = None
         use_comprehend = False
         if descriptions_to_analyze:
-            comprehend_results = StatementParsingAgent._batch_analyze_with_comprehend(descriptions_to_analyze)
-            use_comprehend = comprehend_results is not None
+            with span("StatementParsingAgent.comprehend", documents=len(descriptions_to_analyze)) as comprehend_span:
+                comprehend_results = await StatementParsingAgent._batch_analyze_with_comprehend(descriptions_to_analyze)
+                use_comprehend = comprehend_results is not None
+                comprehend_span.set("available", use_comprehend)
         
+        # With every categorize model's breaker open, use the local rules instead of queueing doomed calls
+        use_dedalus = LLMClient.available("categorize")
         if not use_comprehend and descriptions_to_analyze:
-            print("Falling back to Dedalus for transaction categorization")
+            print("Falling back to Dedalus for transaction categorization" if use_dedalus
+                  else "Dedalus unavailable, using rule-based transaction categorization")
+        
+        # Canonical merchant per row, clustered with the merchants seen in the user's earlier uploads
+        with span("StatementParsingAgent.resolve_merchants", rows=len(raw_rows)):
+            merchants = merchant_resolvers.for_user(user_id).resolve_many([row['description'] for row in raw_rows])
         
         # Build transactions with Comprehend-enhanced or Dedalus categorization
         transactions = []
-        total_income = 0.0
-        total_expenses = 0.0
-        categories = {}
         comprehend_idx = 0
         
-        for row in raw_rows:
-            # Parse date
-            try:
-                tx_date = datetime.strptime(row['date_str'], '%Y-%m-%d').date()
-            except:
-                try:
-                    tx_date = datetime.strptime(row['date_str'], '%m/%d/%Y').date()
-                except:
-                    tx_date = datetime.now().date()
-            
-            # Parse amount
-            amount = float(row['amount_str'].replace('$', '').replace(',', '').strip())
-            
+        for row, merchant in zip(raw_rows, merchants):
             # Determine category
             category = row['category']
             if not category or category == 'Other':
-                if use_comprehend and comprehend_idx < len(comprehend_results):
+                if row['description'] in local_categories:
+                    category = local_categories[row['description']]
+                elif use_comprehend and comprehend_idx < len(comprehend_results):
                     # Use Comprehend result for categorization
                     category = StatementParsingAgent._categorize_from_comprehend(
                         comprehend_results[comprehend_idx], 
                         row['description']
                     )
                     comprehend_idx += 1
-                else:
+                elif use_dedalus:
                     # Fall back to Dedalus-based categorization
                     category = await StatementParsingAgent._categorize_transaction_with_dedalus(row['description'])
+                else:
+                    category = await StatementParsingAgent._categorize_transaction(row['description'])
             
             transactions.append(Transaction(
-                date=tx_date,
+                date=row['date'],
                 description=row['description'],
-                amount=amount,
-                category=category
+                amount=row['amount'],
+                category=category,
+                merchant=merchant,
+                account=row.get('account')
             ))
+        
+        # One write per upload for the labels the LLM produced above
+        await merchant_classifier.flush_labels()
+        return transactions
+    
+    @staticmethod
+    @traced("StatementParsingAgent._apply_transactions")
+    async def _apply_transactions(report: SpendingReport, transactions: list):
+        """
+        Fold new transactions into a report's aggregates in place.
+        Totals and the category breakdown are updated from the delta, and only
+        the merchants it touches are re-run through recurring charge detection.
+        Transfers between the user's accounts are matched first and left out
+        of every aggregate.
+        """
+        if not transactions:
+            return
+        
+        touched_merchants = set()
+        if any(t.account for t in transactions):
+            # Both sides of a transfer may be new, or the other side may be in an earlier upload
+            window = timedelta(days=TRANSFER_WINDOW_DAYS)
+            first = min(t.date for t in transactions) - window
+            last = max(t.date for t in transactions) + window
+            existing = [
+                t for t in report.transactions
+                if t.account and not t.is_transfer and first <= t.date <= last
+            ]
+            with span("StatementParsingAgent.match_transfers", candidates=len(existing) + len(transactions)) as match_span:
+                pairs = TransferMatcher.match(existing + transactions)
+                match_span.set("transfers", len(pairs))
+            matched = [t for t in existing if t.is_transfer]
+            report.transfer_count += len(matched)
+            touched_merchants |= StatementParsingAgent._exclude_transfers(report, matched)
+        
+        for transaction in transactions:
+            amount = transaction.amount
+            category = transaction.category
+            
+            fingerprint = StatementParsingAgent._fingerprint(transaction.date, amount, transaction.description)
+            report.fingerprints[fingerprint] = report.fingerprints.get(fingerprint, 0) + 1
+            if transaction.is_transfer:
+                report.transfer_count += 1
+                continue
             
             # Track income vs expenses
             if amount > 0:
-                total_income += amount
+                report.total_income += amount
             else:
-                total_expenses += abs(amount)
-                
+                report.total_spending += abs(amount)
+                merchant = RecurringChargeDetector.merchant_key(transaction)
+                report.merchant_groups.setdefault(merchant, []).append(transaction)
+                touched_merchants.add(merchant)
+            
             # Aggregate by category
-            if category not in categories:
-                categories[category] = 0
-            categories[category] += abs(amount)
+            if category not in report.category_breakdown:
+                report.category_breakdown[category] = 0
+            report.category_breakdown[category] += abs(amount)
+        
+        report.transactions.extend(transactions)
+        report.rollup.add(transactions)
+        
+        start = min(t.date for t in transactions)
+        end = max(t.date for t in transactions)
+        report.period_start = min(start, report.period_start) if report.period_start else start
+        report.period_end = max(end, report.period_end) if report.period_end else end
+        report.period = f"{report.period_start} to {report.period_end}"
+        
+        # Re-detect recurring charges only for merchants with new charges
+        with span("StatementParsingAgent.detect_recurring", merchants=len(touched_merchants)):
+            subscriptions, repeat_purchases = RecurringChargeDetector.detect_groups(
+                {merchant: report.merchant_groups[merchant] for merchant in touched_merchants
+                 if merchant in report.merchant_groups}
+            )
+        report.subscriptions = sorted(
+            [s for s in report.subscriptions if s.get("merchant") not in touched_merchants] + subscriptions,
+            key=lambda s: s["monthly_amount"], reverse=True
+        )
+        report.repeat_purchases = sorted(
+            [r for r in report.repeat_purchases if r.get("merchant") not in touched_merchants] + repeat_purchases,
+            key=lambda r: r["total"], reverse=True
+        )
         
         # Generate insights
-        insights = await StatementParsingAgent._generate_insights(
-            transactions, categories, total_expenses
+        report.insights = await StatementParsingAgent._generate_insights(
+            report.transactions, report.category_breakdown, report.total_spending, report.subscriptions
         )
         
         # Calculate optimization score
-        optimization_score = StatementParsingAgent._calculate_optimization_score(
-            total_income, total_expenses, len(insights)
+        report.optimization_score = StatementParsingAgent._calculate_optimization_score(
+            report.total_income, report.total_spending, len(report.insights)
         )
+    
+    @staticmethod
+    def _exclude_transfers(report: SpendingReport, transactions: list) -> set:
+        """
+        Take transactions already folded into the report back out of its
+        aggregates once they are matched as transfers.
         
-        return SpendingReport(
-            user_id=user_id,
-            report_id=f"report_{datetime.now().timestamp()}",
-            period=f"{min(t.date for t in transactions)} to {max(t.date for t in transactions)}" if transactions else f"{datetime.now().date()}",
-            total_spending=total_expenses,
-            total_income=total_income,
-            category_breakdown=categories,
-            subscriptions=StatementParsingAgent._extract_subscriptions(transactions),
-            repeat_purchases=[],
-            insights=insights,
-            optimization_score=optimization_score,
-            transactions=transactions
-        )
+        Returns:
+            Merchant keys whose groups changed
+        """
+        touched_merchants = set()
+        for transaction in transactions:
+            amount = transaction.amount
+            if amount > 0:
+                report.total_income -= amount
+            else:
+                report.total_spending -= abs(amount)
+                merchant = RecurringChargeDetector.merchant_key(transaction)
+                group = [t for t in report.merchant_groups.get(merchant, []) if t is not transaction]
+                if group:
+                    report.merchant_groups[merchant] = group
+                else:
+                    report.merchant_groups.pop(merchant, None)
+                touched_merchants.add(merchant)
+            remaining = report.category_breakdown.get(transaction.category, 0) - abs(amount)
+            if remaining > 0.005:
+                report.category_breakdown[transaction.category] = remaining
+            else:
+                report.category_breakdown.pop(transaction.category, None)
+        report.rollup.remove(transactions)
+        return touched_merchants
     
     @staticmethod
     async def _categorize_transaction_with_dedalus(description: str) -> str:
         """Use Dedalus LLM to categorize a transaction based on description"""
         try:
-            client = AsyncDedalus(api_key=os.environ.get("DEDALUS_API_KEY"))
-            
             prompt = (
                 f"Categorize this bank transaction into ONE of these categories: "
                 f"Food & Dining, Transportation, Housing, Utilities, Entertainment, Shopping, Health & Medical, Travel, Other.\n\n"
@@ -307,28 +531,27 @@ class StatementParsingAgent:
                 f"Respond with ONLY the category name, nothing else."
             )
             
-            chat_completion = await client.chat.completions.create(
-                model="openai/gpt-4-turbo",
+            chat_completion = await LLMClient.complete(
+                "StatementParsingAgent", "_categorize_transaction_with_dedalus", task="categorize",
                 messages=[
                     {"role": "system", "content": "You are a financial transaction categorizer. Respond with only the category name."},
                     {"role": "user", "content": prompt}
-                ]
+                ],
+                max_tokens=10  # A category name is a few tokens, don't let the model ramble
             )
             
             category = chat_completion.choices[0].message.content.strip()
             
-            # Validate the category
-            valid_categories = ['Food & Dining', 'Transportation', 'Housing', 'Utilities', 
-                              'Entertainment', 'Shopping', 'Health & Medical', 'Travel', 'Other']
-            if category in valid_categories:
-                return category
-            
-            # Try to match partial category names
-            for valid_cat in valid_categories:
-                if valid_cat.lower() in category.lower() or category.lower() in valid_cat.lower():
-                    return valid_cat
-            
-            return 'Other'
+            # Validate the category, trying partial names too
+            matched = category if category in VALID_CATEGORIES else next(
+                (valid_cat for valid_cat in VALID_CATEGORIES
+                 if valid_cat.lower() in category.lower() or category.lower() in valid_cat.lower()),
+                'Other'
+            )
+            if matched != 'Other':
+                # Training data for the local classifier
+                merchant_classifier.record_label(description, matched, "llm")
+            return matched
         except Exception as e:
             print(f"Dedalus categorization error: {e}")
             # Fall back to simple rule-based categorization
@@ -358,40 +581,14 @@ class StatementParsingAgent:
             return 'Other'
     
     @staticmethod
-    def _extract_subscriptions(transactions: list) -> list:
-        """Extract recurring subscriptions from transactions"""
-        subscriptions = []
-        subscription_keywords = ['netflix', 'spotify', 'hulu', 'amazon prime', 'disney', 
-                                'apple music', 'youtube premium', 'gym', 'membership']
-        
-        for transaction in transactions:
-            desc_lower = transaction.description.lower()
-            if any(keyword in desc_lower for keyword in subscription_keywords):
-                subscriptions.append({
-                    "name": transaction.description,
-                    "amount": abs(transaction.amount),
-                    "frequency": "monthly"
-                })
-        
-        # Remove duplicates
-        seen = set()
-        unique_subscriptions = []
-        for sub in subscriptions:
-            if sub["name"] not in seen:
-                seen.add(sub["name"])
-                unique_subscriptions.append(sub)
-        
-        return unique_subscriptions
-    
-    @staticmethod
-    async def _generate_insights(transactions: list, categories: dict, total_expenses: float) -> list:
-        """Generate spending insights"""
+    @traced("StatementParsingAgent._generate_insights")
+    async def _generate_insights(transactions: list, categories: dict, total_expenses: float, subscriptions: list) -> list:
+        """Generate spending insights from the report aggregates and detected subscriptions"""
         insights = []
         
         # Subscription insight
-        subscriptions = StatementParsingAgent._extract_subscriptions(transactions)
         if len(subscriptions) > 3:
-            total_sub = sum(s["amount"] for s in subscriptions)
+            total_sub = sum(s.get("monthly_amount", s["amount"]) for s in subscriptions)
             insights.append(SpendingInsight(
                 category="subscriptions",
                 insight_type="opportunity",
@@ -454,104 +651,153 @@ class StatementParsingAgent:
         return max(base_score - penalty, 0)
     
     @staticmethod
+    @traced("StatementParsingAgent.parse_statement")
     async def parse_statement(file_content: bytes, user_id: str) -> SpendingReport:
-        """Original PDF parsing method - kept for backward compatibility"""
+        """
+        Parse a PDF bank statement.
+        Pages are extracted and parsed locally first; only pages that do not
+        parse deterministically go to the LLM, as concurrent page chunks. The
+        merged rows then go through the same categorization and insight stages
+        as the CSV path.
+        """
+        raw_rows = await StatementParsingAgent._read_pdf_rows(file_content)
+        return await StatementParsingAgent._build_report(raw_rows, user_id)
+    
+    @staticmethod
+    def _is_pdf(file_content: bytes) -> bool:
+        return file_content[:5] == b'%PDF-'
+    
+    @staticmethod
+    @traced("StatementParsingAgent.parse_statement_files")
+    async def parse_statement_files(files: list, user_id: str) -> SpendingReport:
+        """
+        Parse statements from several accounts into one report.
+        
+        Args:
+            files: (account, file content) pairs, one per statement
+        """
+        raw_rows = await StatementParsingAgent._read_files(files)
+        return await StatementParsingAgent._build_report(raw_rows, user_id)
+    
+    @staticmethod
+    async def _read_rows(file_content: bytes, account: str = None) -> list:
+        """Rows from one CSV or PDF statement, each tagged with the account it came from"""
+        stream = CompressedUpload.open(file_content)
+        if StatementParsingAgent._is_pdf(stream.peek(5)):
+            # pypdf needs the whole document, so a compressed PDF is inflated here
+            pdf_content = file_content if StatementParsingAgent._is_pdf(file_content) else stream.read()
+            raw_rows = await StatementParsingAgent._read_pdf_rows(pdf_content)
+        else:
+            raw_rows = await StatementParsingAgent._read_csv_stream(stream, file_content)
+        if account:
+            for row in raw_rows:
+                row['account'] = account
+        return raw_rows
+    
+    @staticmethod
+    async def _read_files(files: list) -> list:
+        """Read (account, file content) statements concurrently and combine their rows in date order"""
+        results = await asyncio.gather(
+            *(StatementParsingAgent._read_rows(content, account) for account, content in files)
+        )
+        raw_rows = [row for rows in results for row in rows]
+        raw_rows.sort(key=lambda row: row['date'])
+        return raw_rows
+    
+    @staticmethod
+    @traced("StatementParsingAgent._read_pdf_rows")
+    async def _read_pdf_rows(file_content: bytes) -> list:
+        """Extract transaction rows from a PDF, locally where possible and with the LLM per page chunk otherwise"""
+        if not PdfStatementExtractor.available():
+            print("pypdf not installed, sending the whole PDF to Dedalus")
+            return await StatementParsingAgent._extract_chunk_with_dedalus(file_bytes=file_content)
+        
+        with span("StatementParsingAgent.extract_pdf_pages", bytes=len(file_content)) as extract_span:
+            pages = PdfStatementExtractor.extract_pages(file_content)
+            extract_span.set("pages", len(pages))
+        raw_rows = [row for page in pages for row in page.rows]
+        chunks = PdfStatementExtractor.page_chunks(pages, PDF_PAGES_PER_CHUNK)
+        print(f"PDF has {len(pages)} pages, {len(pages) - sum(len(c) for c in chunks)} parsed locally, "
+              f"{len(chunks)} chunks sent to Dedalus")
+        
+        semaphore = asyncio.Semaphore(PDF_CHUNK_CONCURRENCY)
+        
+        async def extract_chunk(chunk):
+            async with semaphore:
+                if not chunk[0].scanned:
+                    text = "\n\n".join(page.text for page in chunk)
+                    return await StatementParsingAgent._extract_chunk_with_dedalus(text=text)
+                # Scanned pages have no text layer, send just those pages as a PDF
+                return await StatementParsingAgent._extract_chunk_with_dedalus(
+                    file_bytes=PdfStatementExtractor.chunk_pdf(file_content, chunk)
+                )
+        
+        # Chunks run concurrently, so latency is bounded by the slowest one
+        results = await asyncio.gather(*(extract_chunk(chunk) for chunk in chunks), return_exceptions=True)
+        failed = []
+        for chunk, result in zip(chunks, results):
+            if isinstance(result, (DeadlineExceeded, CircuitOpenError)):
+                raise result  # Upstream trouble is answered as 504/503, not as a bad statement
+            if isinstance(result, Exception):
+                print(f"Error extracting PDF pages {[p.number + 1 for p in chunk]}: {result}")
+                failed.extend(p.number + 1 for p in chunk)
+                continue
+            raw_rows.extend(result)
+        if failed:
+            # A report missing whole pages would look complete, so reject the statement instead
+            raise ValueError(f"Could not read transactions from PDF pages {', '.join(map(str, failed))}")
+        
+        raw_rows.sort(key=lambda row: row['date'])
+        return raw_rows
+    
+    @staticmethod
+    async def _extract_chunk_with_dedalus(text: str = None, file_bytes: bytes = None) -> list:
+        """Ask the LLM for the transactions in one chunk of statement pages"""
         prompt = (
-            "You are a financial assistant. Analyze the following bank statement PDF. "
-            "Extract all transactions (date, description, amount, category), "
-            "summarize total income, total expenses, and provide a breakdown by category. "
-            "Also, identify places for improvement in spending, subscriptions, and recurring expenses. "
-            "Return a JSON object with: transactions (list), total_income, total_expenses, categories (dict), "
-            "and improvements (list of suggestions)."
+            "Extract every transaction from the bank statement pages below. "
+            "Return a JSON object of the form "
+            '{"transactions": [{"date": "YYYY-MM-DD", "description": "...", "amount": -12.34, "category": "..."}]}. '
+            "Use negative amounts for purchases, withdrawals and fees and positive amounts for deposits, "
+            "payments and refunds. Use one of these categories: " + ", ".join(VALID_CATEGORIES) + ". "
+            "Skip balances, totals and other summary lines. Return only the JSON object."
         )
-
+        if text is not None:
+            prompt += "\n\nStatement pages:\n" + text
+        
         messages = [
             {"role": "system", "content": "You are a helpful financial assistant."},
             {"role": "user", "content": prompt}
         ]
-
-        client = AsyncDedalus(api_key=os.environ.get("DEDALUS_API_KEY"))
-        chat_completion = await client.chat.completions.create(
-            model="openai/gpt-4-turbo",
-            messages=messages,
-            files=[{"file": file_content, "filename": "statement.pdf"}]
+        
+        kwargs = {"files": [{"file": file_bytes, "filename": "statement.pdf"}]} if file_bytes is not None else {}
+        chat_completion = await LLMClient.complete(
+            "StatementParsingAgent", "_extract_chunk_with_dedalus",
+            messages,
+            task="extract",
+            **kwargs
         )
         ai_content = chat_completion.choices[0].message.content
-
-        try:
-            data = json.loads(ai_content)
-        except Exception:
-            import re
-            match = re.search(r'\{.*\}', ai_content, re.DOTALL)
-            if match:
-                data = json.loads(match.group(0))
-            else:
+        
+        # Decode the first JSON object in the reply instead of a greedy regex over the whole text
+        with span("StatementParsingAgent._extract_chunk_with_dedalus.parse_response"):
+            start = ai_content.find('{')
+            if start < 0:
+                LLMClient.record_failure("StatementParsingAgent", "_extract_chunk_with_dedalus", "invalid_json")
                 raise ValueError("AI response could not be parsed as JSON: " + ai_content)
-
-        transactions = []
+            data, _ = json.JSONDecoder().raw_decode(ai_content[start:])
+        
+        raw_rows = []
         for t in data.get("transactions", []):
             try:
-                tx_date = date.fromisoformat(t["date"])
-            except Exception:
-                tx_date = datetime.now().date()
-            transactions.append(Transaction(
-                date=tx_date,
-                description=t.get("description", ""),
-                amount=float(t.get("amount", 0.0)),
-                category=t.get("category", "other")
-            ))
-
-        # --- Spending Analysis Logic ---
-        subscriptions = []
-        for transaction in transactions:
-            if "subscription" in transaction.category.lower() or transaction.description.lower() in ["netflix", "spotify", "hulu"]:
-                subscriptions.append({
-                    "name": transaction.description,
-                    "amount": abs(transaction.amount),
-                    "frequency": "monthly"
-                })
-
-        insights = []
-        if len(subscriptions) > 5:
-            total_sub = sum(s["amount"] for s in subscriptions)
-            insights.append(SpendingInsight(
-                category="subscriptions",
-                insight_type="opportunity",
-                title="High Subscription Spending",
-                description=f"You're spending ${total_sub:.2f}/month on {len(subscriptions)} subscriptions",
-                potential_savings=total_sub * 0.3,
-                action_items=[
-                    "Review and cancel unused subscriptions",
-                    "Look for annual plans to save 15-20%",
-                    "Consider family plans to split costs"
-                ]
-            ))
-
-        categories = data.get("categories", {})
-        if categories.get("dining", 0) > 500:
-            insights.append(SpendingInsight(
-                category="dining",
-                insight_type="opportunity",
-                title="High Dining Expenses",
-                description=f"Dining spending is above average at ${categories['dining']:.2f}",
-                potential_savings=150.0,
-                action_items=[
-                    "Meal prep for 2-3 days per week",
-                    "Use dining rewards credit card",
-                    "Set a weekly dining budget"
-                ]
-            ))
-
-        optimization_score = 75.0
-
-        return SpendingReport(
-            user_id=user_id,
-            report_id=f"report_{datetime.now().timestamp()}",
-            period=f"{datetime.now().date()} to {datetime.now().date()}",
-            total_spending=float(data.get("total_expenses", 0.0)),
-            category_breakdown=categories,
-            subscriptions=subscriptions,
-            repeat_purchases=[],
-            insights=insights,
-            optimization_score=optimization_score
-        )
+                tx_date = date.fromisoformat(str(t["date"])[:10])
+                amount = float(t.get("amount", 0.0))
+            except (KeyError, TypeError, ValueError):
+                continue  # Undated or malformed rows are dropped rather than dated today
+            category = t.get("category", "")
+            raw_rows.append({
+                'date': tx_date,
+                'description': t.get("description", ""),
+                'amount': amount,
+                'category': category if category in VALID_CATEGORIES else ''
+            })
+        return raw_rows
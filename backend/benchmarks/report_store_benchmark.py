@@ -0,0 +1,121 @@
+"""
+Cost of getting a user's spending report back after a restart.
+
+Compares two ways of rebuilding the same report in a fresh process:
+  parse   re-parse the statement CSV (rows carry categories, so no LLM calls)
+  load    open the ReportStore file, which maps the columns instead of reading them
+
+and, for the loaded report, the cost of touching the most recent page of
+transactions and of materializing all of them. Each measurement runs in its
+own subprocess so resident memory is not shared between them.
+
+Run from the backend directory:
+    python benchmarks/report_store_benchmark.py [--transactions 200000]
+"""
+from datetime import date, timedelta
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# "Other" is re-categorized on import, so every row gets a concrete category
+CATEGORIES = ["Housing", "Transportation", "Food & Dining", "Entertainment", "Utilities", "Shopping"]
+MERCHANTS = ["NETFLIX.COM", "SQ *BLUE BOTTLE", "SHELL OIL", "WHOLEFDS MKT", "AMZN Mktp US", "UBER TRIP", "CITY POWER"]
+
+
+def rss_mb() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+
+
+def write_csv(path: str, count: int):
+    rng = random.Random(7)
+    start = date.today() - timedelta(days=3 * 365)
+    with open(path, "w") as f:
+        f.write("Date,Description,Amount,Category\n")
+        for i in range(count):
+            day = start + timedelta(days=rng.randrange(3 * 365))
+            merchant = rng.choice(MERCHANTS)
+            f.write(f"{day.isoformat()},{merchant} #{rng.randrange(9999)},-{rng.uniform(1, 200):.2f},{rng.choice(CATEGORIES)}\n")
+
+
+def child(mode: str, csv_path: str, store_dir: str):
+    from agents.StatementParsingAgent import StatementParsingAgent
+    from services.ReportStore import ReportStore
+
+    store = ReportStore(store_dir)
+    before = rss_mb()
+    result = {"mode": mode}
+    if mode == "save":
+        with open(csv_path, "rb") as f:
+            report = asyncio.run(StatementParsingAgent.parse_csv_statement(f.read(), "bench_user"))
+        start = time.perf_counter()
+        path = store.save(report)
+        result["seconds"] = time.perf_counter() - start
+        result["file_mb"] = os.path.getsize(path) / 1e6
+    elif mode == "parse":
+        start = time.perf_counter()
+        with open(csv_path, "rb") as f:
+            report = asyncio.run(StatementParsingAgent.parse_csv_statement(f.read(), "bench_user"))
+        result["seconds"] = time.perf_counter() - start
+    else:
+        start = time.perf_counter()
+        report, _ = store.load("bench_user")
+        result["seconds"] = time.perf_counter() - start
+        result["rss_open_mb"] = rss_mb() - before
+        start = time.perf_counter()
+        latest = report.transactions[-50:]
+        result["last_page_ms"] = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        total = sum(t.amount for t in report.transactions)
+        result["materialize_all_seconds"] = time.perf_counter() - start
+        assert latest and total
+    result["rss_mb"] = rss_mb() - before
+    result["transactions"] = len(report.transactions)
+    print(json.dumps(result))
+
+
+def run(mode: str, csv_path: str, store_dir: str) -> dict:
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", mode, "--csv", csv_path, "--store", store_dir],
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main_benchmark(count: int):
+    with tempfile.TemporaryDirectory() as workdir:
+        csv_path = os.path.join(workdir, "statement.csv")
+        store_dir = os.path.join(workdir, "reports")
+        write_csv(csv_path, count)
+        print(f"{count} transactions, CSV {os.path.getsize(csv_path) / 1e6:.1f} MB")
+
+        saved = run("save", csv_path, store_dir)
+        print(f"save   {saved['seconds'] * 1000:8.1f} ms   report file {saved['file_mb']:.1f} MB")
+        parsed = run("parse", csv_path, store_dir)
+        print(f"parse  {parsed['seconds'] * 1000:8.1f} ms   resident +{parsed['rss_mb']:.1f} MB")
+        loaded = run("load", csv_path, store_dir)
+        print(f"load   {loaded['seconds'] * 1000:8.1f} ms   resident +{loaded['rss_open_mb']:.1f} MB on open")
+        print(f"       last page of 50 in {loaded['last_page_ms']:.2f} ms; "
+              f"materializing all {loaded['transactions']} took {loaded['materialize_all_seconds'] * 1000:.0f} ms, "
+              f"resident +{loaded['rss_mb']:.1f} MB after")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--transactions", type=int, default=200000)
+    parser.add_argument("--child", choices=("save", "parse", "load"))
+    parser.add_argument("--csv")
+    parser.add_argument("--store")
+    args = parser.parse_args()
+    if args.child:
+        child(args.child, args.csv, args.store)
+    else:
+        main_benchmark(args.transactions)
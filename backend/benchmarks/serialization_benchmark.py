@@ -0,0 +1,144 @@
+"""
+Serialization cost of the hot read endpoints for a large user.
+
+Compares three paths for each endpoint payload:
+  baseline  jsonable_encoder + json.dumps, which is what FastAPI does for a returned dict
+  encode    the ResponseCache encoder on a cache miss (orjson when installed)
+  cached    a cache hit, which returns the stored bytes
+
+Run from the backend directory:
+    python benchmarks/serialization_benchmark.py [--goals 40] [--missions 25] [--transactions 20000]
+"""
+from datetime import date, timedelta
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder
+
+import main
+from models.UserProfile import UserProfile
+from models.FinancialGoal import FinancialGoal
+from models.Mission import Mission
+from models.MissionType import MissionType
+from models.SpendingReport import SpendingReport
+from models.SpendingInsight import SpendingInsight
+from models.Transaction import Transaction
+from services.ResponseCache import encode_json, orjson
+
+CATEGORIES = ["Housing", "Transportation", "Food & Dining", "Entertainment", "Utilities", "Shopping", "Other"]
+
+
+def build_user(user_id: str, goal_count: int, missions_per_goal: int, transaction_count: int):
+    rng = random.Random(7)
+    today = date.today()
+    main.users_db[user_id] = UserProfile(user_id=user_id, age=30, annual_income=85000, debts=[])
+
+    goals = []
+    for g in range(goal_count):
+        goal = FinancialGoal(
+            goal_id=f"goal_{g}", user_id=user_id, title=f"Goal {g}",
+            description="Save steadily toward a long term target " * 3,
+            target_amount=10000 + g * 250, current_amount=rng.uniform(0, 5000),
+            target_date=today + timedelta(days=365), priority="medium", category="travel"
+        )
+        goals.append(goal)
+        missions = [
+            Mission(
+                mission_id=f"mission_{g}_{m}", user_id=user_id, goal_id=goal.goal_id,
+                title=f"Mission {m} for goal {g}",
+                description="Put a fixed amount aside every week and skip one takeout order " * 2,
+                mission_type=MissionType.SAVINGS, target_value=rng.uniform(20, 200),
+                deadline=today + timedelta(days=rng.randint(1, 120)), points=rng.randint(10, 100),
+                status=rng.choice(["active", "active", "completed"])
+            )
+            for m in range(missions_per_goal)
+        ]
+        main._store_missions(user_id, goal.goal_id, missions)
+    main.goals_db[user_id] = goals
+
+    transactions = [
+        Transaction(
+            date=today - timedelta(days=rng.randint(0, 365)),
+            description=f"MERCHANT {rng.randint(1, 500)} PURCHASE",
+            amount=round(-rng.uniform(1, 300), 2),
+            category=rng.choice(CATEGORIES)
+        )
+        for _ in range(transaction_count)
+    ]
+    breakdown = {}
+    for t in transactions:
+        breakdown[t.category] = breakdown.get(t.category, 0.0) - t.amount
+    report = SpendingReport(
+        user_id=user_id, report_id="report_bench", period="last 12 months",
+        total_spending=sum(breakdown.values()), total_income=90000.0,
+        category_breakdown=breakdown, transactions=transactions,
+        insights=[
+            SpendingInsight(category="Shopping", title=f"Insight {i}", description="Spending is up this month",
+                            potential_savings=25.0, insight_type="opportunity", action_items=["Set a budget"])
+            for i in range(10)
+        ]
+    )
+    main._store_spending_report(user_id, report)
+
+
+def timed(fn, repeat: int) -> float:
+    """Best-of-three mean milliseconds per call"""
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        best = min(best, (time.perf_counter() - start) / repeat)
+    return best * 1000
+
+
+def main_benchmark(goal_count: int, missions_per_goal: int, transaction_count: int, repeat: int):
+    user_id = "bench_user"
+    build_user(user_id, goal_count, missions_per_goal, transaction_count)
+    payloads = {
+        "dashboard": lambda: main._dashboard_payload(user_id),
+        "goals": lambda: {"goals": main.goals_db[user_id]},
+        "goal_missions": lambda: {"missions": main.missions_db[user_id]["goal_0"]},
+        "budget": lambda: main._budget_payload(user_id),
+    }
+    endpoints = {
+        "dashboard": lambda: main.get_dashboard(user_id),
+        "goals": lambda: main.get_goals(user_id),
+        "goal_missions": lambda: main.get_goal_missions(user_id, "goal_0"),
+        "budget": lambda: main.get_budget_data(user_id),
+    }
+
+    print(f"{goal_count} goals x {missions_per_goal} missions, {transaction_count} transactions, "
+          f"encoder: {'orjson' if orjson is not None else 'json'}")
+    print(f"{'endpoint':<14}{'bytes':>10}{'baseline ms':>14}{'encode ms':>12}{'cached ms':>12}{'speedup':>10}")
+    loop = asyncio.new_event_loop()
+    for name, build in payloads.items():
+        payload = build()
+        # The fast encoder must produce the same document FastAPI would have
+        assert json.loads(encode_json(payload)) == jsonable_encoder(payload), name
+
+        baseline = timed(lambda: json.dumps(jsonable_encoder(build())).encode(), repeat)
+        encode = timed(lambda: encode_json(build()), repeat)
+        loop.run_until_complete(endpoints[name]())  # Warm the cache
+        cached = timed(lambda: loop.run_until_complete(endpoints[name]()), repeat)
+        size = len(encode_json(payload))
+        print(f"{name:<14}{size:>10}{baseline:>14.3f}{encode:>12.3f}{cached:>12.3f}{baseline / cached:>9.0f}x")
+    loop.close()
+    print(f"cache hits {main.response_cache.hits}, misses {main.response_cache.misses}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--goals", type=int, default=40)
+    parser.add_argument("--missions", type=int, default=25)
+    parser.add_argument("--transactions", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    main_benchmark(args.goals, args.missions, args.transactions, args.repeat)
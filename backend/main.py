@@ -1,8 +1,10 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, Depends, Form, BackgroundTasks
+from fastapi import FastAPI, UploadFile, File, HTTPException, Depends, Form, BackgroundTasks, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List, Optional, Dict, Any
-from datetime import datetime, date
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import List, Optional, Dict, Any, Tuple
+from datetime import datetime, date, timedelta, timezone
 from enum import Enum
+from contextlib import asynccontextmanager
 import json
 import asyncio
 from decimal import Decimal
@@ -13,16 +15,53 @@ from models.UserProfile import UserProfile
 from models.FinancialGoal import FinancialGoal
 from models.ParsedStatement import ParsedStatement
 from models.Mission import Mission
-from models.SocialFeed import SocialFeed
+from models.Transaction import Transaction
 from models.SpendingReport import SpendingReport
 from agents.GoalPlanningAgent import GoalPlanningAgent
 from agents.StatementParsingAgent import StatementParsingAgent
 from agents.CreditOptimizationAgent import CreditOptimizationAgent
-from agents.MissionGenerationAgent import MissionGenerationAgent
+from agents.MissionGenerationAgent import MissionGenerationAgent, ROADMAP_BUDGET_SECONDS
+from services.MissionScheduler import MissionScheduler
+from services.SpendingRollup import SpendingRollup, GRANULARITIES, MAX_BUCKETS
+from services.TransactionIndex import TransactionIndex
+from services.Pagination import encode_cursor, decode_cursor, clamp_limit
+from services.ResponseCache import ResponseCache
+from services.PromptContext import prompt_context
+from services.ReportStore import report_store, MappedTransactions
+from services.Leaderboard import leaderboard
+from services.ActivityFeed import activity_feed
+from services.StreakEngine import streak_engine, STREAK_MILESTONES
+from services.MerchantClassifier import merchant_classifier
+from services.DataExport import DataExport, EXPORT_FORMATS, MEDIA_TYPES, TRANSACTION_COLUMNS, MISSION_COLUMNS, GOAL_COLUMNS
+from services.Metrics import metrics, MetricsMiddleware, BACKGROUND_JOB_SECONDS, timed
+from services.Tracing import TracingMiddleware, span
+from services.Resilience import DeadlineMiddleware, DeadlineExceeded, CircuitOpenError, deadline, BACKGROUND_DEADLINE_SECONDS
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Rebuild deadline tracking from whatever missions are stored, then expire in the background.
+    # missions_db is in memory only, so after a restart this runs against an empty dict;
+    # the rebuilds take effect once missions are loaded from a persistent store here.
+    mission_scheduler.rebuild(missions_db)
+    leaderboard.rebuild(missions_db)
+    streak_engine.rebuild(missions_db)
+    mission_scheduler.start()
+    await merchant_classifier.load()
+    # Reopen stored spending reports; only their headers are read until transactions are needed
+    if report_store.enabled:
+        for spending_report, user_profile in report_store.load_all():
+            spending_reports_db[spending_report.user_id] = spending_report
+            if user_profile is not None:
+                users_db.setdefault(user_profile.user_id, user_profile)
+                leaderboard.add_user(user_profile.user_id)
+                streak_engine.set_timezone(user_profile.user_id, user_profile.timezone)
+        print(f"Loaded {len(spending_reports_db)} stored spending reports from {report_store.directory}")
+    yield
+    await mission_scheduler.stop()
+
 # Initialize FastAPI app
-app = FastAPI(title="MoneyTree")
+app = FastAPI(title="MoneyTree", lifespan=lifespan)
 
 # CORS middleware
 app.add_middleware(
@@ -32,6 +71,26 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Request latency per route, exported at /metrics
+app.add_middleware(MetricsMiddleware)
+# Sampled per-request spans written to TRACE_EXPORT_PATH (off unless TRACE_SAMPLE_RATE is set)
+app.add_middleware(TracingMiddleware)
+# Time budget per request (REQUEST_DEADLINE_SECONDS, or less via X-Request-Timeout) shared by every external call it makes
+app.add_middleware(DeadlineMiddleware)
+
+
+@app.exception_handler(DeadlineExceeded)
+async def deadline_exceeded_handler(request, exc: DeadlineExceeded):
+    return JSONResponse(status_code=504, content={"detail": "Request timed out waiting on an upstream service"})
+
+
+@app.exception_handler(CircuitOpenError)
+async def circuit_open_handler(request, exc: CircuitOpenError):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Upstream service temporarily unavailable"},
+        headers={"Retry-After": str(max(1, round(exc.retry_after)))}
+    )
 
 # ============================================================================
 # API ENDPOINTS
@@ -42,9 +101,171 @@ users_db: Dict[str, UserProfile] = {}
 goals_db: Dict[str, List[FinancialGoal]] = {}
 statements_db: Dict[str, ParsedStatement] = {}
 missions_db: Dict[str, Dict[str, List[Mission]]] = {}  # user_id -> goal_id -> missions
-social_feed: List[SocialFeed] = []
 spending_reports_db: Dict[str, SpendingReport] = {}  
 
+# Encoded bodies of the hot read endpoints, rebuilt only after a write
+response_cache = ResponseCache()
+metrics.callback(
+    "moneytree_response_cache_requests_total", "Response cache lookups by result",
+    lambda: {("hit",): response_cache.hits, ("miss",): response_cache.misses},
+    kind="counter", labels=("result",)
+)
+metrics.callback("moneytree_response_cache_entries", "Encoded responses held in the cache",
+                 lambda: {(): len(response_cache)})
+metrics.callback(
+    "moneytree_prompt_context_requests_total", "Prompt context block lookups by result",
+    lambda: {("hit",): prompt_context.hits, ("miss",): prompt_context.misses},
+    kind="counter", labels=("result",)
+)
+
+def _touch(user_id: str, *resources: str):
+    """Invalidate cached responses and prompt context built from these resources ("profile", "goals", "missions", "report", "credit")"""
+    response_cache.touch(user_id, *resources)
+    prompt_context.touch(user_id, *resources)
+
+# Moves missions past their deadline to "failed"
+mission_scheduler = MissionScheduler()
+mission_scheduler.add_hook(lambda user_id, missions: _touch(user_id, "missions"))
+
+def _publish_expired(user_id: str, missions: List[Mission]):
+    """One feed event per user for the missions that just ran past their deadline"""
+    if len(missions) == 1:
+        message = f"Missed the deadline for \"{missions[0].title}\""
+    else:
+        message = f"Missed the deadline for {len(missions)} missions"
+    activity_feed.publish(user_id, "mission_expired", message)
+
+mission_scheduler.add_hook(_publish_expired)
+
+def _roll_over_expired(user_id: str, missions: List[Mission]):
+    """
+    Move the user on to the next mission of every goal that just had one expire:
+    the active mission due soonest, or when the expired one was the last, a new
+    attempt at it with as much time as the original had.
+    """
+    expired_ids = {m.mission_id for m in missions}
+    today = date.today()
+    for goal_id, goal_missions in missions_db.get(user_id, {}).items():
+        expired = [m for m in goal_missions if m.mission_id in expired_ids]
+        if not expired:
+            continue
+        upcoming = [m for m in goal_missions if m.status == "active"]
+        if upcoming:
+            next_mission = min(upcoming, key=lambda m: m.deadline)
+        else:
+            last = max(expired, key=lambda m: m.deadline)
+            days = max((last.deadline - last.created_at.date()).days, 1)
+            next_mission = last.model_copy(update={
+                "mission_id": f"{last.mission_id}_retry_{today.isoformat()}",
+                "status": "active",
+                "deadline": today + timedelta(days=days),
+                "created_at": datetime.now(),
+                "completed_at": None
+            })
+            goal_missions.append(next_mission)
+            mission_scheduler.schedule(next_mission)
+            leaderboard.sync_goal(user_id, goal_id, goal_missions)
+            _touch(user_id, "missions")
+        activity_feed.publish(user_id, "mission_next", f"Next up: \"{next_mission.title}\" by {next_mission.deadline.isoformat()}")
+
+mission_scheduler.add_hook(_roll_over_expired)
+
+def _store_missions(user_id: str, goal_id: str, missions: List[Mission]):
+    """Store a goal's missions, replacing any previous roadmap, and track their deadlines"""
+    if user_id not in missions_db:
+        missions_db[user_id] = {}
+    previous = missions_db[user_id].get(goal_id)
+    if previous:
+        mission_scheduler.cancel_many(previous)
+    missions_db[user_id][goal_id] = missions
+    mission_scheduler.schedule_many(missions)
+    leaderboard.sync_goal(user_id, goal_id, missions)
+    _touch(user_id, "missions")
+
+def _mission_completed(user_id: str, goal_id: str, mission: Mission, goal_missions: List[Mission]):
+    """Record when a mission became completed, extend the user's streak and publish feed events"""
+    mission.completed_at = datetime.now(timezone.utc)
+    streak = streak_engine.record(user_id, mission.completed_at)
+    activity_feed.publish(user_id, "mission_complete", f"Completed \"{mission.title}\" for {mission.points} points")
+    if all(m.status == "completed" for m in goal_missions):
+        goal = next((g for g in goals_db.get(user_id, []) if g.goal_id == goal_id), None)
+        title = goal.title if goal else "a goal"
+        activity_feed.publish(user_id, "goal_complete", f"Finished every mission for {title} and earned an apple")
+    if streak in STREAK_MILESTONES:
+        activity_feed.publish(user_id, "streak_milestone", f"Reached a {streak}-day mission streak")
+
+def _mission_uncompleted(user_id: str, mission: Mission):
+    """Take back a completion, recounting the user's streaks without it"""
+    mission.completed_at = None
+    streak_engine.recompute_user(user_id, (
+        m.completed_at for goal_missions in missions_db.get(user_id, {}).values() for m in goal_missions
+        if m.status == "completed" and m.completed_at is not None
+    ))
+
+# LLM roadmaps still being generated after the request answered with a template, by (user_id, goal_id)
+roadmap_refinements: Dict[tuple, asyncio.Task] = {}
+
+async def _refine_roadmap(user_id: str, goal_id: str, generation: asyncio.Task):
+    """Swap a goal's template roadmap for the LLM roadmap once it arrives, keeping mission IDs and finished missions"""
+    try:
+        generated = await generation
+    except Exception as e:
+        print(f"Roadmap refinement failed for goal {goal_id}: {e}")
+        return
+    finally:
+        if roadmap_refinements.get((user_id, goal_id)) is asyncio.current_task():
+            del roadmap_refinements[(user_id, goal_id)]
+    current = missions_db.get(user_id, {}).get(goal_id, [])
+    _store_missions(user_id, goal_id, MissionGenerationAgent.merge_roadmap(current, generated))
+    print(f"Replaced template roadmap for goal {goal_id} with {len(generated)} generated missions")
+
+# Per-user search index over the spending report's transactions
+transaction_indexes_db: Dict[str, TransactionIndex] = {}
+
+def _transaction_index(user_id: str) -> Optional[TransactionIndex]:
+    """
+    The user's transaction index, brought up to date with their report.
+    Reports reopened from disk are indexed on first use rather than at startup.
+    """
+    spending_report = spending_reports_db.get(user_id)
+    if spending_report is None:
+        return None
+    index = transaction_indexes_db.get(user_id)
+    if index is None or index.report_id != spending_report.report_id:
+        index = TransactionIndex(spending_report.report_id)
+        transaction_indexes_db[user_id] = index
+    # Reports only grow by appending, so only the tail needs indexing
+    if len(index) < len(spending_report.transactions):
+        index.add(spending_report.transactions[len(index):])
+    return index
+
+def _store_spending_report(user_id: str, spending_report: SpendingReport):
+    """Store a user's report and bring its transaction index up to date, if one was built"""
+    spending_reports_db[user_id] = spending_report
+    if user_id in transaction_indexes_db:
+        _transaction_index(user_id)
+    _touch(user_id, "report")
+
+def _recent_transactions(user_id: str, limit: int) -> List[Transaction]:
+    """
+    Newest transactions for the budget view. A report reopened from disk is
+    read from its date column rather than indexed, which would turn every
+    mapped row into a Transaction; the index is left to search and export.
+    """
+    transactions = spending_reports_db[user_id].transactions
+    if isinstance(transactions, MappedTransactions) and user_id not in transaction_indexes_db:
+        return transactions.latest(limit)
+    return _transaction_index(user_id).recent(limit)
+
+async def _save_spending_report(user_id: str):
+    """Write the user's report to the report store; callers hold the user's report lock"""
+    if not report_store.enabled:
+        return
+    try:
+        await asyncio.to_thread(report_store.save, spending_reports_db[user_id], users_db.get(user_id))
+    except OSError as e:
+        print(f"Could not save spending report for user {user_id}: {e}")
+
 
 class OnboardRequest(BaseModel):
     age: int
@@ -56,14 +277,24 @@ async def onboard_user(
     age: int = Form(...),
     annual_income: float = Form(...),
     debts: str = Form("[]"),  # JSON string
-    transactions_csv: Optional[UploadFile] = File(None)
+    transactions_csv: Optional[UploadFile] = File(None),
+    statement_files: Optional[List[UploadFile]] = File(None),  # One statement per account
+    accounts: str = Form(""),  # Comma-separated account names for the statement files; only named ones are matched for transfers
+    time_zone: str = Form("", alias="timezone")  # IANA time zone for streak day boundaries; STREAK_TIMEZONE when empty
 ):
     """
-    Initial user onboarding: basic info (age, income, debts) + optional CSV upload
+    Initial user onboarding: basic info (age, income, debts) + optional statement uploads
     Accepts both FormData (with CSV) and JSON (without CSV) for backward compatibility
-    CSV parsing runs in the background for faster onboarding.
+    Statements from several accounts can be sent as statement_files; they are parsed
+    into one report with transfers between the accounts left out of the totals.
+    Statements may be gzip, zstd or zip compressed; they are decompressed as they are parsed.
+    Statement parsing runs in the background for faster onboarding.
     """
     user_id = f"user_{datetime.now().timestamp()}"
+    try:
+        streak_engine.set_timezone(user_id, time_zone or None)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     # Parse debts from JSON string
     try:
@@ -76,25 +307,31 @@ async def onboard_user(
         user_id=user_id,
         age=age,
         annual_income=annual_income,
-        debts=debts_list
+        debts=debts_list,
+        timezone=time_zone or None
     )
     users_db[user_id] = user_profile
+    leaderboard.add_user(user_id)
+    _touch(user_id, "profile")
 
-    # Process CSV in background if uploaded
-    has_csv = False
-    if transactions_csv:
-        has_csv = True
+    # Process statements in background if uploaded
+    uploads = ([transactions_csv] if transactions_csv else []) + (statement_files or [])
+    has_csv = bool(uploads)
+    if uploads:
         # Read file content before starting background task
-        file_content = await transactions_csv.read()
+        files = await _read_statement_uploads(uploads, accounts)
         
-        # Parse CSV in background
+        # Parse statements in background
         async def parse_csv_background():
             try:
-                spending_report = await StatementParsingAgent.parse_csv_statement(
-                    file_content, 
-                    user_id
-                )
-                spending_reports_db[user_id] = spending_report
+                # The job outlives the upload request, so it gets its own budget rather than the request's
+                with deadline(BACKGROUND_DEADLINE_SECONDS, replace=True), \
+                        span("job.parse_statement", user_id=user_id, files=len(files)), \
+                        timed(BACKGROUND_JOB_SECONDS, "parse_statement"):
+                    async with report_locks.setdefault(user_id, asyncio.Lock()):
+                        spending_report = await StatementParsingAgent.parse_statement_files(files, user_id)
+                        _store_spending_report(user_id, spending_report)
+                        await _save_spending_report(user_id)
                 print(f"Successfully parsed CSV for user {user_id}")
             except Exception as e:
                 print(f"Error processing CSV: {str(e)}")
@@ -108,6 +345,105 @@ async def onboard_user(
         "has_spending_data": has_csv  # Indicates CSV was uploaded, parsing in progress
     }
 
+# Serializes report writes per user so overlapping uploads cannot double-count rows
+report_locks: Dict[str, asyncio.Lock] = {}
+
+async def _read_statement_uploads(uploads: List[UploadFile], accounts: str = "") -> List[tuple]:
+    """
+    (account, content) pairs for uploaded statements. Accounts are named by the
+    comma-separated accounts form field in upload order. Unnamed statements get
+    no account and are not matched for transfers: file names such as
+    checking_jan.csv and checking_feb.csv would look like two accounts and pair
+    a purchase in one with its refund in the other.
+    """
+    names = [name.strip() for name in accounts.split(",")] if accounts else []
+    return [
+        (names[position] if position < len(names) and names[position] else None, await upload.read())
+        for position, upload in enumerate(uploads)
+    ]
+
+async def _ingest_statements(user_id: str, files: List[tuple], mode: str) -> Tuple[SpendingReport, int]:
+    """
+    Parse uploaded statements into the user's report under their report lock,
+    merging into the existing report unless mode is "replace", and save it.
+    Returns the report and the number of transactions added.
+    """
+    async with report_locks.setdefault(user_id, asyncio.Lock()):
+        try:
+            spending_report = spending_reports_db.get(user_id)
+            if mode == "replace" or spending_report is None:
+                spending_report = await StatementParsingAgent.parse_statement_files(files, user_id)
+                added = len(spending_report.transactions)
+            else:
+                added = await StatementParsingAgent.merge_statements(spending_report, files)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Could not parse statement: {e}")
+        _store_spending_report(user_id, spending_report)
+        await _save_spending_report(user_id)
+    return spending_report, added
+
+@app.post("/api/statements/{user_id}/upload")
+async def upload_statement(
+    user_id: str,
+    statement_file: UploadFile = File(...),
+    mode: str = Form("merge"),  # "merge" appends new rows, "replace" starts over
+    account: str = Form("")  # Account the statement is from; transfers are only matched between named accounts
+):
+    """
+    Upload another CSV or PDF statement for an existing user, plain or
+    gzip / zstd / zip compressed.
+    In merge mode, rows already in the report are dropped by fingerprint and
+    only the new rows are categorized and added to the existing report.
+    Transfers to and from the user's other named accounts are left out of the totals.
+    """
+    if user_id not in users_db:
+        raise HTTPException(status_code=404, detail="User not found")
+    if mode not in ("merge", "replace"):
+        raise HTTPException(status_code=400, detail="mode must be 'merge' or 'replace'")
+    
+    files = await _read_statement_uploads([statement_file], account)
+    spending_report, added = await _ingest_statements(user_id, files, mode)
+    
+    return {
+        "message": "Statement uploaded successfully",
+        "mode": mode,
+        "account": account or None,
+        "transactions_added": added,
+        "total_transactions": len(spending_report.transactions),
+        "period": spending_report.period
+    }
+
+@app.post("/api/statements/{user_id}/upload-multiple")
+async def upload_statements(
+    user_id: str,
+    statement_files: List[UploadFile] = File(...),
+    accounts: str = Form(""),  # Comma-separated account names, in file order
+    mode: str = Form("merge")  # "merge" appends new rows, "replace" starts over
+):
+    """
+    Upload statements from several accounts at once (checking, savings, cards).
+    The files are parsed concurrently and merged into one report; transfers
+    between the named accounts, including against earlier uploads, are matched and
+    left out of income and spending.
+    """
+    if user_id not in users_db:
+        raise HTTPException(status_code=404, detail="User not found")
+    if mode not in ("merge", "replace"):
+        raise HTTPException(status_code=400, detail="mode must be 'merge' or 'replace'")
+    
+    files = await _read_statement_uploads(statement_files, accounts)
+    spending_report, added = await _ingest_statements(user_id, files, mode)
+    
+    return {
+        "message": "Statements uploaded successfully",
+        "mode": mode,
+        "accounts": [account for account, _ in files],
+        "transactions_added": added,
+        "total_transactions": len(spending_report.transactions),
+        "transfers": spending_report.transfer_count,
+        "period": spending_report.period
+    }
+
 @app.get("/api/budget/{user_id}")
 async def get_budget_data(user_id: str):
     """
@@ -116,7 +452,9 @@ async def get_budget_data(user_id: str):
     if user_id not in users_db:
         raise HTTPException(status_code=404, detail="User not found")
     
-    user = users_db[user_id]
+    return response_cache.respond(user_id, "budget", ("report",), lambda: _budget_payload(user_id))
+
+def _budget_payload(user_id: str) -> Dict[str, Any]:
     spending_report = spending_reports_db.get(user_id)
     
     if not spending_report:
@@ -165,8 +503,9 @@ async def get_budget_data(user_id: str):
         })
     
     # Convert transactions to frontend format
+    latest = _recent_transactions(user_id, 10)
     recent_transactions = []
-    for transaction in sorted(spending_report.transactions, key=lambda x: x.date, reverse=True)[:10]:
+    for transaction in latest:
         recent_transactions.append({
             "date": transaction.date.strftime("%b %d"),
             "description": transaction.description,
@@ -191,6 +530,103 @@ async def get_budget_data(user_id: str):
         "optimization_score": spending_report.optimization_score
     }
 
+@app.get("/api/transactions/{user_id}")
+async def list_transactions(
+    user_id: str,
+    q: Optional[str] = None,
+    category: Optional[str] = None,
+    from_date: Optional[date] = Query(None, alias="from"),
+    to_date: Optional[date] = Query(None, alias="to"),
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+    cursor: Optional[str] = None,
+    limit: int = 50
+):
+    """
+    Search and page through a user's transactions, newest first.
+    q matches description words, and amount bounds apply to the absolute amount.
+    Pass next_cursor from the previous page to continue.
+    """
+    if user_id not in users_db:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    index = _transaction_index(user_id)
+    if index is None:
+        return {"transactions": [], "next_cursor": None}
+    
+    try:
+        before = decode_cursor(cursor, shape=(int, int))  # (date ordinal, transaction id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    page, next_key = index.search(
+        query=q,
+        category=category,
+        date_from=from_date,
+        date_to=to_date,
+        min_amount=min_amount,
+        max_amount=max_amount,
+        before=tuple(before) if before else None,
+        limit=clamp_limit(limit)
+    )
+    return {
+        "transactions": [
+            {
+                "id": tx_id,
+                "date": transaction.date.isoformat(),
+                "description": transaction.description,
+                "category": transaction.category,
+                "amount": transaction.amount,
+                "merchant": transaction.merchant,
+                "account": transaction.account,
+                "is_transfer": transaction.is_transfer
+            }
+            for tx_id, transaction in page
+        ],
+        "next_cursor": encode_cursor(list(next_key)) if next_key else None
+    }
+
+@app.get("/api/spending/{user_id}/timeseries")
+async def get_spending_timeseries(
+    user_id: str,
+    from_date: Optional[date] = Query(None, alias="from"),
+    to_date: Optional[date] = Query(None, alias="to"),
+    granularity: str = "month",
+    category: Optional[str] = None
+):
+    """
+    Spending by category and income over time, bucketed by day, week or month.
+    Answered from the report's precomputed daily rollup, not by scanning transactions.
+    """
+    if user_id not in users_db:
+        raise HTTPException(status_code=404, detail="User not found")
+    if granularity not in GRANULARITIES:
+        raise HTTPException(status_code=400, detail=f"granularity must be one of {', '.join(GRANULARITIES)}")
+    
+    spending_report = spending_reports_db.get(user_id)
+    if not spending_report or not spending_report.period_start:
+        return {"has_data": False, "granularity": granularity, "buckets": []}
+    
+    from_date = from_date or spending_report.period_start
+    to_date = to_date or spending_report.period_end
+    if from_date > to_date:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+    if SpendingRollup.bucket_count(from_date, to_date, granularity) > MAX_BUCKETS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Range too long for {granularity} buckets, at most {MAX_BUCKETS} are returned"
+        )
+    
+    categories = [category] if category else None
+    buckets = spending_report.rollup.timeseries(from_date, to_date, granularity, categories)
+    return {
+        "has_data": True,
+        "granularity": granularity,
+        "from": from_date.isoformat(),
+        "to": to_date.isoformat(),
+        "buckets": buckets
+    }
+
 class GoalChatRequest(BaseModel):
     message: Optional[str] = None
     conversation_history: Optional[List[Dict[str, Any]]] = None
@@ -254,16 +690,17 @@ async def finalize_goals(user_id: str):
     existing_goals = goals_db.get(user_id, [])
     existing_goals.extend(new_goals)
     goals_db[user_id] = existing_goals
+    _touch(user_id, "goals")
     
     # Start mission generation in background for each new goal
     async def generate_missions_background():
         for goal in new_goals:
             try:
-                missions = await MissionGenerationAgent.generate_mission_roadmap(user_profile, goal)
+                with deadline(BACKGROUND_DEADLINE_SECONDS, replace=True), \
+                        span("job.generate_missions", goal_id=goal.goal_id), timed(BACKGROUND_JOB_SECONDS, "generate_missions"):
+                    missions = await MissionGenerationAgent.generate_mission_roadmap(user_profile, goal)
                 # Store missions
-                if user_id not in missions_db:
-                    missions_db[user_id] = {}
-                missions_db[user_id][goal.goal_id] = missions
+                _store_missions(user_id, goal.goal_id, missions)
                 print(f"Successfully generated {len(missions)} missions for goal {goal.goal_id}")
             except Exception as e:
                 print(f"Error generating missions for goal {goal.goal_id}: {e}")
@@ -283,8 +720,7 @@ async def get_goals(user_id: str):
     """
     if user_id not in users_db:
         raise HTTPException(status_code=404, detail="User not found")
-    goals = goals_db.get(user_id, [])
-    return {"goals": goals}
+    return response_cache.respond(user_id, "goals", ("goals",), lambda: {"goals": goals_db.get(user_id, [])})
 
 class UpdateGoalRequest(BaseModel):
     current_amount: Optional[float] = None
@@ -308,6 +744,7 @@ async def update_goal(user_id: str, goal_id: str, request: UpdateGoalRequest):
         goal.current_amount = request.current_amount
     if request.on_roadmap is not None:
         goal.on_roadmap = request.on_roadmap
+    _touch(user_id, "goals")
     
     return {"goal": goal, "message": "Goal updated successfully"}
 
@@ -326,6 +763,12 @@ async def delete_goal(user_id: str, goal_id: str):
         raise HTTPException(status_code=404, detail="Goal not found")
     
     goals_db[user_id] = [g for g in goals if g.goal_id != goal_id]
+    _touch(user_id, "goals")
+    # Deleted goals should not keep failing missions in the background
+    mission_scheduler.cancel_many(missions_db.get(user_id, {}).get(goal_id, []))
+    pending = roadmap_refinements.pop((user_id, goal_id), None)
+    if pending is not None:
+        pending.cancel()
     return {"message": "Goal deleted successfully"}
 
 @app.get("/api/goals/{user_id}/{goal_id}")
@@ -354,11 +797,12 @@ async def get_goal_missions(user_id: str, goal_id: str):
     if user_id not in users_db:
         raise HTTPException(status_code=404, detail="User not found")
     
-    # Check if missions already exist for this goal
-    if user_id in missions_db and goal_id in missions_db[user_id]:
-        return {"missions": missions_db[user_id][goal_id]}
-    
-    return {"missions": []}
+    # Goals without generated missions return an empty list
+    return response_cache.respond(
+        user_id, "goal_missions", ("missions",),
+        lambda: {"missions": missions_db.get(user_id, {}).get(goal_id, [])},
+        params=(goal_id,)
+    )
 
 @app.post("/api/goals/{user_id}/{goal_id}/missions/generate")
 async def generate_goal_missions(user_id: str, goal_id: str):
@@ -377,15 +821,29 @@ async def generate_goal_missions(user_id: str, goal_id: str):
     if not goal:
         raise HTTPException(status_code=404, detail="Goal not found")
     
-    # Generate missions using the agent
-    missions = await MissionGenerationAgent.generate_mission_roadmap(user_profile, goal)
-    
-    # Store missions in database
-    if user_id not in missions_db:
-        missions_db[user_id] = {}
-    missions_db[user_id][goal_id] = missions
-    
-    return {"missions": missions, "message": "Missions generated successfully"}
+    # A newer request supersedes a refinement still running for this goal
+    pending = roadmap_refinements.pop((user_id, goal_id), None)
+    if pending is not None:
+        pending.cancel()
+    
+    # Generation keeps running past the budget, so give it the background budget rather than the request's
+    with deadline(BACKGROUND_DEADLINE_SECONDS, replace=True):
+        generation = asyncio.create_task(MissionGenerationAgent.generate_mission_roadmap(user_profile, goal))
+    done, _ = await asyncio.wait({generation}, timeout=ROADMAP_BUDGET_SECONDS)
+    if done:
+        missions = generation.result()
+        _store_missions(user_id, goal_id, missions)
+        return {"missions": missions, "message": "Missions generated successfully", "provisional": False}
+    
+    # Too slow: answer with the template roadmap now and swap in the LLM roadmap when it lands
+    missions = MissionGenerationAgent.generate_fallback_roadmap(user_profile, goal)
+    _store_missions(user_id, goal_id, missions)
+    roadmap_refinements[(user_id, goal_id)] = asyncio.create_task(_refine_roadmap(user_id, goal_id, generation))
+    return {
+        "missions": missions,
+        "message": "Missions generated; a personalized roadmap will replace them shortly",
+        "provisional": True
+    }
 
 class UpdateMissionRequest(BaseModel):
     status: Optional[str] = None  # "active", "completed", "failed"
@@ -408,7 +866,18 @@ async def update_mission(user_id: str, goal_id: str, mission_id: str, request: U
         raise HTTPException(status_code=404, detail="Mission not found")
     
     if request.status is not None:
+        was_completed = mission.status == "completed"
         mission.status = request.status
+        if mission.status == "active":
+            mission_scheduler.schedule(mission)
+        else:
+            mission_scheduler.cancel(user_id, mission.mission_id)
+        leaderboard.sync_goal(user_id, goal_id, missions)
+        _touch(user_id, "missions")
+        if mission.status == "completed" and not was_completed:
+            _mission_completed(user_id, goal_id, mission, missions)
+        elif mission.status != "completed" and was_completed:
+            _mission_uncompleted(user_id, mission)
     
     return {"mission": mission, "message": "Mission updated successfully"}
 
@@ -429,9 +898,10 @@ async def get_credit_conversation(user_id: str):
     if user_id not in users_db:
         raise HTTPException(status_code=404, detail="User not found")
     
-    conversation_history = credit_conversations_db.get(user_id, [])
-    finalized_stack = credit_stacks_db.get(user_id, None)
-    return {"conversation_history": conversation_history, "finalized_stack": finalized_stack}
+    return response_cache.respond(user_id, "credit_chat", ("credit",), lambda: {
+        "conversation_history": credit_conversations_db.get(user_id, []),
+        "finalized_stack": credit_stacks_db.get(user_id, None)
+    })
 
 @app.post("/api/credit/chat/{user_id}")
 async def credit_optimization_chat(user_id: str, request: CreditChatRequest = CreditChatRequest()):
@@ -457,6 +927,7 @@ async def credit_optimization_chat(user_id: str, request: CreditChatRequest = Cr
         spending_report=spending_report
     )
     credit_conversations_db[user_id] = result["conversation_history"]
+    _touch(user_id, "credit")
     return result
 
 @app.post("/api/credit/finalize/{user_id}")
@@ -523,21 +994,77 @@ async def get_spending_report(user_id: str):
     return report
 '''
 
+def _parse_fields(fields: Optional[str], model) -> Optional[set]:
+    """Validate a comma-separated fields= projection against a pydantic model"""
+    if not fields:
+        return None
+    requested = {f.strip() for f in fields.split(",") if f.strip()}
+    unknown = requested - set(model.model_fields)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    return requested
+
+def _project(items: list, fields: Optional[set]) -> list:
+    if fields is None:
+        return items
+    return [item.model_dump(include=fields) for item in items]
+
+def _filter_missions(user_id: str, status: Optional[str] = None, goal_id: Optional[str] = None) -> List[Mission]:
+    """Missions across all of a user's goals, optionally filtered by status and goal"""
+    user_missions = missions_db.get(user_id, {})
+    if goal_id is not None:
+        groups = [user_missions.get(goal_id, [])]
+    else:
+        groups = user_missions.values()
+    return [m for goal_missions in groups for m in goal_missions if status is None or m.status == status]
+
+def _page_missions(missions: List[Mission], cursor: Optional[str], limit: Optional[int]):
+    """
+    Page missions ordered by (deadline, mission_id). Without a cursor or limit
+    every mission is returned in stored order, as before pagination existed.
+    """
+    if cursor is None and limit is None:
+        return missions, None
+    try:
+        after = decode_cursor(cursor, shape=(str, str))  # (deadline ISO date, mission_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if limit is not None and limit < 1:
+        raise HTTPException(status_code=400, detail="limit must be at least 1")
+    limit = clamp_limit(50 if limit is None else limit)
+    keyed = sorted(((m.deadline.isoformat(), m.mission_id), m) for m in missions)
+    if after:
+        keyed = [(key, m) for key, m in keyed if key > tuple(after)]
+    page = keyed[:limit]
+    next_cursor = encode_cursor(list(page[-1][0])) if len(keyed) > limit else None
+    return [m for _, m in page], next_cursor
+
 @app.get("/api/missions/{user_id}")
-async def get_missions(user_id: str):
+async def get_missions(
+    user_id: str,
+    status: Optional[str] = None,
+    goal_id: Optional[str] = None,
+    fields: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None
+):
     """
-    Get all missions for user (aggregated from all goals)
+    Get all missions for user (aggregated from all goals).
+    Optional status/goal_id filters, fields= projection (e.g. fields=mission_id,title,status),
+    and cursor pagination ordered by deadline when cursor or limit is given.
     """
     if user_id not in users_db:
         raise HTTPException(status_code=404, detail="User not found")
     
-    # Aggregate all missions from all goals
-    all_missions = []
-    if user_id in missions_db:
-        for goal_id, goal_missions in missions_db[user_id].items():
-            all_missions.extend(goal_missions)
+    if status is None and goal_id is None and fields is None and cursor is None and limit is None:
+        # The plain listing is the bootstrap "missions" section, so both share one cache entry
+        name, depends, build = BOOTSTRAP_SECTIONS["missions"]
+        return response_cache.respond(user_id, name, depends, lambda: build(user_id))
     
-    return {"missions": all_missions}
+    projection = _parse_fields(fields, Mission)
+    missions, next_cursor = _page_missions(_filter_missions(user_id, status, goal_id), cursor, limit)
+    
+    return {"missions": _project(missions, projection), "next_cursor": next_cursor}
 
 @app.post("/api/missions/{mission_id}/complete")
 async def complete_mission(mission_id: str, user_id: str):
@@ -557,7 +1084,13 @@ async def complete_mission(mission_id: str, user_id: str):
     if not mission:
         raise HTTPException(status_code=404, detail="Mission not found")
     
+    was_completed = mission.status == "completed"
     mission.status = "completed"
+    mission_scheduler.cancel(user_id, mission.mission_id)
+    leaderboard.sync_goal(user_id, goal_id, goal_missions)
+    _touch(user_id, "missions")
+    if not was_completed:
+        _mission_completed(user_id, goal_id, mission, goal_missions)
     
     return {
         "mission": mission,
@@ -565,22 +1098,53 @@ async def complete_mission(mission_id: str, user_id: str):
 
 
 @app.get("/api/dashboard/{user_id}")
-async def get_dashboard(user_id: str):
+async def get_dashboard(
+    user_id: str,
+    summary: bool = False,
+    status: Optional[str] = None,
+    goal_id: Optional[str] = None,
+    fields: Optional[str] = None,
+    goal_fields: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None
+):
     """
-    Get dashboard data including aggregated missions from all goals
+    Get dashboard data including aggregated missions from all goals.
+    summary=true returns only the counters and active missions. The mission
+    filters, fields= projection and pagination work as in /api/missions;
+    goal_fields= projects the goals.
     """
     if user_id not in users_db:
         raise HTTPException(status_code=404, detail="User not found")
     
+    return response_cache.respond(
+        user_id, "dashboard", ("goals", "missions"),
+        lambda: _dashboard_payload(user_id, summary, status, goal_id, fields, goal_fields, cursor, limit),
+        # The user's local day is part of the key so a lapsed streak is not served from yesterday's body
+        params=(summary, status, goal_id, fields, goal_fields, cursor, limit, streak_engine.today(user_id))
+    )
+
+def _dashboard_payload(
+    user_id: str,
+    summary: bool = False,
+    status: Optional[str] = None,
+    goal_id: Optional[str] = None,
+    fields: Optional[str] = None,
+    goal_fields: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None
+) -> Dict[str, Any]:
     user_profile = users_db[user_id]
     goals = goals_db.get(user_id, [])
+    mission_projection = _parse_fields(fields, Mission)
+    goal_projection = _parse_fields(goal_fields, FinancialGoal)
     
     # Aggregate all missions from all goals
     all_missions = []
     apples_collected = 0  # Count goals with all missions completed
     
     if user_id in missions_db:
-        for goal_id, goal_missions in missions_db[user_id].items():
+        for goal_missions in missions_db[user_id].values():
             all_missions.extend(goal_missions)
             # Check if all missions for this goal are completed
             if goal_missions and all(m.status == "completed" for m in goal_missions):
@@ -590,21 +1154,293 @@ async def get_dashboard(user_id: str):
     completed_count = sum(1 for m in all_missions if m.status == "completed")
     
     # Stats including apples
+    current_streak, longest_streak = streak_engine.streak(user_id)
     streak = {
-        "current_streak": 0,
+        "current_streak": current_streak,
         "total_missions_completed": completed_count,
-        "longest_streak": 0,
-        "apples_collected": apples_collected
+        "longest_streak": longest_streak,
+        "apples_collected": apples_collected,
+        "total_points": leaderboard.score(user_id)[0]
     }
     
+    if summary:
+        active_missions, next_cursor = _page_missions(
+            [m for m in all_missions if m.status == "active" and (goal_id is None or m.goal_id == goal_id)],
+            cursor, limit
+        )
+        return {
+            "streak": streak,
+            "goal_count": len(goals),
+            "active_missions": _project(active_missions, mission_projection),
+            "next_cursor": next_cursor
+        }
+    
+    if status is not None or goal_id is not None:
+        all_missions = _filter_missions(user_id, status, goal_id)
+    missions, next_cursor = _page_missions(all_missions, cursor, limit)
+    
     return {
         "user_profile": user_profile,
-        "goals": goals,
-        "missions": all_missions,
+        "goals": _project(goals, goal_projection),
+        "missions": _project(missions, mission_projection),
+        "next_cursor": next_cursor,
         "streak": streak,
         "spending_summary": {}
     }
 
+# ============================================================================
+# LEADERBOARD
+# ============================================================================
+
+class FriendGroupRequest(BaseModel):
+    name: str
+    member_ids: List[str] = []
+
+class GroupMemberRequest(BaseModel):
+    user_id: str
+
+def _leaderboard_scope(scope: str):
+    board = leaderboard.board(scope)
+    if board is None:
+        raise HTTPException(status_code=404, detail="Leaderboard scope not found")
+    return board
+
+@app.get("/api/leaderboard")
+async def get_leaderboard(scope: str = "global", limit: int = 10):
+    """Top users by mission points, then apples. scope is "global" or a friend group id."""
+    board = _leaderboard_scope(scope)
+    return {"scope": scope, "total_users": len(board), "entries": board.top(clamp_limit(limit))}
+
+@app.get("/api/leaderboard/{user_id}")
+async def get_leaderboard_position(user_id: str, scope: str = "global", radius: int = 3):
+    """A user's rank and score with the radius users ranked just above and below them"""
+    if user_id not in users_db:
+        raise HTTPException(status_code=404, detail="User not found")
+    leaderboard.add_user(user_id)
+    board = _leaderboard_scope(scope)
+    if user_id not in board:
+        raise HTTPException(status_code=404, detail="User is not in this group")
+    points, apples = leaderboard.score(user_id)
+    return {
+        "scope": scope,
+        "rank": board.rank(user_id),
+        "total_users": len(board),
+        "points": points,
+        "apples": apples,
+        "around": board.around(user_id, max(0, min(radius, 25)))
+    }
+
+@app.post("/api/leaderboard/groups")
+async def create_friend_group(request: FriendGroupRequest):
+    """Create a friend group with its own leaderboard"""
+    unknown = [member for member in request.member_ids if member not in users_db]
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"Users not found: {', '.join(unknown)}")
+    for member in request.member_ids:
+        leaderboard.add_user(member)
+    group_id = leaderboard.create_group(request.name, request.member_ids)
+    return {"group_id": group_id, "name": request.name, "member_ids": sorted(leaderboard.groups[group_id])}
+
+@app.post("/api/leaderboard/groups/{group_id}/members")
+async def join_friend_group(group_id: str, request: GroupMemberRequest):
+    if group_id not in leaderboard.groups:
+        raise HTTPException(status_code=404, detail="Group not found")
+    if request.user_id not in users_db:
+        raise HTTPException(status_code=404, detail="User not found")
+    leaderboard.add_user(request.user_id)
+    leaderboard.join_group(group_id, request.user_id)
+    return {"group_id": group_id, "member_ids": sorted(leaderboard.groups[group_id])}
+
+@app.delete("/api/leaderboard/groups/{group_id}/members/{user_id}")
+async def leave_friend_group(group_id: str, user_id: str):
+    if group_id not in leaderboard.groups:
+        raise HTTPException(status_code=404, detail="Group not found")
+    leaderboard.leave_group(group_id, user_id)
+    return {"group_id": group_id, "member_ids": sorted(leaderboard.groups[group_id])}
+
+# ============================================================================
+# ACTIVITY FEED
+# ============================================================================
+
+class FollowRequest(BaseModel):
+    user_id: str
+
+@app.get("/api/feed/{user_id}")
+async def get_feed(user_id: str, cursor: Optional[str] = None, limit: int = 20):
+    """
+    Activity of the user and the people they follow, newest first.
+    Pass next_cursor back as cursor for older events.
+    """
+    if user_id not in users_db:
+        raise HTTPException(status_code=404, detail="User not found")
+    try:
+        after = decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if after is not None and (len(after) != 1 or not isinstance(after[0], int)):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    events, next_sequence = activity_feed.read(user_id, after[0] if after else None, clamp_limit(limit))
+    return {
+        "events": events,
+        "next_cursor": encode_cursor([next_sequence]) if next_sequence is not None else None
+    }
+
+@app.post("/api/feed/{user_id}/follow")
+async def follow_user(user_id: str, request: FollowRequest):
+    """Follow another user; their new activity shows up in this user's feed"""
+    if user_id not in users_db or request.user_id not in users_db:
+        raise HTTPException(status_code=404, detail="User not found")
+    if request.user_id == user_id:
+        raise HTTPException(status_code=400, detail="Users cannot follow themselves")
+    activity_feed.follow(user_id, request.user_id)
+    return {"user_id": user_id, "following": sorted(activity_feed.following(user_id))}
+
+@app.delete("/api/feed/{user_id}/follow/{author_id}")
+async def unfollow_user(user_id: str, author_id: str):
+    if user_id not in users_db:
+        raise HTTPException(status_code=404, detail="User not found")
+    activity_feed.unfollow(user_id, author_id)
+    return {"user_id": user_id, "following": sorted(activity_feed.following(user_id))}
+
+# ============================================================================
+# BOOTSTRAP
+# ============================================================================
+
+# Dashboard query parameters when none are given, so bootstrap shares the plain /api/dashboard cache entry
+_DASHBOARD_DEFAULT_PARAMS = (False, None, None, None, None, None, None)
+
+# Section name -> (cache entry name, resources it is built from, builder)
+BOOTSTRAP_SECTIONS = {
+    "dashboard": ("dashboard", ("goals", "missions"), lambda user_id: _dashboard_payload(user_id)),
+    "goals": ("goals", ("goals",), lambda user_id: {"goals": goals_db.get(user_id, [])}),
+    "budget": ("budget", ("report",), lambda user_id: _budget_payload(user_id)),
+    "credit": ("credit_chat", ("credit",), lambda user_id: {
+        "conversation_history": credit_conversations_db.get(user_id, []),
+        "finalized_stack": credit_stacks_db.get(user_id, None)
+    }),
+    "missions": ("missions", ("missions",), lambda user_id: {"missions": _filter_missions(user_id), "next_cursor": None}),
+}
+
+@app.get("/api/bootstrap/{user_id}")
+async def get_bootstrap(user_id: str, include: Optional[str] = None):
+    """
+    Everything the frontend loads on startup in one response: the dashboard,
+    goals, budget, credit conversation and missions, each shaped exactly as
+    its own endpoint returns it. include= picks sections (e.g.
+    include=dashboard,budget); all are returned by default.
+
+    Each section comes from the same response cache entry as its endpoint,
+    so only sections whose data changed are rebuilt, and the cached bytes
+    are spliced into the body without decoding or re-encoding them.
+    """
+    if user_id not in users_db:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    sections = list(BOOTSTRAP_SECTIONS) if not include else [s.strip() for s in include.split(",") if s.strip()]
+    unknown = [section for section in sections if section not in BOOTSTRAP_SECTIONS]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown sections {', '.join(unknown)}; choose from {', '.join(BOOTSTRAP_SECTIONS)}"
+        )
+    
+    # Every builder reads in-memory state without awaiting, so running them concurrently would gain nothing
+    parts = []
+    for section in dict.fromkeys(sections):
+        name, depends, build = BOOTSTRAP_SECTIONS[section]
+        params = _DASHBOARD_DEFAULT_PARAMS + (streak_engine.today(user_id),) if section == "dashboard" else ()
+        body = response_cache.get_or_build(user_id, name, depends, lambda: build(user_id), params=params)
+        parts.append(b'"' + section.encode() + b'":' + body)
+    return Response(content=b"{" + b",".join(parts) + b"}", media_type="application/json")
+
+# ============================================================================
+# DATA EXPORT
+# ============================================================================
+
+def _export_response(user_id: str, kind: str, export_format: str, chunks) -> StreamingResponse:
+    """Stream an export as a file download; the generator runs in the threadpool as the client reads"""
+    return StreamingResponse(
+        chunks,
+        media_type=MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{user_id}_{kind}.{export_format}"'}
+    )
+
+def _check_export(user_id: str, export_format: str, from_date: Optional[date], to_date: Optional[date], formats=EXPORT_FORMATS):
+    if user_id not in users_db:
+        raise HTTPException(status_code=404, detail="User not found")
+    if export_format not in formats:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(formats)}")
+    if from_date and to_date and from_date > to_date:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+
+@app.get("/api/export/{user_id}/transactions")
+async def export_transactions(
+    user_id: str,
+    export_format: str = Query("csv", alias="format"),
+    from_date: Optional[date] = Query(None, alias="from"),
+    to_date: Optional[date] = Query(None, alias="to")
+):
+    """
+    Download a user's transactions, oldest first, as CSV, JSON lines or Parquet.
+    Rows are read through the date index and encoded in chunks while they are
+    sent, so the export never holds more than a chunk in memory.
+    """
+    _check_export(user_id, export_format, from_date, to_date)
+    if export_format == "parquet" and not DataExport.parquet_available():
+        raise HTTPException(status_code=400, detail="Parquet export needs the pyarrow package")
+    
+    spending_report = spending_reports_db.get(user_id)
+    if spending_report is None:
+        transactions = iter(())
+    else:
+        transactions = _transaction_index(user_id).in_date_range(from_date, to_date)
+    
+    if export_format == "parquet":
+        chunks = DataExport.transactions_parquet(transactions)
+    else:
+        chunks = getattr(DataExport, export_format)(transactions, TRANSACTION_COLUMNS)
+    return _export_response(user_id, "transactions", export_format, chunks)
+
+@app.get("/api/export/{user_id}/missions")
+async def export_missions(
+    user_id: str,
+    export_format: str = Query("csv", alias="format"),
+    from_date: Optional[date] = Query(None, alias="from"),  # Filters on the mission deadline
+    to_date: Optional[date] = Query(None, alias="to")
+):
+    """Download a user's missions across all goals as CSV or JSON lines"""
+    _check_export(user_id, export_format, from_date, to_date, formats=("csv", "jsonl"))
+    missions = (
+        mission
+        for goal_missions in list(missions_db.get(user_id, {}).values())
+        for mission in goal_missions
+    )
+    missions = DataExport.in_range(missions, lambda m: m.deadline, from_date, to_date)
+    chunks = getattr(DataExport, export_format)(missions, MISSION_COLUMNS)
+    return _export_response(user_id, "missions", export_format, chunks)
+
+@app.get("/api/export/{user_id}/goals")
+async def export_goals(
+    user_id: str,
+    export_format: str = Query("csv", alias="format"),
+    from_date: Optional[date] = Query(None, alias="from"),  # Filters on the goal target date
+    to_date: Optional[date] = Query(None, alias="to")
+):
+    """Download a user's goals as CSV or JSON lines"""
+    _check_export(user_id, export_format, from_date, to_date, formats=("csv", "jsonl"))
+    goals = DataExport.in_range(list(goals_db.get(user_id, [])), lambda g: g.target_date, from_date, to_date)
+    chunks = getattr(DataExport, export_format)(goals, GOAL_COLUMNS)
+    return _export_response(user_id, "goals", export_format, chunks)
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """
+    Prometheus scrape endpoint: request latency per route, LLM latency, tokens
+    and failures per agent method, Comprehend batches, cache hits and background jobs.
+    """
+    return Response(content=metrics.render(), media_type="text/plain; version=0.0.4")
+
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
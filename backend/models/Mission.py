@@ -14,5 +14,6 @@ class Mission(BaseModel):
     points: int
     status: str = "active"  # active, completed, failed
     created_at: datetime = Field(default_factory=datetime.now)
+    completed_at: Optional[datetime] = None  # When status last became completed, timezone-aware UTC
     goal_id: Optional[str] = None  # Link to the financial goal this mission supports
     milestone_percent: Optional[int] = None  # If this is a milestone mission (25, 50, 75, 100)
@@ -3,6 +3,8 @@ from enum import Enum
 class MissionType(str, Enum):
     SAVINGS = "savings"
     SPENDING = "spending"
+    SPENDING_REDUCTION = "spending_reduction"
+    CHALLENGE = "challenge"
     INVESTMENT = "investment"
     DEBT = "debt"
     LEARNING = "learning"
\ No newline at end of file
@@ -5,6 +5,7 @@ class SocialFeed(BaseModel):
     feed_id: str
     user_id: str
     username: str
-    activity_type: str  # streak_milestone, mission_complete, level_up
+    activity_type: str  # streak_milestone, mission_complete, mission_expired, goal_complete, level_up
     message: str
     timestamp: datetime = Field(default_factory=datetime.now)
+    sequence: int = 0  # Global publish order, newest highest; feed pages are cursored on it
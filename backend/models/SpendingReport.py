@@ -1,7 +1,9 @@
 from dataclasses import dataclass, field
-from typing import List, Dict
+from typing import List, Dict, Optional
+from datetime import date
 from models.SpendingInsight import SpendingInsight
 from models.Transaction import Transaction
+from services.SpendingRollup import SpendingRollup
 
 @dataclass
 class SpendingReport:
@@ -16,3 +18,13 @@ class SpendingReport:
     insights: List[SpendingInsight] = field(default_factory=list)
     optimization_score: float = 0.0
     transactions: List[Transaction] = field(default_factory=list)
+    period_start: Optional[date] = None
+    period_end: Optional[date] = None
+    # Transactions matched as transfers between the user's accounts
+    transfer_count: int = 0
+    # Occurrence count per transaction fingerprint, used to drop overlaps on merge
+    fingerprints: Dict[str, int] = field(default_factory=dict)
+    # Expense transactions grouped by merchant key, for incremental recurring charge detection
+    merchant_groups: Dict[str, List[Transaction]] = field(default_factory=dict)
+    # Daily per-category buckets with prefix sums for time series queries
+    rollup: SpendingRollup = field(default_factory=SpendingRollup)
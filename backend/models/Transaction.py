@@ -8,3 +8,5 @@ class Transaction(BaseModel):
     amount: float
     category: str
     merchant: Optional[str] = None
+    account: Optional[str] = None  # Statement the row came from, e.g. "checking" or "visa"
+    is_transfer: bool = False  # Money moved between the user's own accounts, left out of totals
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from datetime import datetime, date
 
 class UserProfile(BaseModel):
@@ -7,4 +7,5 @@ class UserProfile(BaseModel):
     age: int
     annual_income: float
     debts: List[Dict[str, Any]]
-    created_at: datetime = Field(default_factory=datetime.now)
\ No newline at end of file
+    created_at: datetime = Field(default_factory=datetime.now)
+    timezone: Optional[str] = None  # IANA name for streak day boundaries, e.g. "America/New_York"
\ No newline at end of file
@@ -0,0 +1,168 @@
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+import heapq
+import itertools
+import os
+import uuid
+from models.SocialFeed import SocialFeed
+
+# Events kept per user inbox and per author outbox; older ones are overwritten
+FEED_CAPACITY = int(os.environ.get('FEED_CAPACITY', '200'))
+# Authors with more followers than this are not fanned out; readers merge their outbox instead
+FANOUT_FOLLOWER_LIMIT = int(os.environ.get('FANOUT_FOLLOWER_LIMIT', '1000'))
+
+
+class RingBuffer:
+    """
+    Fixed-capacity buffer of events in ascending sequence order. Appending
+    past capacity overwrites the oldest event, so memory per buffer is
+    bounded no matter how much is published.
+    """
+
+    def __init__(self, capacity: int = FEED_CAPACITY):
+        self._slots: List[Optional[SocialFeed]] = [None] * capacity
+        self._start = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, i: int) -> SocialFeed:
+        """i-th event from the oldest one kept"""
+        return self._slots[(self._start + i) % len(self._slots)]
+
+    def append(self, event: SocialFeed) -> None:
+        capacity = len(self._slots)
+        if self._size < capacity:
+            self._slots[(self._start + self._size) % capacity] = event
+            self._size += 1
+        else:
+            self._slots[self._start] = event
+            self._start = (self._start + 1) % capacity
+
+    def discard(self, predicate: Callable[[SocialFeed], bool]) -> None:
+        """Drop the events matching predicate, keeping the rest in order"""
+        kept = [event for event in (self[i] for i in range(self._size)) if not predicate(event)]
+        self._slots = kept + [None] * (len(self._slots) - len(kept))
+        self._start = 0
+        self._size = len(kept)
+
+    def newest_before(self, sequence: Optional[int]) -> Iterator[SocialFeed]:
+        """Events newest first, starting below sequence (from the newest when None)"""
+        low, high = 0, self._size
+        if sequence is not None:
+            while low < high:  # Binary search for the first event at or after sequence
+                middle = (low + high) // 2
+                if self[middle].sequence < sequence:
+                    low = middle + 1
+                else:
+                    high = middle
+            high = low
+        for i in range(high - 1, -1, -1):
+            yield self[i]
+
+
+class ActivityFeed:
+    """
+    Social activity feed with bounded memory and reads proportional to the
+    page size.
+
+    Every author has an outbox of their own events. Publishing also copies
+    the event into the inbox of each follower (fan-out on write) unless the
+    author has more than FANOUT_FOLLOWER_LIMIT followers at that moment;
+    such events go to the author's broadcast buffer instead, which their
+    followers merge in when they read. Whether an event was fanned out is
+    decided once when it is published, so an author crossing the limit
+    later neither hides nor duplicates it. Unfollowing removes the author's
+    events from the follower's inbox.
+    A read is a k-way heap merge of the reader's inbox, their own outbox and
+    the broadcast buffers of the authors they follow, newest first,
+    stopping after one page. Events carry a global sequence number that
+    orders them and serves as the pagination cursor.
+    """
+
+    def __init__(self, capacity: int = FEED_CAPACITY, fanout_limit: int = FANOUT_FOLLOWER_LIMIT):
+        self.capacity = capacity
+        self.fanout_limit = fanout_limit
+        self._sequence = itertools.count(1)
+        self._inboxes: Dict[str, RingBuffer] = {}
+        self._outboxes: Dict[str, RingBuffer] = {}
+        self._broadcasts: Dict[str, RingBuffer] = {}  # author -> events that were not fanned out
+        self._followers: Dict[str, Set[str]] = {}   # author -> followers
+        self._following: Dict[str, Set[str]] = {}   # follower -> authors
+
+    def _buffer(self, buffers: Dict[str, RingBuffer], user_id: str) -> RingBuffer:
+        buffer = buffers.get(user_id)
+        if buffer is None:
+            buffer = buffers[user_id] = RingBuffer(self.capacity)
+        return buffer
+
+    def _fans_out(self, author_id: str) -> bool:
+        return len(self._followers.get(author_id, ())) <= self.fanout_limit
+
+    def publish(self, user_id: str, activity_type: str, message: str) -> SocialFeed:
+        """Record an event by user_id and deliver it to their followers"""
+        sequence = next(self._sequence)
+        event = SocialFeed(
+            feed_id=f"feed_{uuid.uuid4().hex[:12]}",
+            user_id=user_id,
+            username=user_id,
+            activity_type=activity_type,
+            message=message,
+            sequence=sequence
+        )
+        self._buffer(self._outboxes, user_id).append(event)
+        if self._fans_out(user_id):
+            for follower_id in self._followers.get(user_id, ()):
+                self._buffer(self._inboxes, follower_id).append(event)
+        else:
+            self._buffer(self._broadcasts, user_id).append(event)
+        return event
+
+    def follow(self, follower_id: str, author_id: str) -> None:
+        """Follow an author; their events from now on appear in the follower's feed"""
+        if follower_id == author_id:
+            return
+        self._followers.setdefault(author_id, set()).add(follower_id)
+        self._following.setdefault(follower_id, set()).add(author_id)
+
+    def unfollow(self, follower_id: str, author_id: str) -> None:
+        """Stop following an author and drop their fanned-out events from the follower's inbox"""
+        self._followers.get(author_id, set()).discard(follower_id)
+        self._following.get(follower_id, set()).discard(author_id)
+        inbox = self._inboxes.get(follower_id)
+        if inbox is not None:
+            inbox.discard(lambda event: event.user_id == author_id)
+
+    def following(self, user_id: str) -> Set[str]:
+        return self._following.get(user_id, set())
+
+    def followers(self, user_id: str) -> Set[str]:
+        return self._followers.get(user_id, set())
+
+    def read(self, user_id: str, before: Optional[int] = None, limit: int = 20) -> Tuple[List[SocialFeed], Optional[int]]:
+        """
+        One page of a user's feed, newest first, with events older than the
+        sequence before. Returns the events and the sequence to pass as before
+        for the next page, or None on the last page.
+        """
+        sources = [
+            buffers[owner_id].newest_before(before)
+            for buffers, owner_id in itertools.chain(
+                ((self._inboxes, user_id), (self._outboxes, user_id)),
+                ((self._broadcasts, author_id) for author_id in self._following.get(user_id, ()))
+            )
+            if owner_id in buffers
+        ]
+
+        page: List[SocialFeed] = []
+        has_more = False
+        for event in heapq.merge(*sources, key=lambda e: e.sequence, reverse=True):
+            if len(page) == limit:
+                has_more = True
+                break
+            page.append(event)
+        return page, page[-1].sequence if has_more else None
+
+
+# Published to from main.py wherever missions and goals are completed
+activity_feed = ActivityFeed()
@@ -0,0 +1,298 @@
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Sequence, Tuple
+from datetime import date, datetime
+
+# Column name synonyms used when no built-in profile matches (all lowercase)
+DATE_COLUMNS = ('date', 'transaction date', 'trans. date', 'posting date', 'posted date', 'post date')
+DESCRIPTION_COLUMNS = ('description', 'memo', 'payee', 'name', 'merchant', 'details')
+AMOUNT_COLUMNS = ('amount', 'transaction amount', 'amount (usd)')
+DEBIT_COLUMNS = ('debit', 'withdrawal', 'withdrawals', 'money out')
+CREDIT_COLUMNS = ('credit', 'deposit', 'deposits', 'money in')
+CATEGORY_COLUMNS = ('category',)
+TYPE_COLUMNS = ('type', 'transaction type')
+
+# Candidate date formats, in order of preference when several fit the sample
+DATE_FORMATS = ('%Y-%m-%d', '%m/%d/%Y', '%m/%d/%y', '%d/%m/%Y', '%Y/%m/%d',
+                '%m-%d-%Y', '%d-%b-%Y', '%d %b %Y', '%b %d, %Y', '%Y%m%d')
+
+DEBIT_TYPES = {'debit', 'dr', 'sale', 'purchase', 'withdrawal', 'payment', 'fee', 'check'}
+
+_AMOUNT_JUNK = str.maketrans('', '', '$, \u00a0"')
+
+RowParser = Callable[[List[str]], Tuple[date, str, float, str]]
+
+
+@dataclass(frozen=True)
+class BankProfile:
+    """Known export layout for a bank. Column names are matched case-insensitively."""
+    name: str
+    signature: Tuple[str, ...]          # Header columns that identify this export
+    date_column: str = ''
+    description_column: str = ''
+    amount_column: str = ''
+    debit_column: str = ''
+    credit_column: str = ''
+    category_column: str = ''
+    date_format: str = ''
+    amount_sign: int = 1                # -1 when charges are exported as positive numbers
+    headerless: bool = False
+
+
+BUILTIN_PROFILES = [
+    BankProfile(
+        name='chase_card',
+        signature=('transaction date', 'post date', 'description', 'category', 'type', 'amount'),
+        date_column='transaction date', description_column='description',
+        amount_column='amount', category_column='category', date_format='%m/%d/%Y',
+    ),
+    BankProfile(
+        name='chase_checking',
+        signature=('details', 'posting date', 'description', 'amount', 'type', 'balance'),
+        date_column='posting date', description_column='description',
+        amount_column='amount', date_format='%m/%d/%Y',
+    ),
+    BankProfile(
+        name='bank_of_america',
+        signature=('date', 'description', 'amount', 'running bal.'),
+        date_column='date', description_column='description',
+        amount_column='amount', date_format='%m/%d/%Y',
+    ),
+    BankProfile(
+        name='capital_one',
+        signature=('transaction date', 'posted date', 'card no.', 'description', 'category', 'debit', 'credit'),
+        date_column='transaction date', description_column='description',
+        debit_column='debit', credit_column='credit', category_column='category', date_format='%Y-%m-%d',
+    ),
+    BankProfile(
+        name='amex',
+        signature=('date', 'description', 'card member', 'amount'),
+        date_column='date', description_column='description',
+        amount_column='amount', date_format='%m/%d/%Y', amount_sign=-1,
+    ),
+    BankProfile(
+        name='discover',
+        signature=('trans. date', 'post date', 'description', 'amount', 'category'),
+        date_column='trans. date', description_column='description',
+        amount_column='amount', category_column='category', date_format='%m/%d/%Y', amount_sign=-1,
+    ),
+    BankProfile(
+        # Wells Fargo exports have no header: date, amount, *, check number, description
+        name='wells_fargo',
+        signature=(),
+        date_format='%m/%d/%Y',
+        headerless=True,
+    ),
+]
+
+
+def parse_amount(value: str) -> float:
+    """Parse '$1,234.56', '-12.00' or '(12.00)' without per-character replace chains"""
+    value = value.translate(_AMOUNT_JUNK)
+    if value[:1] == '(':
+        return -float(value[1:-1])
+    return float(value)
+
+
+def _date_parser(fmt: str) -> Callable[[str], date]:
+    """Return the fastest parser for a date format, avoiding strptime for the common ones"""
+    if fmt == '%Y-%m-%d':
+        return lambda s: date.fromisoformat(s[:10])
+    if fmt in ('%m/%d/%Y', '%m/%d/%y'):
+        def parse_mdy(s: str) -> date:
+            month, day, year = s.split('/')
+            year = int(year[:4])
+            return date(year + 2000 if year < 100 else year, int(month), int(day))
+        return parse_mdy
+    if fmt == '%d/%m/%Y':
+        def parse_dmy(s: str) -> date:
+            day, month, year = s.split('/')
+            return date(int(year[:4]), int(month), int(day))
+        return parse_dmy
+    return lambda s: datetime.strptime(s, fmt).date()
+
+
+def sniff_date_format(values: Sequence[str], preferred: str = '') -> str:
+    """Pick the format that parses the most sampled values, preferring earlier candidates on ties"""
+    values = [v.strip() for v in values if v and v.strip()]
+    if not values:
+        raise ValueError("No date values to sniff")
+    candidates = ((preferred,) if preferred else ()) + DATE_FORMATS
+    best_format, best_count = None, 0
+    for fmt in candidates:
+        count = 0
+        for value in values:
+            try:
+                datetime.strptime(value[:10] if fmt == '%Y-%m-%d' else value, fmt)
+                count += 1
+            except ValueError:
+                pass
+        if count == len(values):
+            return fmt
+        if count > best_count:
+            best_format, best_count = fmt, count
+    # Tolerate a few malformed rows in the sample, but not a wrong guess
+    if best_format is None or best_count < len(values) * 0.8:
+        raise ValueError(f"Could not detect date format from values like {values[:3]}")
+    return best_format
+
+
+class CsvSchema:
+    """
+    Column mapping, date format and sign convention for one CSV file.
+
+    Resolved once from the header and a sample of rows, then bound into a
+    single row parser so the per-row work is just indexing and conversion.
+    """
+
+    SAMPLE_SIZE = 50
+
+    def __init__(self, profile: str, date_index: int, description_index: int, date_format: str,
+                 amount_index: int = -1, debit_index: int = -1, credit_index: int = -1,
+                 category_index: int = -1, type_index: int = -1, amount_sign: int = 1,
+                 headerless: bool = False):
+        self.profile = profile
+        self.date_index = date_index
+        self.description_index = description_index
+        self.date_format = date_format
+        self.amount_index = amount_index
+        self.debit_index = debit_index
+        self.credit_index = credit_index
+        self.category_index = category_index
+        self.type_index = type_index
+        self.amount_sign = amount_sign
+        self.headerless = headerless
+        # Rows shorter than this (blank lines, footers) cannot be parsed
+        self.width = max(date_index, description_index, amount_index, debit_index,
+                         credit_index, category_index, type_index) + 1
+
+    @staticmethod
+    def _find(header: List[str], names: Sequence[str]) -> int:
+        for name in names:
+            if name in header:
+                return header.index(name)
+        return -1
+
+    @staticmethod
+    def _looks_like_date(value: str) -> bool:
+        try:
+            sniff_date_format([value])
+            return True
+        except ValueError:
+            return False
+
+    @staticmethod
+    def _sample_amounts(sample: List[List[str]], index: int) -> Optional[List[float]]:
+        """
+        Parsed amounts of a column in the sample rows, None if it is not an
+        amount column. A few bad values ("Pending") are tolerated like in
+        sniff_date_format; the row parser skips those rows later.
+        """
+        values = [r[index] for r in sample if len(r) > index and r[index].strip()]
+        amounts = []
+        for value in values:
+            try:
+                amounts.append(parse_amount(value))
+            except ValueError:
+                pass
+        if len(amounts) < len(values) * 0.8:
+            return None
+        return amounts
+
+    @classmethod
+    def detect(cls, header: List[str], sample: List[List[str]]) -> 'CsvSchema':
+        """Resolve the schema from the header row and a sample of data rows"""
+        normalized = [column.strip().lower().lstrip('\ufeff') for column in header]
+
+        if normalized and cls._looks_like_date(normalized[0]):
+            # No header row: the "header" is the first transaction (Wells Fargo layout)
+            profile = next(p for p in BUILTIN_PROFILES if p.headerless)
+            rows = [header] + sample
+            date_format = sniff_date_format([r[0] for r in rows], profile.date_format)
+            return cls(profile.name, date_index=0, description_index=len(header) - 1,
+                       date_format=date_format, amount_index=1, headerless=True)
+
+        header_set = set(normalized)
+        profile = next(
+            (p for p in BUILTIN_PROFILES if p.signature and header_set.issuperset(p.signature)),
+            None
+        )
+        if profile:
+            date_index = normalized.index(profile.date_column)
+            description_index = normalized.index(profile.description_column)
+            amount_index = normalized.index(profile.amount_column) if profile.amount_column else -1
+            debit_index = normalized.index(profile.debit_column) if profile.debit_column else -1
+            credit_index = normalized.index(profile.credit_column) if profile.credit_column else -1
+            category_index = normalized.index(profile.category_column) if profile.category_column else -1
+            type_index = -1
+            amount_sign = profile.amount_sign
+            name = profile.name
+            preferred_format = profile.date_format
+        else:
+            name = 'generic'
+            date_index = cls._find(normalized, DATE_COLUMNS)
+            description_index = cls._find(normalized, DESCRIPTION_COLUMNS)
+            amount_index = cls._find(normalized, AMOUNT_COLUMNS)
+            debit_index = cls._find(normalized, DEBIT_COLUMNS)
+            credit_index = cls._find(normalized, CREDIT_COLUMNS)
+            category_index = cls._find(normalized, CATEGORY_COLUMNS)
+            type_index = cls._find(normalized, TYPE_COLUMNS)
+            amount_sign = 1
+            preferred_format = ''
+            amounts = cls._sample_amounts(sample, amount_index) if amount_index >= 0 else None
+            if amounts is None:
+                amount_index = -1  # Named like an amount column but holds something else
+            if date_index < 0 or (amount_index < 0 and debit_index < 0 and credit_index < 0):
+                raise ValueError(f"Could not find date and amount columns in CSV header: {header}")
+            if amount_index >= 0:
+                debit_index = credit_index = -1
+                # Unsigned amounts with a debit/credit type column take their sign from the type
+                if type_index < 0 or any(a < 0 for a in amounts):
+                    type_index = -1
+
+        date_format = sniff_date_format(
+            [r[date_index] for r in sample if len(r) > date_index], preferred_format
+        )
+        return cls(name, date_index=date_index, description_index=description_index,
+                   date_format=date_format, amount_index=amount_index, debit_index=debit_index,
+                   credit_index=credit_index, category_index=category_index,
+                   type_index=type_index, amount_sign=amount_sign)
+
+    def bind(self) -> RowParser:
+        """Build the single row parser for this file"""
+        parse_date = _date_parser(self.date_format)
+        date_index = self.date_index
+        description_index = self.description_index
+        category_index = self.category_index
+        amount_index = self.amount_index
+        debit_index = self.debit_index
+        credit_index = self.credit_index
+        type_index = self.type_index
+        sign = self.amount_sign
+
+        if amount_index >= 0 and type_index >= 0:
+            def parse_row_amount(row):
+                amount = abs(parse_amount(row[amount_index]))
+                return -amount if row[type_index].strip().lower() in DEBIT_TYPES else amount
+        elif amount_index >= 0 and sign == 1:
+            def parse_row_amount(row):
+                return parse_amount(row[amount_index])
+        elif amount_index >= 0:
+            def parse_row_amount(row):
+                return -parse_amount(row[amount_index])
+        else:
+            def parse_row_amount(row):
+                debit = row[debit_index].strip() if debit_index >= 0 else ''
+                credit = row[credit_index].strip() if credit_index >= 0 else ''
+                if not debit and not credit:
+                    raise ValueError("Row has neither a debit nor a credit amount")
+                return (abs(parse_amount(credit)) if credit else 0.0) - (abs(parse_amount(debit)) if debit else 0.0)
+
+        def parse_row(row: List[str]) -> Tuple[date, str, float, str]:
+            return (
+                parse_date(row[date_index].strip()),
+                row[description_index].strip() if description_index >= 0 else '',
+                parse_row_amount(row),
+                row[category_index].strip() if category_index >= 0 else '',
+            )
+
+        return parse_row
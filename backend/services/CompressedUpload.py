@@ -0,0 +1,114 @@
+from typing import BinaryIO, Optional
+import gzip
+import io
+import os
+import zipfile
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # zstd uploads are optional, gzip and zip need only the standard library
+    zstandard = None
+
+_GZIP_MAGIC = b'\x1f\x8b'
+_ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+_ZIP_MAGIC = b'PK\x03\x04'
+# Members of a zip archive that can hold a statement, in order of preference
+STATEMENT_EXTENSIONS = ('.csv', '.txt', '.pdf')
+# Most a compressed upload may inflate to, so a small upload cannot expand into unbounded memory
+MAX_INFLATED_BYTES = int(float(os.environ.get('MAX_INFLATED_MB', '200')) * 1024 * 1024)
+
+# What corrupt or truncated archives raise while being opened or read
+_CORRUPT = (EOFError, OSError, zlib.error, zipfile.BadZipFile, NotImplementedError) + \
+    ((zstandard.ZstdError,) if zstandard is not None else ())
+
+
+class _InflateGuard(io.RawIOBase):
+    """
+    Read-through wrapper around a decompressing stream that stops after
+    limit bytes and reports corrupt input as ValueError, which callers
+    already answer with 400.
+    """
+
+    def __init__(self, stream: BinaryIO, limit: int):
+        self._stream = stream
+        self._remaining = limit
+        self._limit = limit
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        try:
+            count = self._stream.readinto(buffer)
+        except _CORRUPT as e:
+            raise ValueError(f"Compressed upload is corrupt: {e}") from e
+        self._remaining -= count or 0
+        if self._remaining < 0:
+            raise ValueError(f"Upload inflates to more than {self._limit // (1024 * 1024)} MB")
+        return count
+
+    def close(self) -> None:
+        self._stream.close()
+        super().close()
+
+
+class CompressedUpload:
+    """
+    Open uploaded statements that may be gzip, zstd or zip compressed as a
+    binary stream that decompresses as it is read. Only the compressed upload
+    is held in memory; the CSV parser pulls decompressed text a buffer at a
+    time.
+    """
+
+    @staticmethod
+    def detect(content: bytes) -> Optional[str]:
+        """"gzip", "zstd" or "zip" from the magic bytes, None for an uncompressed file"""
+        if content[:2] == _GZIP_MAGIC:
+            return "gzip"
+        if content[:4] == _ZSTD_MAGIC:
+            return "zstd"
+        if content[:4] == _ZIP_MAGIC:
+            return "zip"
+        return None
+
+    @staticmethod
+    def open(content: bytes, max_inflated: int = MAX_INFLATED_BYTES) -> BinaryIO:
+        """
+        A readable stream of the decompressed statement, buffered so callers
+        can peek() at the first bytes. Reading raises ValueError once more
+        than max_inflated bytes come out, or when the archive is corrupt.
+
+        Raises:
+            ValueError: zstd without the zstandard package, a corrupt archive,
+                a zip with no statement in it or one larger than max_inflated
+        """
+        raw = io.BytesIO(content)
+        kind = CompressedUpload.detect(content)
+        if kind == "gzip":
+            return io.BufferedReader(_InflateGuard(gzip.GzipFile(fileobj=raw, mode='rb'), max_inflated))
+        if kind == "zstd":
+            if zstandard is None:
+                raise ValueError("zstd compressed uploads need the zstandard package")
+            return io.BufferedReader(_InflateGuard(zstandard.ZstdDecompressor().stream_reader(raw), max_inflated))
+        if kind == "zip":
+            try:
+                archive = zipfile.ZipFile(raw)
+            except _CORRUPT as e:
+                raise ValueError(f"Compressed upload is corrupt: {e}") from e
+            members = [
+                info for info in archive.infolist()
+                if not info.is_dir() and not info.filename.rsplit('/', 1)[-1].startswith('.')
+            ]
+            for extension in STATEMENT_EXTENSIONS:
+                for info in members:
+                    if info.filename.lower().endswith(extension):
+                        if info.file_size > max_inflated:
+                            raise ValueError(f"{info.filename} inflates to more than {max_inflated // (1024 * 1024)} MB")
+                        try:
+                            member = archive.open(info)
+                        except _CORRUPT as e:
+                            raise ValueError(f"Compressed upload is corrupt: {e}") from e
+                        return io.BufferedReader(_InflateGuard(member, max_inflated))
+            raise ValueError("zip upload contains no CSV or PDF statement")
+        return io.BufferedReader(raw)
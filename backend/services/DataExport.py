@@ -0,0 +1,178 @@
+from typing import Any, Callable, Iterable, Iterator, List, Sequence, Tuple
+from datetime import date
+import csv
+import io
+from models.Transaction import Transaction
+from models.Mission import Mission
+from models.FinancialGoal import FinancialGoal
+from services.ResponseCache import encode_json
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # Parquet export is optional, CSV and JSON lines need only the standard library
+    pyarrow = None
+
+EXPORT_FORMATS = ("csv", "jsonl", "parquet")
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "jsonl": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+# Rows encoded per chunk sent to the client; bounds memory regardless of export size
+CHUNK_ROWS = 1000
+# Rows per Parquet row group
+PARQUET_ROW_GROUP = 65536
+
+# (column, value of a record) for each export
+TRANSACTION_COLUMNS: List[Tuple[str, Callable[[Transaction], Any]]] = [
+    ("date", lambda t: t.date.isoformat()),
+    ("description", lambda t: t.description),
+    ("amount", lambda t: t.amount),
+    ("category", lambda t: t.category),
+    ("merchant", lambda t: t.merchant),
+    ("account", lambda t: t.account),
+    ("is_transfer", lambda t: t.is_transfer),
+]
+MISSION_COLUMNS: List[Tuple[str, Callable[[Mission], Any]]] = [
+    ("mission_id", lambda m: m.mission_id),
+    ("goal_id", lambda m: m.goal_id),
+    ("title", lambda m: m.title),
+    ("description", lambda m: m.description),
+    ("mission_type", lambda m: m.mission_type.value),
+    ("target_value", lambda m: m.target_value),
+    ("deadline", lambda m: m.deadline.isoformat()),
+    ("points", lambda m: m.points),
+    ("status", lambda m: m.status),
+    ("created_at", lambda m: m.created_at.isoformat()),
+    ("completed_at", lambda m: m.completed_at.isoformat() if m.completed_at else None),
+    ("milestone_percent", lambda m: m.milestone_percent),
+]
+GOAL_COLUMNS: List[Tuple[str, Callable[[FinancialGoal], Any]]] = [
+    ("goal_id", lambda g: g.goal_id),
+    ("title", lambda g: g.title),
+    ("description", lambda g: g.description),
+    ("target_amount", lambda g: g.target_amount),
+    ("current_amount", lambda g: g.current_amount),
+    ("target_date", lambda g: g.target_date.isoformat()),
+    ("priority", lambda g: g.priority),
+    ("category", lambda g: g.category),
+    ("on_roadmap", lambda g: g.on_roadmap),
+]
+
+
+class _ChunkSink:
+    """Write-only file object that collects what the Parquet writer emits until it is drained"""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def writable(self) -> bool:
+        return True
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+class DataExport:
+    """
+    Encoders that turn an iterable of records into a stream of byte chunks
+    for StreamingResponse. Records are pulled lazily and encoded CHUNK_ROWS
+    at a time, so memory stays flat however many rows a user has.
+    """
+
+    @staticmethod
+    def csv(records: Iterable, columns: Sequence[Tuple[str, Callable]]) -> Iterator[bytes]:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow([name for name, _ in columns])
+        getters = [getter for _, getter in columns]
+        count = 0
+        for record in records:
+            writer.writerow(["" if value is None else value for value in (getter(record) for getter in getters)])
+            count += 1
+            if count % CHUNK_ROWS == 0:
+                yield buffer.getvalue().encode()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue().encode()
+
+    @staticmethod
+    def jsonl(records: Iterable, columns: Sequence[Tuple[str, Callable]]) -> Iterator[bytes]:
+        lines = []
+        for record in records:
+            lines.append(encode_json({name: getter(record) for name, getter in columns}))
+            if len(lines) == CHUNK_ROWS:
+                yield b"\n".join(lines) + b"\n"
+                lines = []
+        if lines:
+            yield b"\n".join(lines) + b"\n"
+
+    @staticmethod
+    def parquet_available() -> bool:
+        return pyarrow is not None
+
+    @staticmethod
+    def transactions_parquet(transactions: Iterable[Transaction]) -> Iterator[bytes]:
+        """Transactions as a Parquet file, written and sent one row group at a time"""
+        schema = pyarrow.schema([
+            ("date", pyarrow.date32()),
+            ("description", pyarrow.string()),
+            ("amount", pyarrow.float64()),
+            ("category", pyarrow.string()),
+            ("merchant", pyarrow.string()),
+            ("account", pyarrow.string()),
+            ("is_transfer", pyarrow.bool_()),
+        ])
+        sink = _ChunkSink()
+        writer = pyarrow.parquet.ParquetWriter(sink, schema, compression="zstd", use_dictionary=["category", "merchant", "account"])
+
+        def write(batch: List[Transaction]):
+            writer.write_table(pyarrow.Table.from_pydict({
+                "date": [t.date for t in batch],
+                "description": [t.description for t in batch],
+                "amount": [t.amount for t in batch],
+                "category": [t.category for t in batch],
+                "merchant": [t.merchant for t in batch],
+                "account": [t.account for t in batch],
+                "is_transfer": [t.is_transfer for t in batch],
+            }, schema=schema))
+
+        batch = []
+        for transaction in transactions:
+            batch.append(transaction)
+            if len(batch) == PARQUET_ROW_GROUP:
+                write(batch)
+                batch = []
+                yield sink.drain()
+        if batch:
+            write(batch)
+        writer.close()
+        yield sink.drain()
+
+    @staticmethod
+    def in_range(records: Iterable, value: Callable[[Any], date], date_from: date = None,
+                 date_to: date = None) -> Iterator:
+        """Records whose date falls between date_from and date_to inclusive"""
+        for record in records:
+            day = value(record)
+            if (date_from is None or day >= date_from) and (date_to is None or day <= date_to):
+                yield record
@@ -0,0 +1,123 @@
+from typing import Dict, List, Optional
+from contextvars import ContextVar
+from dotenv import load_dotenv
+import asyncio
+import os
+import time
+from dedalus_labs import AsyncDedalus
+from services.Metrics import LLM_SECONDS, LLM_TOKENS, LLM_FAILURES
+from services.ModelRouter import ModelRouter, ModelChoice
+from services.Resilience import Resilience, CircuitOpenError, DeadlineExceeded
+from services.Tracing import span
+
+load_dotenv()
+
+# Routes whose calls send a duplicate request once they run past the model's p95
+HEDGE_TASKS = {task.strip() for task in os.environ.get('LLM_HEDGE_TASKS', 'categorize').split(',') if task.strip()}
+# Extra attempts per model for timeouts, rate limits and 5xx before moving down the chain
+LLM_RETRIES = int(os.environ.get('LLM_RETRIES', '1'))
+
+# Model that answered the latest complete() in the current task, for record_failure
+_served_model: ContextVar[str] = ContextVar('moneytree_served_model', default='unknown')
+
+
+def failure_reason(error: BaseException) -> str:
+    """Short, low-cardinality reason for a failed call"""
+    if isinstance(error, CircuitOpenError):
+        return "circuit_open"
+    if isinstance(error, DeadlineExceeded):
+        return "deadline"
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError)):
+        return "timeout"
+    if isinstance(error, asyncio.CancelledError):
+        return "cancelled"
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return f"http_{status}"
+    return type(error).__name__
+
+
+class LLMClient:
+    """
+    Every chat completion in the agents goes through complete(), which picks
+    the model for the task from ModelRouter, falls back down the route's chain
+    when a model errors, is too slow or has its breaker open, and records
+    latency, token usage, cost and failures per agent method and model.
+    Each call is bounded by the request's deadline (see services.Resilience).
+    """
+
+    @staticmethod
+    async def complete(agent: str, method: str, messages: List[Dict], task: str = "chat",
+                       model: Optional[str] = None, **kwargs):
+        """
+        Create a chat completion and record it.
+
+        Args:
+            agent: Agent class name, e.g. "GoalPlanningAgent"
+            method: Agent method making the call, e.g. "chat"
+            messages: Chat messages
+            task: Route in ModelRouter ("categorize", "extract", "plan" or "chat")
+            model: Pin a single model instead of using the route's chain
+            **kwargs: Passed through to chat.completions.create (mcp_servers, files, ...)
+        """
+        chain = [ModelChoice(model)] if model else ModelRouter.chain(task)
+        for position, choice in enumerate(chain):
+            try:
+                return await LLMClient._complete_with(agent, method, messages, task, choice, **kwargs)
+            except (asyncio.CancelledError, DeadlineExceeded):
+                raise
+            except Exception as e:
+                if position == len(chain) - 1:
+                    raise
+                reason = failure_reason(e)
+                ModelRouter.record_fallback(task, choice.model, reason)
+                print(f"{agent}.{method}: {choice.model} failed ({reason}), falling back to {chain[position + 1].model}")
+
+    @staticmethod
+    def available(task: str) -> bool:
+        """False when every model in the task's chain has its breaker open, so callers can skip straight to a local fallback"""
+        return any(not Resilience.is_open("dedalus", choice.model) for choice in ModelRouter.chain(task))
+
+    @staticmethod
+    async def _complete_with(agent: str, method: str, messages: List[Dict], task: str,
+                             choice: ModelChoice, **kwargs):
+        model = choice.model
+        with span(f"llm.{agent}.{method}", model=model, route=task) as llm_span:
+            client = AsyncDedalus(api_key=os.environ.get("DEDALUS_API_KEY"))
+            start = time.perf_counter()
+            try:
+                chat_completion = await Resilience.call(
+                    "dedalus", model,
+                    lambda: client.chat.completions.create(model=model, messages=messages, **kwargs),
+                    timeout=choice.timeout, retries=LLM_RETRIES, hedge=task in HEDGE_TASKS
+                )
+            except CircuitOpenError as e:
+                LLM_FAILURES.inc(agent, method, model, failure_reason(e))
+                llm_span.set("circuit_open", True)
+                raise
+            except BaseException as e:
+                elapsed = time.perf_counter() - start
+                LLM_SECONDS.observe(elapsed, agent, method, model, "error")
+                LLM_FAILURES.inc(agent, method, model, failure_reason(e))
+                ModelRouter.record(task, model, elapsed, "error")
+                raise
+            elapsed = time.perf_counter() - start
+            LLM_SECONDS.observe(elapsed, agent, method, model, "ok")
+
+            prompt_tokens = completion_tokens = 0
+            usage = getattr(chat_completion, "usage", None)
+            if usage is not None:
+                prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+                completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+                LLM_TOKENS.inc(agent, method, model, "prompt", amount=prompt_tokens)
+                LLM_TOKENS.inc(agent, method, model, "completion", amount=completion_tokens)
+                llm_span.set("prompt_tokens", prompt_tokens)
+                llm_span.set("completion_tokens", completion_tokens)
+            ModelRouter.record(task, model, elapsed, "ok", prompt_tokens, completion_tokens)
+            _served_model.set(model)
+            return chat_completion
+
+    @staticmethod
+    def record_failure(agent: str, method: str, reason: str) -> None:
+        """Count a call that returned but could not be used, e.g. unparseable JSON"""
+        LLM_FAILURES.inc(agent, method, _served_model.get(), reason)
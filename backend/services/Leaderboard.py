@@ -0,0 +1,256 @@
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+import random
+import uuid
+from models.Mission import Mission
+
+# (negated points, negated apples, user_id): ascending order is best first, user_id breaks ties
+ScoreKey = Tuple[int, int, str]
+
+
+class _Node:
+    __slots__ = ("key", "next", "width")
+
+    def __init__(self, key: Optional[ScoreKey], level: int):
+        self.key = key
+        self.next: List[Optional["_Node"]] = [None] * level
+        self.width = [1] * level  # Positions skipped by each forward link
+
+
+class SkipList:
+    """
+    Indexable skip list of unique, sorted keys. Every forward link records how
+    many positions it skips, so insert, remove, rank and lookup by position are
+    all O(log n) expected.
+    """
+
+    MAX_LEVEL = 32
+
+    def __init__(self, seed: Optional[int] = None):
+        self._head = _Node(None, self.MAX_LEVEL)
+        self._levels = 1  # Levels in use; the head's links above them are unused
+        self._size = 0
+        self._random = random.Random(seed)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _level(self) -> int:
+        level = 1
+        while level < self.MAX_LEVEL and self._random.random() < 0.5:
+            level += 1
+        return level
+
+    def _path(self, key: ScoreKey) -> Tuple[List[_Node], List[int]]:
+        """Rightmost node before key on every level, and the positions walked on each"""
+        chain = [self._head] * self.MAX_LEVEL
+        steps = [0] * self.MAX_LEVEL
+        node = self._head
+        for level in reversed(range(self._levels)):
+            while node.next[level] is not None and node.next[level].key < key:
+                steps[level] += node.width[level]
+                node = node.next[level]
+            chain[level] = node
+        return chain, steps
+
+    def insert(self, key: ScoreKey) -> None:
+        chain, steps = self._path(key)
+        node = _Node(key, self._level())
+        for level in range(self._levels, len(node.next)):
+            self._head.width[level] = self._size + 1  # An empty level links the head straight to the end
+        self._levels = max(self._levels, len(node.next))
+        walked = 0
+        for level in range(len(node.next)):
+            previous = chain[level]
+            node.next[level] = previous.next[level]
+            previous.next[level] = node
+            node.width[level] = previous.width[level] - walked
+            previous.width[level] = walked + 1
+            walked += steps[level]
+        for level in range(len(node.next), self._levels):
+            chain[level].width[level] += 1
+        self._size += 1
+
+    def remove(self, key: ScoreKey) -> None:
+        chain, _ = self._path(key)
+        node = chain[0].next[0]
+        if node is None or node.key != key:
+            raise KeyError(key)
+        for level in range(len(node.next)):
+            previous = chain[level]
+            previous.width[level] += node.width[level] - 1
+            previous.next[level] = node.next[level]
+        for level in range(len(node.next), self._levels):
+            chain[level].width[level] -= 1
+        self._size -= 1
+
+    def count_less(self, key: ScoreKey) -> int:
+        """Number of keys strictly before key"""
+        node = self._head
+        position = 0
+        for level in reversed(range(self._levels)):
+            while node.next[level] is not None and node.next[level].key < key:
+                position += node.width[level]
+                node = node.next[level]
+        return position
+
+    def iterate_from(self, index: int) -> Iterator[ScoreKey]:
+        """Keys from position index onwards, in order"""
+        if index >= self._size:
+            return
+        node = self._head
+        remaining = max(index, 0) + 1
+        for level in reversed(range(self._levels)):
+            while node.next[level] is not None and node.width[level] <= remaining:
+                remaining -= node.width[level]
+                node = node.next[level]
+        while node is not None:
+            yield node.key
+            node = node.next[0]
+
+
+class Leaderboard:
+    """One ranking of users by points, then apples"""
+
+    def __init__(self):
+        self._keys: Dict[str, ScoreKey] = {}
+        self._list = SkipList()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, user_id: str) -> bool:
+        return user_id in self._keys
+
+    def set(self, user_id: str, points: int, apples: int) -> None:
+        key = (-points, -apples, user_id)
+        old = self._keys.get(user_id)
+        if old == key:
+            return
+        if old is not None:
+            self._list.remove(old)
+        self._list.insert(key)
+        self._keys[user_id] = key
+
+    def discard(self, user_id: str) -> None:
+        old = self._keys.pop(user_id, None)
+        if old is not None:
+            self._list.remove(old)
+
+    def rank(self, user_id: str) -> Optional[int]:
+        """1-based rank; users with equal points and apples share it"""
+        key = self._keys.get(user_id)
+        if key is None:
+            return None
+        return self._list.count_less((key[0], key[1], "")) + 1
+
+    def _entries(self, start: int, count: int) -> List[Dict[str, Any]]:
+        entries = []
+        rank = None
+        previous = None
+        for position, key in enumerate(self._list.iterate_from(start), start):
+            if len(entries) == count:
+                break
+            score = key[:2]
+            if score != previous:
+                rank = position + 1 if previous is not None else self._list.count_less((key[0], key[1], "")) + 1
+                previous = score
+            entries.append({"rank": rank, "user_id": key[2], "points": -key[0], "apples": -key[1]})
+        return entries
+
+    def top(self, k: int) -> List[Dict[str, Any]]:
+        return self._entries(0, k)
+
+    def around(self, user_id: str, radius: int) -> List[Dict[str, Any]]:
+        """The user's entry with up to radius entries on either side"""
+        key = self._keys.get(user_id)
+        if key is None:
+            return []
+        position = self._list.count_less(key)
+        start = max(position - radius, 0)
+        return self._entries(start, position - start + radius + 1)
+
+
+class LeaderboardService:
+    """
+    Point and apple totals per user, kept up to date incrementally and ranked
+    globally and within friend groups.
+
+    Each goal's contribution (points of its completed missions, and an apple
+    once all of them are completed) is remembered, so a mission change only
+    re-sums that goal's missions and applies the difference. The totals then
+    move the user in the global board and in the board of every group they
+    belong to, each an O(log n) skip list update. Nothing ever re-sums
+    missions across users.
+    """
+
+    def __init__(self):
+        self.global_board = Leaderboard()
+        self.groups: Dict[str, Set[str]] = {}           # group_id -> member user_ids
+        self.group_names: Dict[str, str] = {}
+        self._group_boards: Dict[str, Leaderboard] = {}
+        self._memberships: Dict[str, Set[str]] = {}     # user_id -> group_ids
+        self._goal_scores: Dict[Tuple[str, str], Tuple[int, int]] = {}
+        self._totals: Dict[str, Tuple[int, int]] = {}
+
+    def score(self, user_id: str) -> Tuple[int, int]:
+        """(points, apples) for a user"""
+        return self._totals.get(user_id, (0, 0))
+
+    def add_user(self, user_id: str) -> None:
+        """Put a user on the boards with whatever they have scored, zero for a new user"""
+        if user_id not in self.global_board:
+            self._update(user_id)
+
+    def _update(self, user_id: str) -> None:
+        points, apples = self.score(user_id)
+        self.global_board.set(user_id, points, apples)
+        for group_id in self._memberships.get(user_id, ()):
+            self._group_boards[group_id].set(user_id, points, apples)
+
+    def sync_goal(self, user_id: str, goal_id: str, missions: Iterable[Mission]) -> None:
+        """Recount one goal's contribution after its missions were stored or changed status"""
+        missions = list(missions)
+        points = sum(m.points for m in missions if m.status == "completed")
+        apple = 1 if missions and all(m.status == "completed" for m in missions) else 0
+        old_points, old_apples = self._goal_scores.get((user_id, goal_id), (0, 0))
+        if (points, apple) == (old_points, old_apples) and user_id in self.global_board:
+            return
+        self._goal_scores[(user_id, goal_id)] = (points, apple)
+        total_points, total_apples = self.score(user_id)
+        self._totals[user_id] = (total_points + points - old_points, total_apples + apple - old_apples)
+        self._update(user_id)
+
+    def rebuild(self, missions_db: Dict[str, Dict[str, List[Mission]]]) -> None:
+        for user_id, goals in missions_db.items():
+            for goal_id, missions in goals.items():
+                self.sync_goal(user_id, goal_id, missions)
+
+    def create_group(self, name: str, members: Iterable[str]) -> str:
+        group_id = f"group_{uuid.uuid4().hex[:12]}"
+        self.groups[group_id] = set()
+        self.group_names[group_id] = name
+        self._group_boards[group_id] = Leaderboard()
+        for user_id in members:
+            self.join_group(group_id, user_id)
+        return group_id
+
+    def join_group(self, group_id: str, user_id: str) -> None:
+        self.groups[group_id].add(user_id)
+        self._memberships.setdefault(user_id, set()).add(group_id)
+        points, apples = self.score(user_id)
+        self._group_boards[group_id].set(user_id, points, apples)
+
+    def leave_group(self, group_id: str, user_id: str) -> None:
+        self.groups[group_id].discard(user_id)
+        self._memberships.get(user_id, set()).discard(group_id)
+        self._group_boards[group_id].discard(user_id)
+
+    def board(self, scope: str) -> Optional[Leaderboard]:
+        """The global board for scope "global", else the board of that friend group"""
+        if scope == "global":
+            return self.global_board
+        return self._group_boards.get(scope)
+
+
+# Updated from main.py wherever missions are stored or change status
+leaderboard = LeaderboardService()
@@ -0,0 +1,323 @@
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import argparse
+import asyncio
+import csv
+import gzip
+import json
+import math
+import os
+import random
+import re
+import threading
+import zlib
+
+# Trained model, written by `python -m services.MerchantClassifier train` and read at startup
+MERCHANT_MODEL_PATH = os.environ.get('MERCHANT_MODEL_PATH', 'merchant_model.json.gz')
+# Descriptions the LLM categorized, appended as JSON lines for the next training run; empty keeps none.
+# The log holds raw transaction descriptions, so it is opt-in.
+MERCHANT_LABEL_LOG = os.environ.get('MERCHANT_LABEL_LOG', '')
+# Size at which the label log is rotated to <log>.1, replacing the previous one
+MERCHANT_LABEL_LOG_MAX_BYTES = int(float(os.environ.get('MERCHANT_LABEL_LOG_MAX_MB', '64')) * 1024 * 1024)
+# Predictions below this probability are escalated to Comprehend or the LLM
+MERCHANT_MIN_CONFIDENCE = float(os.environ.get('MERCHANT_MIN_CONFIDENCE', '0.7'))
+
+HASH_BITS = 18
+NGRAM_SIZES = (3, 4, 5)
+MODEL_VERSION = 1
+
+_DIGITS = re.compile(r'\d+')
+_NON_WORD = re.compile(r'[^a-z#&]+')
+
+
+def normalize(description: str) -> str:
+    """Lowercase words with digit runs as '#', so store and reference numbers don't split one merchant into many"""
+    return ' '.join(_NON_WORD.sub(' ', _DIGITS.sub('#', description.lower())).split())
+
+
+def features(description: str) -> List[int]:
+    """Hashed features of a transaction description: every word plus the character 3-5 grams of each padded word"""
+    text = normalize(description)
+    mask = (1 << HASH_BITS) - 1
+    hashed = set()
+    for word in text.split():
+        hashed.add(zlib.crc32(b'w:' + word.encode()) & mask)
+        padded = f' {word} '
+        for n in NGRAM_SIZES:
+            for i in range(len(padded) - n + 1):
+                hashed.add(zlib.crc32(padded[i:i + n].encode()) & mask)
+    return sorted(hashed)
+
+
+@dataclass(frozen=True)
+class Prediction:
+    category: str
+    confidence: float
+
+
+class MerchantModel:
+    """
+    Multinomial logistic regression over hashed binary n-gram features.
+    Weights are stored sparsely: one row of per-class weights for each
+    feature seen in training.
+    """
+
+    def __init__(self, classes: List[str], bias: List[float], weights: Dict[int, List[float]]):
+        self.classes = classes
+        self.bias = bias
+        self.weights = weights
+
+    def _probabilities(self, feature_ids: Sequence[int]) -> List[float]:
+        scores = list(self.bias)
+        weights = self.weights
+        for feature in feature_ids:
+            row = weights.get(feature)
+            if row is not None:
+                for c, w in enumerate(row):
+                    scores[c] += w
+        top = max(scores)
+        exps = [math.exp(s - top) for s in scores]
+        total = sum(exps)
+        return [e / total for e in exps]
+
+    def predict_batch(self, descriptions: Sequence[str]) -> List[Prediction]:
+        """Classify many descriptions, vectorizing and scoring each distinct normalized one once"""
+        seen: Dict[str, Prediction] = {}
+        out = []
+        for description in descriptions:
+            key = normalize(description)
+            prediction = seen.get(key)
+            if prediction is None:
+                probabilities = self._probabilities(features(key))
+                best = max(range(len(probabilities)), key=probabilities.__getitem__)
+                prediction = Prediction(self.classes[best], probabilities[best])
+                seen[key] = prediction
+            out.append(prediction)
+        return out
+
+    @staticmethod
+    def train(examples: Iterable[Tuple[str, str]], epochs: int = 8, learning_rate: float = 0.5,
+              l2: float = 1e-5, seed: int = 0) -> 'MerchantModel':
+        """
+        Fit on (description, category) pairs with plain SGD. Descriptions
+        that normalize to the same text are collapsed to their most common
+        label first, which keeps training fast on statement history where
+        merchants repeat.
+        """
+        votes: Dict[str, Dict[str, int]] = {}
+        for description, category in examples:
+            if description and category:
+                counts = votes.setdefault(normalize(description), {})
+                counts[category] = counts.get(category, 0) + 1
+        if not votes:
+            raise ValueError("No labelled descriptions to train on")
+        classes = sorted({category for counts in votes.values() for category in counts})
+        index = {category: i for i, category in enumerate(classes)}
+        data = [
+            (features(description), index[max(counts, key=lambda c: (counts[c], c))])
+            for description, counts in votes.items()
+        ]
+
+        model = MerchantModel(classes, [0.0] * len(classes), {})
+        rng = random.Random(seed)
+        step = 0
+        for _ in range(epochs):
+            rng.shuffle(data)
+            for feature_ids, label in data:
+                step += 1
+                rate = learning_rate / (1 + step * 1e-4)
+                probabilities = model._probabilities(feature_ids)
+                gradient = [p - (1.0 if c == label else 0.0) for c, p in enumerate(probabilities)]
+                for c, g in enumerate(gradient):
+                    model.bias[c] -= rate * g
+                for feature in feature_ids:
+                    row = model.weights.get(feature)
+                    if row is None:
+                        row = model.weights[feature] = [0.0] * len(classes)
+                    for c, g in enumerate(gradient):
+                        row[c] -= rate * (g + l2 * row[c])
+        return model
+
+    def save(self, path: str) -> None:
+        payload = {
+            'version': MODEL_VERSION,
+            'hash_bits': HASH_BITS,
+            'ngram_sizes': list(NGRAM_SIZES),
+            'classes': self.classes,
+            'bias': [round(b, 4) for b in self.bias],
+            # Near-zero rows carry no signal and are most of the hash table
+            'weights': {
+                str(feature): [round(w, 4) for w in row]
+                for feature, row in self.weights.items()
+                if max(abs(w) for w in row) >= 1e-3
+            },
+        }
+        with gzip.open(path, 'wt', encoding='utf-8') as f:
+            json.dump(payload, f, separators=(',', ':'))
+
+    @staticmethod
+    def load(path: str) -> 'MerchantModel':
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            payload = json.load(f)
+        if payload.get('version') != MODEL_VERSION or payload.get('hash_bits') != HASH_BITS \
+                or tuple(payload.get('ngram_sizes', ())) != NGRAM_SIZES:
+            raise ValueError(f"{path} was trained with different features, retrain it")
+        weights = {int(feature): row for feature, row in payload['weights'].items()}
+        return MerchantModel(payload['classes'], payload['bias'], weights)
+
+
+class MerchantClassifier:
+    """
+    Categorizes transaction descriptions in-process with the trained model,
+    loaded from MERCHANT_MODEL_PATH by load() in a worker thread. Without a model file every
+    description is reported as unclassified, so callers keep their existing
+    Comprehend / LLM path.
+    """
+
+    def __init__(self, model_path: str = MERCHANT_MODEL_PATH, label_log: str = MERCHANT_LABEL_LOG,
+                 min_confidence: float = MERCHANT_MIN_CONFIDENCE):
+        self.model_path = model_path
+        self.label_log = label_log
+        self.min_confidence = min_confidence
+        self._model: Optional[MerchantModel] = None
+        self._loaded = False
+        self._lock = threading.Lock()  # Model loading and the label buffer
+        self._log_lock = threading.Lock()  # Writes to the label log file
+        self._pending_labels: List[str] = []
+
+    @property
+    def model(self) -> Optional[MerchantModel]:
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    if os.path.exists(self.model_path):
+                        try:
+                            self._model = MerchantModel.load(self.model_path)
+                            print(f"Loaded merchant classifier from {self.model_path} "
+                                  f"({len(self._model.weights)} features, {len(self._model.classes)} categories)")
+                        except (OSError, ValueError, KeyError) as e:
+                            print(f"Merchant classifier unavailable: {e}")
+                    self._loaded = True
+        return self._model
+
+    async def load(self) -> None:
+        """Read the model file in a worker thread if it is not loaded, so classify() never blocks the event loop on it"""
+        if not self._loaded:
+            await asyncio.to_thread(lambda: self.model)
+
+    def reload(self) -> None:
+        """Pick up a retrained model file on the next load()"""
+        with self._lock:
+            self._model = None
+            self._loaded = False
+
+    def classify(self, descriptions: Sequence[str]) -> List[Optional[Prediction]]:
+        """
+        Confident predictions for descriptions, in order. Entries are None
+        where there is no model or the best category is below min_confidence,
+        which is what should be escalated.
+        """
+        model = self.model
+        if model is None:
+            return [None] * len(descriptions)
+        return [
+            prediction if prediction.confidence >= self.min_confidence else None
+            for prediction in model.predict_batch(descriptions)
+        ]
+
+    def record_label(self, description: str, category: str, source: str) -> None:
+        """
+        Keep a label from another categorizer (e.g. the LLM) as training data.
+        Labels are buffered in memory until flush_labels(); nothing is kept
+        when no label log is configured.
+        """
+        if not self.label_log:
+            return
+        line = json.dumps({'description': description, 'category': category, 'source': source}) + '\n'
+        with self._lock:
+            self._pending_labels.append(line)
+
+    async def flush_labels(self) -> None:
+        """Append buffered labels to the label log from a worker thread, off the event loop"""
+        with self._lock:
+            lines, self._pending_labels = self._pending_labels, []
+        if lines:
+            await asyncio.to_thread(self._write_labels, lines)
+
+    def _write_labels(self, lines: List[str]) -> None:
+        with self._log_lock:
+            try:
+                if os.path.getsize(self.label_log) >= MERCHANT_LABEL_LOG_MAX_BYTES:
+                    os.replace(self.label_log, f"{self.label_log}.1")
+            except FileNotFoundError:
+                pass
+            with open(self.label_log, 'a', encoding='utf-8') as f:
+                f.writelines(lines)
+
+
+merchant_classifier = MerchantClassifier()
+
+
+def _read_examples(csv_paths: Sequence[str], label_logs: Sequence[str]) -> List[Tuple[str, str]]:
+    examples = []
+    for path in csv_paths:
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            reader = csv.DictReader(f)
+            columns = {name.strip().lower(): name for name in reader.fieldnames or []}
+            if 'description' not in columns or 'category' not in columns:
+                raise SystemExit(f"{path} needs 'description' and 'category' columns")
+            for row in reader:
+                category = (row[columns['category']] or '').strip()
+                if category and category != 'Other':
+                    examples.append((row[columns['description']].strip(), category))
+    for path in label_logs:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    examples.append((record['description'], record['category']))
+    return examples
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Train or try the local merchant category classifier")
+    commands = parser.add_subparsers(dest='command', required=True)
+    train = commands.add_parser('train', help="Fit a model from categorized history and LLM labels")
+    train.add_argument('--csv', nargs='*', default=[], help="CSV files with description and category columns")
+    train.add_argument('--labels', nargs='*', default=None, help="Label logs (default MERCHANT_LABEL_LOG if set and present)")
+    train.add_argument('--out', default=MERCHANT_MODEL_PATH)
+    train.add_argument('--epochs', type=int, default=8)
+    predict = commands.add_parser('predict', help="Classify descriptions with a saved model")
+    predict.add_argument('descriptions', nargs='+')
+    predict.add_argument('--model', default=MERCHANT_MODEL_PATH)
+    args = parser.parse_args(argv)
+
+    if args.command == 'train':
+        labels = args.labels if args.labels is not None else \
+            ([MERCHANT_LABEL_LOG] if MERCHANT_LABEL_LOG and os.path.exists(MERCHANT_LABEL_LOG) else [])
+        examples = _read_examples(args.csv, labels)
+        # Hold out every tenth distinct description to report accuracy
+        distinct = sorted({normalize(description) for description, _ in examples})
+        held_out = set(distinct[::10]) if len(distinct) >= 50 else set()
+        model = MerchantModel.train([e for e in examples if normalize(e[0]) not in held_out], epochs=args.epochs)
+        if held_out:
+            truth = {normalize(description): category for description, category in examples
+                     if normalize(description) in held_out}
+            predictions = model.predict_batch(list(truth))
+            correct = sum(p.category == truth[d] for d, p in zip(truth, predictions))
+            confident = [(d, p) for d, p in zip(truth, predictions) if p.confidence >= MERCHANT_MIN_CONFIDENCE]
+            print(f"Held-out accuracy {correct / len(truth):.1%} on {len(truth)} descriptions; "
+                  f"{len(confident) / len(truth):.1%} confident, "
+                  f"{sum(p.category == truth[d] for d, p in confident) / max(len(confident), 1):.1%} of those correct")
+            model = MerchantModel.train(examples, epochs=args.epochs)
+        model.save(args.out)
+        print(f"Saved {len(model.classes)} categories, {len(examples)} examples to {args.out} "
+              f"({os.path.getsize(args.out) / 1024:.0f} KiB)")
+    else:
+        model = MerchantModel.load(args.model)
+        for description, prediction in zip(args.descriptions, model.predict_batch(args.descriptions)):
+            print(f"{prediction.category:20} {prediction.confidence:.2f}  {description}")
+
+
+if __name__ == '__main__':
+    main()
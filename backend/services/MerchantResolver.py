@@ -0,0 +1,232 @@
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+import re
+import threading
+import zlib
+from services.RecurringChargeDetector import RecurringChargeDetector
+
+# Card processors and aggregators that prefix the real merchant, e.g. "SQ *BLUE BOTTLE"
+_PROCESSOR_PREFIX = re.compile(r'^\s*(sq|tst|pp|paypal|sp|py|dd|ic|fs|gglpay|apple ?pay)\s*\*\s*')
+# Web suffixes glued to the brand, e.g. "AMAZON.COM" or "NETFLIX.COM"
+_WEB_SUFFIX = re.compile(r'\.(com|net|org|co|io)\b')
+
+# Abbreviations banks print for well-known merchants
+TOKEN_ALIASES = {
+    'amzn': 'amazon', 'mktp': 'marketplace', 'mkt': 'market', 'wm': 'walmart', 'wal': 'walmart',
+    'sbux': 'starbucks', 'mcdonald': 'mcdonalds', 'mcdonalds': 'mcdonalds', 'wholefds': 'whole foods',
+    'tjs': 'trader joes', 'cvs': 'cvs', 'pharm': 'pharmacy', 'intl': 'international',
+}
+# One-word brands whose product lines print as separate merchants ("amazon prime", "uber eats"),
+# seeded so they cluster from the first upload on
+KNOWN_BRANDS = ('amazon', 'apple', 'google', 'walmart', 'target', 'costco', 'uber', 'lyft', 'starbucks',
+                'netflix', 'spotify', 'hulu', 'disney', 'microsoft', 'doordash', 'instacart')
+# Trailing tokens that never distinguish a merchant
+_LOCALE_TOKENS = {'us', 'usa', 'na', 'ca', 'ny', 'tx', 'wa', 'fl', 'il', 'ma', 'nj', 'uk'}
+# Words that describe the outlet rather than the merchant
+_GENERIC_TOKENS = {'store', 'stores', 'shop', 'location', 'branch'}
+# Person-to-person payments and transfers: the words after these name a payee, not a merchant,
+# so such keys keep the payee and are only ever matched exactly
+PAYMENT_TOKENS = {'zelle', 'venmo', 'transfer', 'xfer', 'payment', 'pmt', 'ach', 'wire', 'cashapp'}
+_PAYMENT_KEY_WORDS = 6
+_WORD = re.compile(r'[a-z&]+')
+
+NUM_HASHES = 32
+BANDS = 8  # 8 bands of 4 rows: pairs above ~0.6 Jaccard share a bucket with high probability
+ROWS = NUM_HASHES // BANDS
+MIN_SIMILARITY = 0.6
+_PRIME = (1 << 61) - 1
+_SEEDS = [((i * 0x9E3779B97F4A7C15 + 1) % _PRIME | 1, (i * 0xC2B2AE3D27D4EB4F + 7) % _PRIME)
+          for i in range(NUM_HASHES)]
+
+
+def is_payment(key: str) -> bool:
+    return any(token in PAYMENT_TOKENS for token in key.split()[:2])
+
+
+def canonicalize(description: str) -> str:
+    """
+    Reduce a raw description to a canonical merchant key:
+    "AMZN Mktp US*2K3" -> "amazon marketplace", "SQ *BLUE BOTTLE #12" -> "blue bottle".
+    The part after a '*' is a per-order reference and is dropped, except
+    for payments and transfers ("ZELLE TO JOHN SMITH" -> "zelle to john smith"),
+    which keep the payee.
+    """
+    words = [word for word in _WORD.findall(description.lower()) if len(word) > 1 or word == '&']
+    if is_payment(' '.join(words)):
+        return ' '.join(words[:_PAYMENT_KEY_WORDS])
+    text = _PROCESSOR_PREFIX.sub('', description.lower())
+    text = _WEB_SUFFIX.sub('', text.split('*', 1)[0]) or text
+    tokens = []
+    for token in RecurringChargeDetector.normalize_merchant(text).split():
+        if token not in _GENERIC_TOKENS:
+            tokens.extend(TOKEN_ALIASES.get(token, token).split())
+    while len(tokens) > 1 and tokens[-1] in _LOCALE_TOKENS:
+        tokens.pop()
+    return ' '.join(tokens[:3])
+
+
+def shingles(key: str) -> Set[str]:
+    padded = f' {key} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)} or {padded}
+
+
+# Trigram -> its NUM_HASHES hash values. Descriptions are short lowercase text, so
+# the trigram vocabulary stays small and each one is hashed only once per process.
+_shingle_hashes: Dict[str, Tuple[int, ...]] = {}
+
+
+def _hashes(shingle: str) -> Tuple[int, ...]:
+    hashes = _shingle_hashes.get(shingle)
+    if hashes is None:
+        h = zlib.crc32(shingle.encode())
+        hashes = _shingle_hashes[shingle] = tuple((a * h + b) % _PRIME for a, b in _SEEDS)
+    return hashes
+
+
+def minhash(key: str) -> Tuple[int, ...]:
+    return tuple(map(min, zip(*[_hashes(shingle) for shingle in shingles(key)])))
+
+
+def _core(key: str) -> str:
+    """The first two words, which name the merchant; later ones are usually a location"""
+    return ' '.join(key.split()[:2])
+
+
+def jaccard(a: str, b: str) -> float:
+    sa, sb = shingles(a), shingles(b)
+    return len(sa & sb) / len(sa | sb)
+
+
+class MerchantResolver:
+    """
+    A growing dictionary of one user's merchants that their transaction
+    descriptions are resolved against. Each description is canonicalized,
+    then matched:
+
+    1. exactly, against every canonical key seen before (a dict lookup),
+    2. by prefix, when the key starts with a known one-word merchant or the
+       first two words of a known merchant ("amazon prime" -> "amazon",
+       "blue bottle coffee" -> "blue bottle oakland"), or is the first word
+       of one ("amazon" -> "amazon marketplace"); trailing words are usually
+       locations or product lines,
+    3. fuzzily, through MinHash signatures banded into LSH buckets, so only
+       the few merchants sharing a bucket are compared, never the whole
+       dictionary.
+
+    Payment and transfer keys skip 2 and 3 and are never used as prefixes
+    or LSH candidates, since their leading words are generic.
+
+    Anything unmatched becomes a new merchant. Lookups stay near-constant
+    time as the dictionary grows, and later uploads reuse earlier clusters.
+    """
+
+    def __init__(self, min_similarity: float = MIN_SIMILARITY):
+        self.min_similarity = min_similarity
+        self._resolved: Dict[str, str] = {}      # canonical key -> merchant display name
+        self._merchant_keys: Dict[str, str] = {}  # display name -> key it was created from
+        self._prefixes: Dict[str, str] = {}       # one-word keys and two-word prefixes -> display name
+        self._first_words: Dict[str, str] = {}    # first word of multi-word merchants -> display name
+        self._buckets: Dict[Tuple[int, Tuple[int, ...]], List[str]] = {}
+        self._lock = threading.Lock()
+        for brand in KNOWN_BRANDS:
+            self._resolved[brand] = self._add(brand, ())
+
+    def __len__(self) -> int:
+        return len(self._merchant_keys)
+
+    def _candidates(self, signature: Tuple[int, ...]) -> Set[str]:
+        found: Set[str] = set()
+        for band in range(BANDS):
+            found.update(self._buckets.get((band, signature[band * ROWS:(band + 1) * ROWS]), ()))
+        return found
+
+    def _match(self, key: str) -> Tuple[Optional[str], Tuple[int, ...]]:
+        if is_payment(key):
+            return None, ()
+        tokens = key.split()
+        for length in (2, 1):
+            if len(tokens) >= length:
+                merchant = self._prefixes.get(' '.join(tokens[:length]))
+                if merchant is not None:
+                    return merchant, ()
+        if len(tokens) == 1 and key in self._first_words:
+            # A bare brand after its longer form, e.g. "amazon" after "amazon marketplace";
+            # later "amazon ..." descriptions then match on the brand prefix
+            merchant = self._first_words[key]
+            self._prefixes[key] = merchant
+            return merchant, ()
+        core = _core(key)
+        signature = minhash(core)
+        best, best_score = None, self.min_similarity
+        for merchant in self._candidates(signature):
+            score = jaccard(core, _core(self._merchant_keys[merchant]))
+            if score >= best_score:
+                best, best_score = merchant, score
+        return best, signature
+
+    def _add(self, key: str, signature: Tuple[int, ...]) -> str:
+        merchant = key.title()
+        if merchant in self._merchant_keys:
+            return merchant
+        self._merchant_keys[merchant] = key
+        if is_payment(key):
+            return merchant
+        tokens = key.split()
+        if len(tokens) >= 2:
+            self._prefixes.setdefault(' '.join(tokens[:2]), merchant)
+            if len(tokens[0]) >= 4:
+                self._first_words.setdefault(tokens[0], merchant)
+        elif len(key) >= 4:
+            self._prefixes.setdefault(key, merchant)
+        signature = signature or minhash(_core(key))
+        for band in range(BANDS):
+            self._buckets.setdefault((band, signature[band * ROWS:(band + 1) * ROWS]), []).append(merchant)
+        return merchant
+
+    def resolve(self, description: str) -> Optional[str]:
+        """Merchant display name for a description, adding a new merchant when nothing matches"""
+        key = canonicalize(description)
+        if not key:
+            return None
+        merchant = self._resolved.get(key)
+        if merchant is not None:
+            return merchant
+        with self._lock:
+            merchant = self._resolved.get(key)
+            if merchant is None:
+                merchant, signature = self._match(key)
+                if merchant is None:
+                    merchant = self._add(key, signature)
+                self._resolved[key] = merchant
+        return merchant
+
+    def resolve_many(self, descriptions: Sequence[str]) -> List[Optional[str]]:
+        return [self.resolve(description) for description in descriptions]
+
+
+class MerchantResolvers:
+    """
+    One MerchantResolver per user, so merchants and payees learned from one
+    user's statements never name another user's transactions. Each starts
+    from the seeded KNOWN_BRANDS; the alias table is shared.
+    """
+
+    def __init__(self):
+        self._resolvers: Dict[str, MerchantResolver] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._resolvers)
+
+    def for_user(self, user_id: str) -> MerchantResolver:
+        resolver = self._resolvers.get(user_id)
+        if resolver is None:
+            with self._lock:
+                resolver = self._resolvers.setdefault(user_id, MerchantResolver())
+        return resolver
+
+    def discard(self, user_id: str) -> None:
+        self._resolvers.pop(user_id, None)
+
+
+# Each user's uploads resolve against the merchants learned from their earlier statements
+merchant_resolvers = MerchantResolvers()
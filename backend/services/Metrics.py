@@ -0,0 +1,219 @@
+from typing import Callable, Dict, List, Sequence, Tuple
+from bisect import bisect_left
+from contextlib import contextmanager
+import threading
+import time
+
+# Latency buckets in seconds, from fast cached reads up to long LLM calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _label_text(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    """Monotonic count per label set"""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def value(self, *label_values: str) -> float:
+        return self._values.get(label_values, 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        for label_values, value in sorted(self._values.items()):
+            lines.append(f'{self.name}{_label_text(self.labels, label_values)} {_number(value)}')
+        return lines
+
+
+class Histogram:
+    """
+    Bucketed observations per label set. Observing is one bisect and two
+    additions; buckets are only made cumulative when rendered.
+    """
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts (last is +Inf), sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = [[0] * (len(self.buckets) + 1), 0.0, 0]
+                self._series[label_values] = series
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, *label_values: str) -> int:
+        series = self._series.get(label_values)
+        return series[2] if series else 0
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        for label_values, (counts, total, count) in sorted(self._series.items()):
+            running = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                running += bucket_count
+                le = 'le="+Inf"' if bound == float('inf') else f'le="{_number(bound)}"'
+                lines.append(f'{self.name}_bucket{_label_text(self.labels, label_values, le)} {running}')
+            label_text = _label_text(self.labels, label_values)
+            lines.append(f'{self.name}_sum{label_text} {repr(total)}')
+            lines.append(f'{self.name}_count{label_text} {count}')
+        return lines
+
+
+class CallbackMetric:
+    """Values read from elsewhere (e.g. a cache's hit counter) only when scraped"""
+
+    def __init__(self, name: str, help: str, kind: str, labels: Sequence[str],
+                 collect: Callable[[], Dict[Tuple[str, ...], float]]):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.labels = tuple(labels)
+        self.collect = collect
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        for label_values, value in sorted(self.collect().items()):
+            lines.append(f'{self.name}{_label_text(self.labels, label_values)} {_number(value)}')
+        return lines
+
+
+class MetricsRegistry:
+    """Named metrics rendered together in the Prometheus text format"""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labels, buckets))
+
+    def callback(self, name: str, help: str, collect: Callable[[], Dict[Tuple[str, ...], float]],
+                 kind: str = 'gauge', labels: Sequence[str] = ()) -> CallbackMetric:
+        return self._register(CallbackMetric(name, help, kind, labels, collect))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+metrics = MetricsRegistry()
+
+REQUEST_SECONDS = metrics.histogram(
+    'moneytree_http_request_seconds', 'HTTP request latency by route template',
+    ('method', 'route', 'status')
+)
+LLM_SECONDS = metrics.histogram(
+    'moneytree_llm_call_seconds', 'LLM call latency by agent method and model',
+    ('agent', 'method', 'model', 'outcome')
+)
+LLM_TOKENS = metrics.counter(
+    'moneytree_llm_tokens_total', 'LLM tokens used by agent method and model',
+    ('agent', 'method', 'model', 'kind')
+)
+LLM_FAILURES = metrics.counter(
+    'moneytree_llm_failures_total', 'Failed LLM calls by agent method, model and reason',
+    ('agent', 'method', 'model', 'reason')
+)
+COMPREHEND_SECONDS = metrics.histogram(
+    'moneytree_comprehend_batch_seconds', 'AWS Comprehend batch call latency',
+    ('operation', 'outcome')
+)
+COMPREHEND_DOCUMENTS = metrics.counter(
+    'moneytree_comprehend_documents_total', 'Transaction descriptions sent to AWS Comprehend'
+)
+BACKGROUND_JOB_SECONDS = metrics.histogram(
+    'moneytree_background_job_seconds', 'Duration of background jobs',
+    ('job', 'outcome')
+)
+
+
+@contextmanager
+def timed(histogram: Histogram, *label_values: str):
+    """Observe the duration of the block, with a trailing "ok" or "error" outcome label"""
+    start = time.perf_counter()
+    outcome = 'ok'
+    try:
+        yield
+    except BaseException:
+        outcome = 'error'
+        raise
+    finally:
+        histogram.observe(time.perf_counter() - start, *label_values, outcome)
+
+
+def _status_class(status: int) -> str:
+    return f'{status // 100}xx'
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording request latency per route template, so
+    /api/goals/{user_id} is one series rather than one per user.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = [500]
+
+        async def send_with_status(message):
+            if message['type'] == 'http.response.start':
+                status[0] = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # The router stores the matched route on the scope
+            route = scope.get('route')
+            path = getattr(route, 'path', None) or 'unmatched'
+            REQUEST_SECONDS.observe(time.perf_counter() - start, scope['method'], path, _status_class(status[0]))
@@ -0,0 +1,130 @@
+from typing import Callable, Dict, List, Optional, Tuple, Awaitable, Union
+from datetime import date, datetime, timedelta
+import asyncio
+import heapq
+import itertools
+from models.Mission import Mission
+
+# Hook signature: (user_id, expired missions for that user) -> None or awaitable
+ExpiryHook = Callable[[str, List[Mission]], Union[None, Awaitable[None]]]
+
+
+class MissionScheduler:
+    """
+    Deadline-driven lifecycle for missions.
+
+    Active missions sit in a min-heap keyed on their deadline, so scheduling is
+    O(log n) and checking for expiries only looks at the top of the heap instead
+    of scanning every mission of every user. Cancelled or rescheduled missions
+    are dropped lazily when they surface at the top.
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[date, int, str, Mission]] = []
+        self._live: Dict[Tuple[str, str], int] = {}  # (user_id, mission_id) -> live entry seq
+        self._seq = itertools.count()
+        self._hooks: List[ExpiryHook] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._live)
+
+    def add_hook(self, hook: ExpiryHook) -> None:
+        """Register a callback fired once per user with that user's newly failed missions"""
+        self._hooks.append(hook)
+
+    def schedule(self, mission: Mission) -> None:
+        """Track an active mission until its deadline. Re-scheduling replaces the old entry."""
+        key = (mission.user_id, mission.mission_id)
+        if mission.status != "active":
+            self._live.pop(key, None)
+            return
+        seq = next(self._seq)
+        self._live[key] = seq
+        heapq.heappush(self._heap, (mission.deadline, seq, mission.user_id, mission))
+
+    def schedule_many(self, missions: List[Mission]) -> None:
+        for mission in missions:
+            self.schedule(mission)
+
+    def cancel(self, user_id: str, mission_id: str) -> None:
+        """Stop tracking a mission (completed, deleted or replaced)"""
+        self._live.pop((user_id, mission_id), None)
+
+    def cancel_many(self, missions: List[Mission]) -> None:
+        for mission in missions:
+            self.cancel(mission.user_id, mission.mission_id)
+
+    def rebuild(self, missions_db: Dict[str, Dict[str, List[Mission]]]) -> None:
+        """Rebuild the heap from stored missions, e.g. after a restart. O(n) via heapify."""
+        self._heap = []
+        self._live = {}
+        for user_missions in missions_db.values():
+            for goal_missions in user_missions.values():
+                for mission in goal_missions:
+                    if mission.status != "active":
+                        continue
+                    seq = next(self._seq)
+                    self._live[(mission.user_id, mission.mission_id)] = seq
+                    self._heap.append((mission.deadline, seq, mission.user_id, mission))
+        heapq.heapify(self._heap)
+
+    def pop_expired(self, today: Optional[date] = None) -> Dict[str, List[Mission]]:
+        """
+        Pop every mission whose deadline is before today and mark it failed.
+        A mission is still doable on its deadline day, so it expires the day after.
+
+        Returns:
+            Dict mapping user_id to that user's newly failed missions
+        """
+        today = today or date.today()
+        expired: Dict[str, List[Mission]] = {}
+        while self._heap and self._heap[0][0] < today:
+            deadline, seq, user_id, mission = heapq.heappop(self._heap)
+            key = (user_id, mission.mission_id)
+            if self._live.get(key) != seq:
+                continue  # Stale entry: cancelled or rescheduled
+            del self._live[key]
+            if mission.status != "active" or mission.deadline != deadline:
+                continue
+            mission.status = "failed"
+            expired.setdefault(user_id, []).append(mission)
+        return expired
+
+    async def run_due(self, today: Optional[date] = None) -> Dict[str, List[Mission]]:
+        """Expire due missions in bulk and fire hooks once per affected user"""
+        expired = self.pop_expired(today)
+        for user_id, missions in expired.items():
+            for hook in self._hooks:
+                try:
+                    result = hook(user_id, missions)
+                    if asyncio.iscoroutine(result):
+                        await result
+                except Exception as e:
+                    print(f"Mission scheduler hook error for user {user_id}: {e}")
+        if expired:
+            print(f"Expired {sum(len(m) for m in expired.values())} missions for {len(expired)} users")
+        return expired
+
+    async def _run_forever(self, max_sleep_seconds: float):
+        while True:
+            await self.run_due()
+            # Deadlines are dates, so nothing can expire before the next midnight
+            now = datetime.now()
+            next_midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+            sleep_seconds = min((next_midnight - now).total_seconds() + 1, max_sleep_seconds)
+            await asyncio.sleep(sleep_seconds)
+
+    def start(self, max_sleep_seconds: float = 3600) -> None:
+        """Start the background expiry loop on the running event loop"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run_forever(max_sleep_seconds))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,108 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+import os
+from services.Metrics import metrics
+
+# USD per million (prompt, completion) tokens, used for cost reporting only
+MODEL_PRICES: Dict[str, Tuple[float, float]] = {
+    "openai/gpt-4-turbo": (10.00, 30.00),
+    "openai/gpt-4o": (2.50, 10.00),
+    "openai/gpt-4o-mini": (0.15, 0.60),
+    "openai/gpt-4.1-mini": (0.40, 1.60),
+    "openai/gpt-4.1-nano": (0.10, 0.40),
+}
+
+
+@dataclass(frozen=True)
+class ModelChoice:
+    """One step of a route's fallback chain"""
+    model: str
+    timeout: Optional[float] = None  # Seconds before giving up on this model and moving on
+
+
+# Task -> fallback chain. Classification and extraction go to small models first,
+# conversation and planning stay on the large model the prompts were written for.
+DEFAULT_ROUTES: Dict[str, Tuple[ModelChoice, ...]] = {
+    # One-word transaction categories
+    "categorize": (
+        ModelChoice("openai/gpt-4.1-nano", timeout=4.0),
+        ModelChoice("openai/gpt-4o-mini", timeout=8.0),
+        ModelChoice("openai/gpt-4-turbo", timeout=20.0),
+    ),
+    # JSON pulled out of text: statement pages, card loadouts, goals from a conversation
+    "extract": (
+        ModelChoice("openai/gpt-4o-mini", timeout=30.0),
+        ModelChoice("openai/gpt-4-turbo", timeout=90.0),
+    ),
+    # Mission roadmaps and card stack recommendations
+    "plan": (
+        ModelChoice("openai/gpt-4-turbo", timeout=60.0),
+        ModelChoice("openai/gpt-4o", timeout=60.0),
+    ),
+    # Long-form conversation
+    "chat": (
+        ModelChoice("openai/gpt-4-turbo", timeout=60.0),
+        ModelChoice("openai/gpt-4o", timeout=60.0),
+    ),
+}
+
+ROUTE_SECONDS = metrics.histogram(
+    'moneytree_llm_route_seconds', 'LLM latency per routed task and model',
+    ('route', 'model', 'outcome')
+)
+ROUTE_COST = metrics.counter(
+    'moneytree_llm_route_cost_usd_total', 'Estimated LLM spend per routed task and model',
+    ('route', 'model')
+)
+ROUTE_FALLBACKS = metrics.counter(
+    'moneytree_llm_route_fallbacks_total', 'Calls moved down a fallback chain, by the model that failed',
+    ('route', 'model', 'reason')
+)
+
+
+def _routes_from_env(routes: Dict[str, Tuple[ModelChoice, ...]]) -> Dict[str, Tuple[ModelChoice, ...]]:
+    """
+    Override a route with LLM_ROUTE_<TASK>, a comma-separated chain of model or
+    model@timeout entries, e.g. LLM_ROUTE_CATEGORIZE="openai/gpt-4o-mini@5,openai/gpt-4-turbo".
+    """
+    routes = dict(routes)
+    for task in list(routes):
+        value = os.environ.get(f"LLM_ROUTE_{task.upper()}")
+        if not value:
+            continue
+        chain = []
+        for entry in value.split(","):
+            model, _, timeout = entry.strip().partition("@")
+            if model:
+                chain.append(ModelChoice(model, float(timeout) if timeout else None))
+        if chain:
+            routes[task] = tuple(chain)
+    return routes
+
+
+class ModelRouter:
+    """Per-task model policy with fallback chains, and latency and cost accounting per route"""
+
+    routes: Dict[str, Tuple[ModelChoice, ...]] = _routes_from_env(DEFAULT_ROUTES)
+
+    @staticmethod
+    def chain(task: str) -> List[ModelChoice]:
+        if task not in ModelRouter.routes:
+            raise ValueError(f"Unknown LLM task '{task}', expected one of {', '.join(ModelRouter.routes)}")
+        return list(ModelRouter.routes[task])
+
+    @staticmethod
+    def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+        prompt_price, completion_price = MODEL_PRICES.get(model, (0.0, 0.0))
+        return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+
+    @staticmethod
+    def record(task: str, model: str, seconds: float, outcome: str,
+               prompt_tokens: int = 0, completion_tokens: int = 0) -> None:
+        ROUTE_SECONDS.observe(seconds, task, model, outcome)
+        if prompt_tokens or completion_tokens:
+            ROUTE_COST.inc(task, model, amount=ModelRouter.estimate_cost(model, prompt_tokens, completion_tokens))
+
+    @staticmethod
+    def record_fallback(task: str, model: str, reason: str) -> None:
+        ROUTE_FALLBACKS.inc(task, model, reason)
@@ -0,0 +1,39 @@
+from typing import Any, List, Optional, Sequence
+import base64
+import json
+
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(key: List[Any]) -> str:
+    """Opaque cursor for the sort key of the last item on a page"""
+    raw = json.dumps(key, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str], shape: Optional[Sequence[type]] = None) -> Optional[List[Any]]:
+    """
+    Inverse of encode_cursor. Raises ValueError for malformed cursors, and,
+    when shape gives the type of each element of the sort key, for cursors
+    of a different length or element types.
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(key, list):
+        raise ValueError("Invalid cursor")
+    if shape is not None and (
+        len(key) != len(shape)
+        # bool is an int subclass, but never part of a sort key
+        or any(isinstance(value, bool) or not isinstance(value, kind) for value, kind in zip(key, shape))
+    ):
+        raise ValueError("Invalid cursor")
+    return key
+
+
+def clamp_limit(limit: int) -> int:
+    return max(1, min(limit, MAX_PAGE_SIZE))
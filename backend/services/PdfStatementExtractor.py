@@ -0,0 +1,191 @@
+from dataclasses import dataclass, field
+from typing import List, Dict
+from datetime import date
+from collections import Counter
+import io
+import re
+
+try:
+    from pypdf import PdfReader, PdfWriter
+except ImportError:  # Local extraction is optional, the LLM can still read whole PDFs
+    PdfReader = None
+    PdfWriter = None
+
+# 01/15 or 01/15/2024 at the start of a line, an optional post date, the description,
+# the amount and an optional running balance
+_TRANSACTION_LINE = re.compile(
+    r'^\s*(?P<date>\d{1,2}/\d{1,2}(?:/\d{2,4})?)\s+'
+    r'(?:\d{1,2}/\d{1,2}(?:/\d{2,4})?\s+)?'
+    r'(?P<description>.+?)\s+'
+    r'(?P<amount>[-+]?\(?\$?-?[\d,]+\.\d{2}\)?)'
+    r'(?:\s+[-+]?\$?[\d,]+\.\d{2})?\s*$'
+)
+_MONEY = re.compile(r'\$?[\d,]+\.\d{2}')
+_PERIOD = re.compile(
+    r'(\d{1,2})/(\d{1,2})/(\d{2,4})\s*(?:-|–|to|through)\s*(\d{1,2})/(\d{1,2})/(\d{2,4})',
+    re.IGNORECASE
+)
+_YEAR = re.compile(r'\b(20\d{2})\b')
+
+# Section headings decide the sign of unsigned amounts
+_CREDIT_SECTIONS = ('deposits', 'additions', 'credits', 'payments and', 'refunds')
+_DEBIT_SECTIONS = ('withdrawals', 'purchases', 'debits', 'fees', 'checks paid', 'charges', 'subtractions')
+# Lines with amounts that are statement summaries rather than transactions
+_SUMMARY_WORDS = ('total', 'balance', 'subtotal', 'minimum payment', 'credit limit', 'available',
+                  'interest charged', 'annual percentage', 'apr', 'previous', 'new balance', 'ending', 'beginning')
+# Dated lines are matched on whole words, and "total" only ahead of a section name,
+# so merchants like CAPRI PIZZA or TOTAL WINE are still transactions
+_SUMMARY_LINE = re.compile(
+    r'\b(?:balance|subtotal|minimum payment|credit limit|available credit|annual percentage|interest charged)\b'
+    r'|^total\s+(?:' + '|'.join(re.escape(word) for word in _CREDIT_SECTIONS + _DEBIT_SECTIONS + ('interest',)) + r')',
+    re.IGNORECASE
+)
+
+
+@dataclass
+class PdfPage:
+    number: int
+    text: str
+    rows: List[Dict] = field(default_factory=list)
+    needs_llm: bool = False
+
+    @property
+    def scanned(self) -> bool:
+        """No text layer, so the LLM has to read the page image"""
+        return not self.text.strip()
+
+
+class PdfStatementExtractor:
+    """
+    Page-by-page local extraction for PDF bank statements.
+
+    Each page's text is pulled out locally and its transaction lines are matched
+    against common statement layouts. Pages where every amount line is accounted
+    for never need the LLM, and the rest are flagged so they can be sent as small
+    page chunks instead of the whole document.
+    """
+
+    @staticmethod
+    def available() -> bool:
+        return PdfReader is not None
+
+    @staticmethod
+    def _statement_end(text: str) -> date:
+        """Closing date of the statement period, used to give MM/DD dates a year"""
+        match = _PERIOD.search(text)
+        if match:
+            month, day, year = int(match.group(4)), int(match.group(5)), int(match.group(6))
+            return date(year + 2000 if year < 100 else year, month, day)
+        years = Counter(_YEAR.findall(text))
+        year = int(years.most_common(1)[0][0]) if years else date.today().year
+        return date(year, 12, 31)
+
+    @staticmethod
+    def _parse_date(value: str, statement_end: date) -> date:
+        parts = value.split('/')
+        month, day = int(parts[0]), int(parts[1])
+        if len(parts) == 3:
+            year = int(parts[2])
+            return date(year + 2000 if year < 100 else year, month, day)
+        # January statements list December transactions from the previous year
+        year = statement_end.year - 1 if month > statement_end.month else statement_end.year
+        return date(year, month, day)
+
+    @staticmethod
+    def _parse_page(page: PdfPage, statement_end: date):
+        """Match transaction lines on one page and decide whether it parsed deterministically"""
+        section_sign = 0
+        for line in page.text.splitlines():
+            lower = line.lower()
+            if not _MONEY.search(line):
+                # Headings carry no amounts; remember which section we are in
+                if any(word in lower for word in _CREDIT_SECTIONS):
+                    section_sign = 1
+                elif any(word in lower for word in _DEBIT_SECTIONS):
+                    section_sign = -1
+                continue
+
+            match = _TRANSACTION_LINE.match(line)
+            if not match:
+                if any(word in lower for word in _SUMMARY_WORDS):
+                    continue
+                page.needs_llm = True  # An amount we could not account for
+                continue
+
+            description = match.group('description').strip()
+            if _SUMMARY_LINE.search(description):
+                continue  # Dated summaries such as "01/31 Ending Balance 2,994.75"
+
+            raw_amount = match.group('amount')
+            explicit_sign = raw_amount.startswith(('-', '(', '+')) or '-' in raw_amount
+            if not explicit_sign and section_sign == 0:
+                page.needs_llm = True  # Unsigned amount with no section to tell direction
+                continue
+            cleaned = raw_amount.replace('$', '').replace(',', '').replace('(', '-').replace(')', '').replace('+', '')
+            try:
+                amount = float(cleaned)
+                tx_date = PdfStatementExtractor._parse_date(match.group('date'), statement_end)
+            except ValueError:
+                page.needs_llm = True
+                continue
+            if not explicit_sign:
+                amount = section_sign * abs(amount)
+
+            page.rows.append({
+                'date': tx_date,
+                'description': description,
+                'amount': amount,
+                'category': ''
+            })
+
+        if page.needs_llm:
+            page.rows = []  # The LLM re-extracts the whole page so nothing is counted twice
+
+    @staticmethod
+    def extract_pages(file_content: bytes) -> List[PdfPage]:
+        """Extract text from every page and parse the pages that follow a known layout"""
+        reader = PdfReader(io.BytesIO(file_content))
+        pages = [
+            PdfPage(number=i, text=page.extract_text() or '')
+            for i, page in enumerate(reader.pages)
+        ]
+        statement_end = PdfStatementExtractor._statement_end('\n'.join(p.text for p in pages[:2]))
+        for page in pages:
+            if not page.text.strip():
+                page.needs_llm = True  # Scanned page, only the LLM can read it
+                continue
+            PdfStatementExtractor._parse_page(page, statement_end)
+        return pages
+
+    @staticmethod
+    def page_chunks(pages: List[PdfPage], pages_per_chunk: int) -> List[List[PdfPage]]:
+        """
+        Group consecutive pages that need the LLM into chunks of at most
+        pages_per_chunk. Text pages and scanned pages never share a chunk,
+        since one is sent as text and the other as a PDF.
+        """
+        chunks: List[List[PdfPage]] = []
+        current: List[PdfPage] = []
+        for page in pages:
+            if page.needs_llm and (not current or (current[-1].number == page.number - 1
+                                                   and current[-1].scanned == page.scanned)) \
+                    and len(current) < pages_per_chunk:
+                current.append(page)
+                continue
+            if current:
+                chunks.append(current)
+            current = [page] if page.needs_llm else []
+        if current:
+            chunks.append(current)
+        return chunks
+
+    @staticmethod
+    def chunk_pdf(file_content: bytes, pages: List[PdfPage]) -> bytes:
+        """Cut a smaller PDF containing only the given pages, for scanned pages without text"""
+        reader = PdfReader(io.BytesIO(file_content))
+        writer = PdfWriter()
+        for page in pages:
+            writer.add_page(reader.pages[page.number])
+        buffer = io.BytesIO()
+        writer.write(buffer)
+        return buffer.getvalue()
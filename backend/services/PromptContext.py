@@ -0,0 +1,181 @@
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import json
+import os
+from models.UserProfile import UserProfile
+from models.FinancialGoal import FinancialGoal
+from models.SpendingReport import SpendingReport
+
+# Tokens of user context sent with each agent call, split between the blocks below
+PROMPT_CONTEXT_TOKENS = int(os.environ.get('PROMPT_CONTEXT_TOKENS', '1600'))
+BLOCK_SHARES = {"profile": 0.1, "goals": 0.25, "spending": 0.65}
+# Resources each block is built from; a touch() on any of them rebuilds it
+BLOCK_DEPENDS = {"profile": ("profile",), "goals": ("goals",), "spending": ("report",)}
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about 4 characters per token for English and numbers)"""
+    return len(text) // 4 + 1
+
+
+@dataclass(frozen=True)
+class ContextBlock:
+    name: str
+    text: str
+    tokens: int
+
+
+def _fit(lines: List[str], items: Sequence, render: Callable, summarize: Callable, budget: int) -> None:
+    """
+    Append rendered items to lines in order until the budget is used up, then
+    one line summarizing the items that did not fit.
+    """
+    used = sum(estimate_tokens(line) for line in lines)
+    for position, item in enumerate(items):
+        line = render(item)
+        rest = items[position:]
+        # Keep room for the summary line unless this is the last item
+        reserve = estimate_tokens(summarize(rest[1:])) if len(rest) > 1 else 0
+        if used + estimate_tokens(line) + reserve > budget:
+            lines.append(summarize(rest))
+            return
+        lines.append(line)
+        used += estimate_tokens(line)
+
+
+class PromptContext:
+    """
+    Per-user context blocks for agent prompts: the profile, the goals and the
+    spending report, each rendered once and reused on every chat turn until
+    one of the resources it was built from is touched.
+
+    Blocks are always joined in the same order, least volatile first, and
+    render the same data to the same bytes. The context message therefore
+    stays identical across a conversation, so the system prompt, context and
+    earlier turns form a stable prefix that provider-side prompt caching can
+    reuse. Each block is held to its share of the token budget by keeping the
+    largest entries and summarizing the long tail in one line.
+    """
+
+    def __init__(self, token_budget: int = PROMPT_CONTEXT_TOKENS):
+        self.token_budget = token_budget
+        self._versions: Dict[Tuple[str, str], int] = {}
+        self._blocks: Dict[Tuple[str, str], Tuple[Tuple[int, ...], ContextBlock]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._blocks)
+
+    def touch(self, user_id: str, *resources: str) -> None:
+        """Mark resources ("profile", "goals", "report") as changed"""
+        for resource in resources:
+            key = (user_id, resource)
+            self._versions[key] = self._versions.get(key, 0) + 1
+
+    def budget(self, name: str) -> int:
+        return int(self.token_budget * BLOCK_SHARES[name])
+
+    def block(self, user_id: str, name: str, build: Callable[[int], str]) -> ContextBlock:
+        versions = tuple(self._versions.get((user_id, resource), 0) for resource in BLOCK_DEPENDS[name])
+        cached = self._blocks.get((user_id, name))
+        if cached is not None and cached[0] == versions:
+            self.hits += 1
+            return cached[1]
+        self.misses += 1
+        text = build(self.budget(name))
+        block = ContextBlock(name, text, estimate_tokens(text))
+        self._blocks[(user_id, name)] = (versions, block)
+        return block
+
+    def render(self, user_profile: UserProfile, goals: Optional[List[FinancialGoal]] = None,
+               spending_report: Optional[SpendingReport] = None, include_goals: bool = True) -> str:
+        """
+        The user context for an agent prompt. The data passed in must be what
+        is stored for user_profile.user_id, since cached blocks are only
+        rebuilt when the stored resources are touched.
+        """
+        user_id = user_profile.user_id
+        blocks = [self.block(user_id, "profile", lambda budget: self._profile_text(user_profile))]
+        if include_goals:
+            blocks.append(self.block(user_id, "goals", lambda budget: self._goals_text(goals or [], budget)))
+        if spending_report is not None:
+            blocks.append(self.block(user_id, "spending", lambda budget: self._spending_text(spending_report, budget)))
+        return "\n".join(block.text for block in blocks)
+
+    @staticmethod
+    def _profile_text(user_profile: UserProfile) -> str:
+        # Income from statements, when there are any, is in the spending block
+        return (
+            f"User profile: Age {user_profile.age}, Annual Income ${user_profile.annual_income:,.2f}, "
+            f"Debts: {json.dumps(user_profile.debts, sort_keys=True)}."
+        )
+
+    @staticmethod
+    def _goals_text(goals: List[FinancialGoal], budget: int) -> str:
+        if not goals:
+            return "Goals: none yet."
+        lines = ["Goals:"]
+        _fit(
+            lines, goals,
+            lambda goal: "  - " + json.dumps(goal.model_dump(mode="json", exclude={"user_id", "goal_id"}), separators=(",", ":")),
+            lambda rest: f"  - ...and {len(rest)} more goals targeting ${sum(g.target_amount for g in rest):,.2f} in total",
+            budget
+        )
+        return "\n".join(lines)
+
+    @staticmethod
+    def _spending_text(spending_report: SpendingReport, budget: int) -> str:
+        total = spending_report.total_spending
+        lines = [
+            "--- SPENDING DATA FROM BANK STATEMENT ---",
+            f"Period: {spending_report.period}",
+            f"Total Income: ${spending_report.total_income:,.2f}",
+            f"Total Expenses: ${total:,.2f}",
+            f"Savings: ${spending_report.total_income - total:,.2f}",
+            "",
+            "Spending by Category:",
+        ]
+        # Largest first, name breaks ties so equal reports render identically
+        categories = sorted(spending_report.category_breakdown.items(), key=lambda item: (-item[1], item[0]))
+
+        def percent(amount: float) -> float:
+            return amount / total * 100 if total > 0 else 0
+
+        # Categories get half the block, subscriptions and insights share what is left
+        _fit(
+            lines, categories,
+            lambda item: f"  - {item[0]}: ${item[1]:,.2f} ({percent(item[1]):.1f}%)",
+            lambda rest: f"  - {len(rest)} smaller categories: ${sum(amount for _, amount in rest):,.2f} "
+                         f"({percent(sum(amount for _, amount in rest)):.1f}%)",
+            budget // 2
+        )
+
+        if spending_report.subscriptions:
+            subscriptions = sorted(spending_report.subscriptions, key=lambda sub: (-sub['amount'], sub['name']))
+            lines.append("")
+            lines.append(f"Recurring Subscriptions ({len(subscriptions)}):")
+            _fit(
+                lines, subscriptions,
+                lambda sub: f"  - {sub['name']}: ${sub['amount']:.2f}/{sub.get('frequency', 'monthly')}",
+                lambda rest: f"  - {len(rest)} smaller subscriptions: ${sum(sub['amount'] for sub in rest):.2f} per charge combined",
+                budget * 3 // 4
+            )
+
+        if spending_report.insights:
+            insights = sorted(spending_report.insights, key=lambda insight: -(insight.potential_savings or 0))
+            lines.append("")
+            lines.append("Spending Insights:")
+            _fit(
+                lines, insights,
+                lambda insight: f"  - {insight.title}: {insight.description}",
+                lambda rest: f"  - {len(rest)} more insights worth ${sum(i.potential_savings or 0 for i in rest):,.2f} in potential savings",
+                budget - estimate_tokens("--- END SPENDING DATA ---")
+            )
+
+        lines.append("--- END SPENDING DATA ---")
+        return "\n".join(lines)
+
+
+# Shared by the agents; main.py touches it alongside the response cache
+prompt_context = PromptContext()
@@ -0,0 +1,217 @@
+from typing import List, Dict, Tuple, Optional
+from datetime import date, timedelta
+import re
+import statistics
+from models.Transaction import Transaction
+
+# (name, expected days between charges, tolerance in days)
+CADENCES = [
+    ("weekly", 7, 2),
+    ("biweekly", 14, 3),
+    ("monthly", 30.4, 5),
+    ("quarterly", 91, 10),
+    ("annual", 365, 20),
+]
+
+# Known subscription brands, used only when a statement is too short to show a cadence
+SUBSCRIPTION_KEYWORDS = ['netflix', 'spotify', 'hulu', 'amazon prime', 'disney',
+                         'apple music', 'youtube premium', 'gym', 'membership']
+
+_NOISE_PREFIXES = re.compile(
+    r'^(pos |debit card purchase |debit purchase |purchase |recurring |ach |'
+    r'sq \*|sq\*|tst\* ?|paypal \*|pp\*|checkcard \d* ?)+'
+)
+_NON_ALPHA = re.compile(r'[^a-z& ]+')
+_NOISE_WORDS = {'pos', 'debit', 'card', 'purchase', 'recurring', 'payment', 'www', 'com',
+                'inc', 'llc', 'co', 'ltd', 'online', 'bill', 'autopay', 'the'}
+
+
+class RecurringChargeDetector:
+    """
+    Detect subscriptions and repeat purchases from a statement's transactions.
+
+    Transactions are grouped by normalized merchant, each group is sorted by
+    date, and the cadence and amount stability are inferred from inter-arrival
+    statistics. Grouping is linear and the per-group sorts keep the whole pass
+    at O(n log n), so multi-year histories are fine.
+    """
+
+    MIN_REGULARITY = 0.75   # Share of gaps that must match the cadence
+    MAX_AMOUNT_CV = 0.15    # Coefficient of variation for a "stable" amount
+    MIN_REPEATS = 3         # Visits before a merchant counts as a repeat purchase
+
+    @staticmethod
+    def normalize_merchant(description: str) -> str:
+        """Reduce a raw description like 'SQ *BLUE BOTTLE #1234 OAKLAND' to a grouping key"""
+        text = _NOISE_PREFIXES.sub('', description.lower().strip())
+        tokens = [
+            token for token in _NON_ALPHA.sub(' ', text).split()
+            if token not in _NOISE_WORDS and len(token) > 1
+        ]
+        # Trailing tokens are usually locations or reference codes
+        return ' '.join(tokens[:3]) or description.lower().strip()
+
+    @staticmethod
+    def merchant_key(transaction: Transaction) -> str:
+        if transaction.merchant:
+            return transaction.merchant.lower()
+        return RecurringChargeDetector.normalize_merchant(transaction.description)
+
+    @staticmethod
+    def _match_cadence(gaps: List[int]) -> Tuple[Optional[str], float, float]:
+        """Return (cadence name, cadence days, share of gaps matching it) for sorted inter-arrival gaps"""
+        median_gap = statistics.median(gaps)
+        for name, days, tolerance in CADENCES:
+            if abs(median_gap - days) <= tolerance:
+                regular = sum(1 for gap in gaps if abs(gap - days) <= tolerance)
+                return name, days, regular / len(gaps)
+        return None, 0.0, 0.0
+
+    @staticmethod
+    def _analyze_group(key: str, group: List[Transaction]) -> Dict:
+        """Summarize one merchant's charges, which must already be sorted by date"""
+        amounts = [abs(t.amount) for t in group]
+        gaps = [(b.date - a.date).days for a, b in zip(group, group[1:])]
+        cadence, cadence_days, regularity = (None, 0.0, 0.0)
+        if gaps:
+            cadence, cadence_days, regularity = RecurringChargeDetector._match_cadence(gaps)
+
+        mean_amount = statistics.fmean(amounts)
+        spread = statistics.pstdev(amounts) if len(amounts) > 1 else 0.0
+        cv = spread / mean_amount if mean_amount else 0.0
+        stable = cv <= RecurringChargeDetector.MAX_AMOUNT_CV or max(amounts) - min(amounts) <= 1.0
+
+        last = group[-1]
+        return {
+            "merchant": key,
+            "name": last.description,
+            "count": len(group),
+            "amounts": amounts,
+            "mean_amount": mean_amount,
+            "cv": cv,
+            "stable": stable,
+            "cadence": cadence,
+            "cadence_days": cadence_days,
+            "regularity": regularity,
+            "last": last,
+        }
+
+    @staticmethod
+    def _is_subscription(stats: Dict) -> bool:
+        return (
+            stats["cadence"] is not None
+            and stats["regularity"] >= RecurringChargeDetector.MIN_REGULARITY
+            and stats["stable"]
+        )
+
+    @staticmethod
+    def _subscription_entry(stats: Dict) -> Dict:
+        last = stats["last"]
+        amount = abs(last.amount)
+        cadence_days = stats["cadence_days"]
+        return {
+            "name": stats["name"],
+            "merchant": stats["merchant"],
+            "amount": round(amount, 2),
+            "frequency": stats["cadence"],
+            "monthly_amount": round(amount * 30.4 / cadence_days, 2),
+            "occurrences": stats["count"],
+            "amount_stability": round(max(0.0, 1 - stats["cv"]), 3),
+            "last_date": last.date.isoformat(),
+            "next_expected": (last.date + timedelta(days=round(cadence_days))).isoformat(),
+        }
+
+    @staticmethod
+    def _repeat_entry(stats: Dict) -> Dict:
+        total = sum(stats["amounts"])
+        return {
+            "name": stats["name"],
+            "merchant": stats["merchant"],
+            "count": stats["count"],
+            "total": round(total, 2),
+            "average_amount": round(total / stats["count"], 2),
+            "frequency": stats["cadence"] or "irregular",
+            "last_date": stats["last"].date.isoformat(),
+        }
+
+    @staticmethod
+    def _detect_group(key: str, group: List[Transaction], subscriptions: List[Dict], repeat_purchases: List[Dict]):
+        group.sort(key=lambda t: t.date)
+        stats = RecurringChargeDetector._analyze_group(key, group)
+
+        if RecurringChargeDetector._is_subscription(stats):
+            subscriptions.append(RecurringChargeDetector._subscription_entry(stats))
+            return
+
+        if len(group) >= 2:
+            # A merchant with variable purchases can still hide a fixed plan,
+            # e.g. a monthly membership among one-off orders at the same store
+            by_amount: Dict[int, List[Transaction]] = {}
+            for t in group:
+                by_amount.setdefault(round(abs(t.amount) * 100), []).append(t)  # Keyed on cents
+            if len(by_amount) > 1:
+                plan_charges = set()
+                for sub_group in by_amount.values():
+                    if len(sub_group) < 2:
+                        continue
+                    sub_stats = RecurringChargeDetector._analyze_group(key, sub_group)
+                    if RecurringChargeDetector._is_subscription(sub_stats):
+                        subscriptions.append(RecurringChargeDetector._subscription_entry(sub_stats))
+                        plan_charges.update(id(t) for t in sub_group)
+                if plan_charges:
+                    # Plan charges are counted as a subscription, so only the rest are repeat purchases
+                    group = [t for t in group if id(t) not in plan_charges]
+                    if len(group) < RecurringChargeDetector.MIN_REPEATS:
+                        return
+                    stats = RecurringChargeDetector._analyze_group(key, group)
+        elif any(keyword in group[0].description.lower() for keyword in SUBSCRIPTION_KEYWORDS):
+            # Statement too short to observe a cadence, trust the known brand
+            last = group[0]
+            subscriptions.append({
+                "name": last.description,
+                "merchant": key,
+                "amount": round(abs(last.amount), 2),
+                "frequency": "monthly",
+                "monthly_amount": round(abs(last.amount), 2),
+                "occurrences": 1,
+                "amount_stability": None,
+                "last_date": last.date.isoformat(),
+                "next_expected": (last.date + timedelta(days=30)).isoformat(),
+            })
+            return
+
+        if len(group) >= RecurringChargeDetector.MIN_REPEATS:
+            repeat_purchases.append(RecurringChargeDetector._repeat_entry(stats))
+
+    @staticmethod
+    def group_by_merchant(transactions: List[Transaction]) -> Dict[str, List[Transaction]]:
+        """Group expense transactions by merchant key"""
+        groups: Dict[str, List[Transaction]] = {}
+        for t in transactions:
+            if t.amount >= 0:
+                continue  # Only outgoing charges can be subscriptions or purchases
+            groups.setdefault(RecurringChargeDetector.merchant_key(t), []).append(t)
+        return groups
+
+    @staticmethod
+    def detect_groups(groups: Dict[str, List[Transaction]]) -> Tuple[List[Dict], List[Dict]]:
+        """Run detection over pre-grouped transactions. Returns (subscriptions, repeat_purchases)."""
+        subscriptions: List[Dict] = []
+        repeat_purchases: List[Dict] = []
+        for key, group in groups.items():
+            RecurringChargeDetector._detect_group(key, group, subscriptions, repeat_purchases)
+        subscriptions.sort(key=lambda s: s["monthly_amount"], reverse=True)
+        repeat_purchases.sort(key=lambda r: r["total"], reverse=True)
+        return subscriptions, repeat_purchases
+
+    @staticmethod
+    def detect(transactions: List[Transaction]) -> Tuple[List[Dict], List[Dict]]:
+        """
+        Detect recurring charges across a full set of transactions.
+
+        Returns:
+            (subscriptions, repeat_purchases) ready for SpendingReport
+        """
+        return RecurringChargeDetector.detect_groups(
+            RecurringChargeDetector.group_by_merchant(transactions)
+        )
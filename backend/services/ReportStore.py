@@ -0,0 +1,323 @@
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from array import array
+from collections.abc import Sequence as SequenceABC
+from datetime import date
+import heapq
+import itertools
+import json
+import mmap
+import os
+import struct
+import sys
+from models.Transaction import Transaction
+from models.SpendingReport import SpendingReport
+from models.SpendingInsight import SpendingInsight
+from models.UserProfile import UserProfile
+from services.SpendingRollup import SpendingRollup
+
+# Directory holding one report file per user, best given as an absolute path.
+# Empty (the default) disables persistence.
+REPORT_STORE_DIR = os.environ.get('REPORT_STORE_DIR', '')
+
+MAGIC = b'MTREPORT'
+FORMAT_VERSION = 1
+_PREAMBLE = struct.Struct('<8sII')  # magic, format version, header length
+_ALIGN = 8
+# Codes 0 in the merchant and account columns mean None
+_NONE = 0
+
+# Transaction columns and their array typecodes
+COLUMNS = {
+    'date': 'i',           # date ordinal
+    'amount': 'd',
+    'category': 'H',       # index into the category dictionary
+    'merchant': 'I',       # 1 + index into the merchant dictionary, 0 for None
+    'account': 'H',        # 1 + index into the account dictionary, 0 for None
+    'is_transfer': 'B',
+    'description_offsets': 'I',  # rows + 1 byte offsets into description_data
+    'description_data': 'B',     # UTF-8 descriptions back to back
+}
+
+
+def _pad(size: int) -> int:
+    return -size % _ALIGN
+
+
+class MappedTransactions(SequenceABC):
+    """
+    A report's transactions backed by memory-mapped columns.
+
+    Rows become Transaction objects only when they are read, and each one
+    is created once and kept, so flags set on it later (is_transfer) stick.
+    Transactions merged after loading are appended in memory.
+    """
+
+    def __init__(self, columns: Dict[str, Sequence], dictionaries: Dict[str, List[str]], rows: int):
+        self._columns = columns
+        self._categories = dictionaries['category']
+        self._merchants = [None] + dictionaries['merchant']
+        self._accounts = [None] + dictionaries['account']
+        self._rows = rows
+        self._cache: List[Optional[Transaction]] = [None] * rows
+        self._tail: List[Transaction] = []
+
+    def __len__(self) -> int:
+        return self._rows + len(self._tail)
+
+    def _description(self, i: int) -> str:
+        offsets = self._columns['description_offsets']
+        return bytes(self._columns['description_data'][offsets[i]:offsets[i + 1]]).decode('utf-8')
+
+    def _row(self, i: int) -> Transaction:
+        transaction = self._cache[i]
+        if transaction is None:
+            c = self._columns
+            transaction = self._cache[i] = Transaction(
+                date=date.fromordinal(c['date'][i]),
+                description=self._description(i),
+                amount=c['amount'][i],
+                category=self._categories[c['category'][i]],
+                merchant=self._merchants[c['merchant'][i]],
+                account=self._accounts[c['account'][i]],
+                is_transfer=bool(c['is_transfer'][i]),
+            )
+        return transaction
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("transaction index out of range")
+        return self._row(i) if i < self._rows else self._tail[i - self._rows]
+
+    def __iter__(self) -> Iterator[Transaction]:
+        for i in range(self._rows):
+            yield self._row(i)
+        yield from self._tail
+
+    def latest(self, limit: int) -> List[Transaction]:
+        """
+        The limit newest transactions by date, newest first, ties going to the
+        later row. Only the date column is scanned; just the rows returned
+        become Transaction objects.
+        """
+        dates = self._columns['date']
+        keys = itertools.chain(
+            zip(dates, range(self._rows)),
+            ((t.date.toordinal(), self._rows + i) for i, t in enumerate(self._tail))
+        )
+        return [self[position] for _, position in heapq.nlargest(limit, keys)]
+
+    def append(self, transaction: Transaction) -> None:
+        self._tail.append(transaction)
+
+    def extend(self, transactions: Iterable[Transaction]) -> None:
+        self._tail.extend(transactions)
+
+    def records(self) -> Iterator[tuple]:
+        """Column values per row, read from the mapping for rows never materialized"""
+        c = self._columns
+        for i in range(self._rows):
+            transaction = self._cache[i]
+            if transaction is not None:
+                yield _record(transaction)
+            else:
+                yield (c['date'][i], self._description(i), c['amount'][i], self._categories[c['category'][i]],
+                       self._merchants[c['merchant'][i]], self._accounts[c['account'][i]], bool(c['is_transfer'][i]))
+        for transaction in self._tail:
+            yield _record(transaction)
+
+
+def _record(t: Transaction) -> tuple:
+    return (t.date.toordinal(), t.description, t.amount, t.category, t.merchant, t.account, t.is_transfer)
+
+
+class ReportStore:
+    """
+    Spending reports on disk, one file per user, so they survive a restart
+    without re-parsing and re-categorizing statements.
+
+    A file is a small preamble (magic, format version, header length), a
+    JSON header with everything but the transactions (totals, breakdown,
+    subscriptions, insights, dictionaries, column directory), then one
+    8-byte aligned array per transaction column plus the daily rollup.
+    Loading maps the file and views the columns in place, so opening a
+    report costs the header alone and transactions are paged in as they
+    are read.
+    """
+
+    def __init__(self, directory: str = REPORT_STORE_DIR):
+        # Resolved once, so a relative setting does not follow later changes of working directory
+        self.directory = os.path.abspath(directory) if directory else ''
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.directory)
+
+    def path(self, user_id: str) -> str:
+        return os.path.join(self.directory, f"{user_id}.report")
+
+    def save(self, report: SpendingReport, user_profile: Optional[UserProfile] = None) -> str:
+        """Write a report atomically, replacing the previous file. Returns the path."""
+        transactions = report.transactions
+        records = transactions.records() if isinstance(transactions, MappedTransactions) \
+            else (_record(t) for t in transactions)
+
+        dictionaries: Dict[str, Dict[str, int]] = {'category': {}, 'merchant': {}, 'account': {}}
+        columns = {name: array(typecode) for name, typecode in COLUMNS.items()}
+        columns['description_offsets'].append(0)
+        for ordinal, description, amount, category, merchant, account, is_transfer in records:
+            columns['date'].append(ordinal)
+            columns['amount'].append(amount)
+            columns['category'].append(dictionaries['category'].setdefault(category, len(dictionaries['category'])))
+            columns['merchant'].append(
+                _NONE if merchant is None else 1 + dictionaries['merchant'].setdefault(merchant, len(dictionaries['merchant']))
+            )
+            columns['account'].append(
+                _NONE if account is None else 1 + dictionaries['account'].setdefault(account, len(dictionaries['account']))
+            )
+            columns['is_transfer'].append(1 if is_transfer else 0)
+            columns['description_data'].frombytes(description.encode('utf-8'))
+            columns['description_offsets'].append(len(columns['description_data']))
+
+        rollup = report.rollup
+        rollup_categories = sorted(rollup.daily)
+        for category in rollup_categories:
+            columns[f'rollup:{category}'] = array('d', rollup.daily[category])
+        columns['rollup_income'] = array('d', rollup.income_daily)
+
+        directory = {}
+        offset = 0
+        for name, values in columns.items():
+            size = len(values) * values.itemsize
+            directory[name] = [offset, size, values.typecode]
+            offset += size + _pad(size)
+
+        header = {
+            'byteorder': sys.byteorder,
+            'rows': len(columns['date']),
+            'report': {
+                'user_id': report.user_id,
+                'report_id': report.report_id,
+                'period': report.period,
+                'total_spending': report.total_spending,
+                'total_income': report.total_income,
+                'transfer_count': report.transfer_count,
+                'category_breakdown': report.category_breakdown,
+                'subscriptions': report.subscriptions,
+                'repeat_purchases': report.repeat_purchases,
+                'insights': [insight.model_dump(mode='json') for insight in report.insights],
+                'optimization_score': report.optimization_score,
+                'period_start': report.period_start.isoformat() if report.period_start else None,
+                'period_end': report.period_end.isoformat() if report.period_end else None,
+            },
+            'rollup': {
+                'start': rollup.start.isoformat() if rollup.start else None,
+                'categories': rollup_categories,
+            },
+            'dictionaries': {name: list(values) for name, values in dictionaries.items()},
+            'columns': directory,
+            'user_profile': user_profile.model_dump(mode='json') if user_profile else None,
+        }
+        header_bytes = json.dumps(header, separators=(',', ':')).encode('utf-8')
+        preamble = _PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header_bytes))
+
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(report.user_id)
+        temporary = f"{path}.tmp"
+        with open(temporary, 'wb') as f:
+            f.write(preamble)
+            f.write(header_bytes)
+            f.write(b'\0' * _pad(len(preamble) + len(header_bytes)))
+            for values in columns.values():
+                size = len(values) * values.itemsize
+                values.tofile(f)
+                f.write(b'\0' * _pad(size))
+            f.flush()
+            os.fsync(f.fileno())
+        # Readers holding a mapping of the old file keep it until they let go
+        os.replace(temporary, path)
+        return path
+
+    def load(self, user_id: str) -> Tuple[SpendingReport, Optional[UserProfile]]:
+        """
+        Map a stored report. Only the header is parsed here.
+
+        Raises:
+            FileNotFoundError: nothing stored for the user
+            ValueError: not a report file, or one written by a different format version
+        """
+        with open(self.path(user_id), 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, header_length = _PREAMBLE.unpack_from(mapped, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path(user_id)} is not a report file")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"{self.path(user_id)} has format version {version}, expected {FORMAT_VERSION}")
+        header_end = _PREAMBLE.size + header_length
+        header = json.loads(bytes(mapped[_PREAMBLE.size:header_end]))
+        data_start = header_end + _pad(header_end)
+
+        view = memoryview(mapped)
+        swap = header['byteorder'] != sys.byteorder
+        columns = {}
+        for name, (offset, size, typecode) in header['columns'].items():
+            raw = view[data_start + offset:data_start + offset + size]
+            if swap:
+                # Written on a machine of the other endianness, so copy and swap instead of viewing in place
+                values = array(typecode, bytes(raw))
+                values.byteswap()
+                columns[name] = values
+            else:
+                columns[name] = raw.cast(typecode)
+
+        fields = header['report']
+        rollup = SpendingRollup()
+        if header['rollup']['start']:
+            rollup.restore(
+                date.fromisoformat(header['rollup']['start']),
+                {category: list(columns[f'rollup:{category}']) for category in header['rollup']['categories']},
+                list(columns['rollup_income'])
+            )
+        report = SpendingReport(
+            user_id=fields['user_id'],
+            report_id=fields['report_id'],
+            period=fields['period'],
+            total_spending=fields['total_spending'],
+            total_income=fields['total_income'],
+            # Files written before the count was kept sum the flag column instead
+            transfer_count=fields['transfer_count'] if 'transfer_count' in fields else sum(columns['is_transfer']),
+            category_breakdown=fields['category_breakdown'],
+            subscriptions=fields['subscriptions'],
+            repeat_purchases=fields['repeat_purchases'],
+            insights=[SpendingInsight(**insight) for insight in fields['insights']],
+            optimization_score=fields['optimization_score'],
+            transactions=MappedTransactions(columns, header['dictionaries'], header['rows']),
+            period_start=date.fromisoformat(fields['period_start']) if fields['period_start'] else None,
+            period_end=date.fromisoformat(fields['period_end']) if fields['period_end'] else None,
+            rollup=rollup,
+        )
+        profile = header.get('user_profile')
+        return report, UserProfile(**profile) if profile else None
+
+    def load_all(self) -> Iterator[Tuple[SpendingReport, Optional[UserProfile]]]:
+        """Every stored report; unreadable files are reported and skipped"""
+        if not self.enabled or not os.path.isdir(self.directory):
+            return
+        for name in sorted(os.listdir(self.directory)):
+            if name.endswith('.report'):
+                try:
+                    yield self.load(name[:-len('.report')])
+                except (OSError, ValueError, KeyError) as e:
+                    print(f"Skipping stored report {name}: {e}")
+
+    def delete(self, user_id: str) -> None:
+        try:
+            os.remove(self.path(user_id))
+        except FileNotFoundError:
+            pass
+
+
+report_store = ReportStore()
@@ -0,0 +1,329 @@
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+from contextvars import ContextVar
+import asyncio
+import os
+import random
+import time
+from services.Metrics import metrics
+
+T = TypeVar('T')
+
+# Budget for a whole HTTP request; clients may ask for less with X-Request-Timeout (seconds)
+REQUEST_DEADLINE_SECONDS = float(os.environ.get('REQUEST_DEADLINE_SECONDS', '60'))
+# Budget for one background job (statement parse, roadmap generation)
+BACKGROUND_DEADLINE_SECONDS = float(os.environ.get('BACKGROUND_DEADLINE_SECONDS', '600'))
+# Consecutive failures that open a breaker, and how long it stays open
+BREAKER_FAILURE_THRESHOLD = int(os.environ.get('BREAKER_FAILURE_THRESHOLD', '5'))
+BREAKER_COOLDOWN_SECONDS = float(os.environ.get('BREAKER_COOLDOWN_SECONDS', '30'))
+# Hedging waits until the p95 of recent calls is known from at least this many samples
+HEDGE_MIN_SAMPLES = 20
+LATENCY_WINDOW = 200
+
+RETRIES = metrics.counter(
+    'moneytree_external_retries_total', 'Retried external calls by provider and key', ('provider', 'key', 'reason')
+)
+HEDGES = metrics.counter(
+    'moneytree_external_hedges_total', 'Hedged duplicate requests and which copy won', ('provider', 'key', 'winner')
+)
+SHORT_CIRCUITS = metrics.counter(
+    'moneytree_external_short_circuits_total', 'Calls rejected by an open breaker', ('provider', 'key')
+)
+
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """The request or job ran out of time before an external call could finish"""
+
+
+class CircuitOpenError(Exception):
+    """The breaker for this provider and key is open, so the call was not attempted"""
+
+    def __init__(self, provider: str, key: str, retry_after: float = 0.0):
+        super().__init__(f"Circuit open for {provider}/{key}")
+        self.provider = provider
+        self.key = key
+        self.retry_after = retry_after  # Seconds until the breaker lets a probe through
+
+
+# Absolute time.monotonic() by which the current request or job must finish
+_deadline: ContextVar[Optional[float]] = ContextVar('moneytree_deadline', default=None)
+
+
+class deadline:
+    """
+    Set the time budget for the enclosed block. Nested budgets can only
+    shrink the outer one unless replace=True, which background jobs use so
+    they are not bound by the request that spawned them.
+    """
+
+    def __init__(self, seconds: Optional[float], replace: bool = False):
+        self.seconds = seconds
+        self.replace = replace
+        self.token = None
+
+    def __enter__(self):
+        outer = None if self.replace else _deadline.get()
+        new = time.monotonic() + self.seconds if self.seconds is not None else None
+        if outer is not None and (new is None or outer < new):
+            new = outer
+        self.token = _deadline.set(new)
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> bool:
+        _deadline.reset(self.token)
+        return False
+
+
+def remaining() -> Optional[float]:
+    """Seconds left in the current budget, or None when there is no deadline"""
+    end = _deadline.get()
+    return None if end is None else end - time.monotonic()
+
+
+def _effective_timeout(timeout: Optional[float]) -> Optional[float]:
+    left = remaining()
+    if left is None:
+        return timeout
+    if left <= 0:
+        raise DeadlineExceeded("Deadline exceeded before the call started")
+    return left if timeout is None else min(timeout, left)
+
+
+class CircuitBreaker:
+    """
+    Closed until threshold consecutive failures, then open for cooldown
+    seconds, then half-open: a single probe call decides whether to close
+    again or re-open.
+    """
+
+    def __init__(self, threshold: int = BREAKER_FAILURE_THRESHOLD, cooldown: float = BREAKER_COOLDOWN_SECONDS):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return 'half_open'
+        return 'open'
+
+    def retry_after(self) -> float:
+        if self.opened_at is None:
+            return 0.0
+        return max(self.cooldown - (time.monotonic() - self.opened_at), 0.0)
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == 'closed':
+            return True
+        if state == 'half_open' and not self.probing:
+            self.probing = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def release_probe(self) -> None:
+        """An attempt ended without saying anything about the upstream's health"""
+        self.probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.probing or self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+        self.probing = False
+
+
+class LatencyTracker:
+    """Recent successful call latencies, with the p95 recomputed every few samples"""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.samples: List[float] = []
+        self.window = window
+        self.position = 0
+        self._p95: Optional[float] = None
+        self._since_update = 0
+
+    def observe(self, seconds: float) -> None:
+        if len(self.samples) < self.window:
+            self.samples.append(seconds)
+        else:
+            self.samples[self.position] = seconds
+            self.position = (self.position + 1) % self.window
+        self._since_update += 1
+        if self._p95 is None or self._since_update >= 10:
+            self._since_update = 0
+            if len(self.samples) >= HEDGE_MIN_SAMPLES:
+                ordered = sorted(self.samples)
+                self._p95 = ordered[int(len(ordered) * 0.95) - 1]
+
+    @property
+    def p95(self) -> Optional[float]:
+        return self._p95
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Timeouts, connection failures, rate limits and server errors are worth another try"""
+    if isinstance(error, DeadlineExceeded):
+        return False
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    status = getattr(error, 'status_code', None)
+    if status is not None:
+        return status == 408 or status == 429 or status >= 500
+    # SDK connection errors carry no status code
+    return 'Connection' in type(error).__name__ or 'Timeout' in type(error).__name__
+
+
+class Resilience:
+    """
+    Timeouts, circuit breakers, retries with jittered backoff and optional
+    hedging for calls to external services. Breakers and latency windows are
+    kept per (provider, key), where the key is usually the model or operation.
+    """
+
+    breakers: Dict[Tuple[str, str], CircuitBreaker] = {}
+    latencies: Dict[Tuple[str, str], LatencyTracker] = {}
+
+    @staticmethod
+    def breaker(provider: str, key: str) -> CircuitBreaker:
+        breaker = Resilience.breakers.get((provider, key))
+        if breaker is None:
+            breaker = Resilience.breakers[(provider, key)] = CircuitBreaker()
+        return breaker
+
+    @staticmethod
+    def is_open(provider: str, key: str) -> bool:
+        breaker = Resilience.breakers.get((provider, key))
+        return breaker is not None and breaker.state == 'open'
+
+    @staticmethod
+    async def _attempt(provider: str, key: str, make_call: Callable[[], Awaitable[T]],
+                       timeout: Optional[float], hedge: bool) -> T:
+        tracker = Resilience.latencies.setdefault((provider, key), LatencyTracker())
+        hedge_after = tracker.p95 if hedge else None
+        start = time.monotonic()
+
+        if hedge_after is None or (timeout is not None and hedge_after >= timeout):
+            result = await asyncio.wait_for(make_call(), timeout=timeout)
+            tracker.observe(time.monotonic() - start)
+            return result
+
+        # Send a duplicate once the first copy is slower than the p95 and take whichever answers first
+        primary = asyncio.ensure_future(make_call())
+        pending = {primary}
+        hedged = False
+        end = None if timeout is None else start + timeout
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                wait = None if end is None else max(end - time.monotonic(), 0)
+                if not hedged:
+                    wait = hedge_after if wait is None else min(wait, hedge_after)
+                done, pending = await asyncio.wait(pending, timeout=wait, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if hedged:
+                            HEDGES.inc(provider, key, 'primary' if task is primary else 'hedge')
+                        tracker.observe(time.monotonic() - start)
+                        return task.result()
+                    error = task.exception()
+                if not done:
+                    if hedged or (end is not None and time.monotonic() >= end):
+                        raise asyncio.TimeoutError()
+                    hedged = True
+                    pending.add(asyncio.ensure_future(make_call()))
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    @staticmethod
+    async def call(provider: str, key: str, make_call: Callable[[], Awaitable[T]],
+                   timeout: Optional[float] = None, retries: int = 1, hedge: bool = False,
+                   backoff: float = 0.5, max_backoff: float = 8.0) -> T:
+        """
+        Run make_call() under the breaker for (provider, key).
+
+        Each attempt is limited by timeout and by the time left before the
+        current deadline. Only retryable failures count against the breaker. Retryable failures are retried up to retries times
+        with full-jitter exponential backoff, as long as the deadline allows.
+
+        Raises:
+            CircuitOpenError: the breaker is open, so callers can fall back immediately
+            DeadlineExceeded: the budget ran out
+        """
+        breaker = Resilience.breaker(provider, key)
+        attempt = 0
+        while True:
+            if not breaker.allow():
+                SHORT_CIRCUITS.inc(provider, key)
+                raise CircuitOpenError(provider, key, breaker.retry_after())
+            attempt_timeout = _effective_timeout(timeout)
+            try:
+                result = await Resilience._attempt(provider, key, make_call, attempt_timeout, hedge)
+            except asyncio.CancelledError:
+                breaker.release_probe()
+                raise
+            except Exception as e:
+                # Only upstream trouble opens the breaker; a rejected request or a bug
+                # in the caller would otherwise cut every user off from the model
+                if is_retryable(e):
+                    breaker.record_failure()
+                else:
+                    breaker.release_probe()
+                left = remaining()
+                if isinstance(e, asyncio.TimeoutError) and left is not None and left <= 0:
+                    raise DeadlineExceeded(f"Deadline exceeded calling {provider}/{key}") from e
+                if attempt >= retries or not is_retryable(e):
+                    raise
+                delay = random.uniform(0, min(max_backoff, backoff * 2 ** attempt))
+                if left is not None and delay >= left:
+                    raise
+                attempt += 1
+                RETRIES.inc(provider, key, type(e).__name__)
+                await asyncio.sleep(delay)
+                continue
+            breaker.record_success()
+            return result
+
+    @staticmethod
+    async def call_sync(provider: str, key: str, func: Callable[[], T], timeout: Optional[float] = None,
+                        retries: int = 0) -> T:
+        """Run a blocking client call (e.g. boto3) in a worker thread under call()"""
+        return await Resilience.call(provider, key, lambda: asyncio.to_thread(func), timeout=timeout, retries=retries)
+
+
+metrics.callback(
+    'moneytree_circuit_breaker_open', 'Whether the breaker for an external provider and key is open (1) or not (0)',
+    lambda: {key: 1 if breaker.state == 'open' else 0 for key, breaker in Resilience.breakers.items()},
+    labels=('provider', 'key')
+)
+
+
+class DeadlineMiddleware:
+    """Pure ASGI middleware giving each request a deadline that external calls respect"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        seconds = REQUEST_DEADLINE_SECONDS
+        for name, value in scope.get('headers', ()):
+            if name == b'x-request-timeout':
+                try:
+                    seconds = min(seconds, max(float(value), 0.0))
+                except ValueError:
+                    pass
+                break
+        with deadline(seconds):
+            await self.app(scope, receive, send)
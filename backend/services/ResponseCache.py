@@ -0,0 +1,100 @@
+from typing import Any, Callable, Dict, Hashable, Tuple
+from collections import OrderedDict
+from dataclasses import asdict, is_dataclass
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+import json
+from fastapi import Response
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # Falls back to the stdlib encoder
+    orjson = None
+
+
+def _default(obj: Any) -> Any:
+    """Encode the types the endpoints return that JSON has no native form for"""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, Enum):
+        return obj.value
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if is_dataclass(obj) and not isinstance(obj, type):
+        return asdict(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def encode_json(payload: Any) -> bytes:
+    """Serialize a response payload straight to bytes, skipping jsonable_encoder"""
+    if orjson is not None:
+        return orjson.dumps(payload, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(payload, default=_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+class ResponseCache:
+    """
+    Encoded response bodies for read endpoints, keyed by user, endpoint and
+    query parameters.
+
+    Every entry remembers the version of each resource ("goals", "missions",
+    "report", ...) it was built from. Write paths bump a resource's version with
+    touch(), which makes every dependent entry stale without having to find it.
+    Stale entries are rebuilt on the next read and the least recently used
+    entries are evicted once the cache is full.
+    """
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._versions: Dict[Tuple[str, str], int] = {}
+        self._entries: "OrderedDict[Tuple, Tuple[Tuple[int, ...], bytes]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def version(self, user_id: str, resource: str) -> int:
+        return self._versions.get((user_id, resource), 0)
+
+    def touch(self, user_id: str, *resources: str) -> None:
+        """Mark resources as changed so responses built from them are rebuilt"""
+        for resource in resources:
+            key = (user_id, resource)
+            self._versions[key] = self._versions.get(key, 0) + 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def get_or_build(self, user_id: str, name: str, depends: Tuple[str, ...],
+                     build: Callable[[], Any], params: Tuple[Hashable, ...] = ()) -> bytes:
+        """
+        Return the encoded body for this request, building and encoding it only
+        when one of the resources it depends on changed since it was cached.
+        Exceptions raised by build (e.g. HTTPException) are never cached.
+        """
+        versions = tuple(self.version(user_id, resource) for resource in depends)
+        key = (user_id, name, params)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == versions:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[1]
+
+        self.misses += 1
+        body = encode_json(build())
+        self._entries[key] = (versions, body)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return body
+
+    def respond(self, user_id: str, name: str, depends: Tuple[str, ...],
+                build: Callable[[], Any], params: Tuple[Hashable, ...] = ()) -> Response:
+        """get_or_build wrapped in a raw Response so FastAPI does not re-encode it"""
+        body = self.get_or_build(user_id, name, depends, build, params)
+        return Response(content=body, media_type="application/json")
@@ -0,0 +1,168 @@
+from typing import Dict, List, Optional
+from datetime import date, timedelta
+import calendar
+
+GRANULARITIES = ("day", "week", "month")
+# Longest time series served in one response, whatever the granularity
+MAX_BUCKETS = 1000
+
+
+class SpendingRollup:
+    """
+    Daily spending buckets per category with prefix sums.
+
+    Any date range for any category is answered with two prefix lookups, so a
+    time series costs O(buckets x categories) no matter how many transactions
+    the report holds. New transactions only rebuild the prefix sums from the
+    earliest day they touch.
+    """
+
+    def __init__(self):
+        self.start: Optional[date] = None
+        self.days = 0
+        self.daily: Dict[str, List[float]] = {}    # category -> spending per day
+        self.prefix: Dict[str, List[float]] = {}   # category -> running total, length days + 1
+        self.income_daily: List[float] = []
+        self.income_prefix: List[float] = [0.0]
+
+    def _ensure_range(self, first: date, last: date):
+        """Grow the day arrays so first..last are covered"""
+        if self.start is None:
+            self.start = first
+        if first < self.start:
+            extra = (self.start - first).days
+            for category in self.daily:
+                self.daily[category][:0] = [0.0] * extra
+            self.income_daily[:0] = [0.0] * extra
+            self.start = first
+            self.days += extra
+        end_index = (last - self.start).days + 1
+        if end_index > self.days:
+            extra = end_index - self.days
+            for category in self.daily:
+                self.daily[category].extend([0.0] * extra)
+            self.income_daily.extend([0.0] * extra)
+            self.days = end_index
+
+    @staticmethod
+    def _rebuild_prefix(daily: List[float], prefix: List[float], from_index: int) -> List[float]:
+        if not prefix:
+            prefix = [0.0]
+            from_index = 0
+        if len(prefix) < len(daily) + 1:
+            # Appended days repeat the last running total until rebuilt below
+            from_index = min(from_index, len(prefix) - 1)
+            prefix.extend([prefix[-1]] * (len(daily) + 1 - len(prefix)))
+        running = prefix[from_index]
+        for i in range(from_index, len(daily)):
+            running += daily[i]
+            prefix[i + 1] = running
+        return prefix
+
+    def restore(self, start: date, daily: Dict[str, List[float]], income_daily: List[float]) -> None:
+        """Reinstate saved daily buckets and recompute the prefix sums"""
+        self.start = start
+        self.days = len(income_daily)
+        self.daily = daily
+        self.income_daily = income_daily
+        self.prefix = {category: self._rebuild_prefix(values, [], 0) for category, values in daily.items()}
+        self.income_prefix = self._rebuild_prefix(income_daily, [], 0)
+
+    def add(self, transactions: List) -> None:
+        """Fold transactions into the daily buckets and refresh the affected prefix sums"""
+        self._fold([t for t in transactions if not t.is_transfer], 1.0)
+
+    def remove(self, transactions: List) -> None:
+        """Take back transactions added earlier, e.g. once they turn out to be transfers"""
+        self._fold(transactions, -1.0)
+
+    def _fold(self, transactions: List, sign: float) -> None:
+        if not transactions:
+            return
+        old_start = self.start
+        self._ensure_range(min(t.date for t in transactions), max(t.date for t in transactions))
+        # Prepending days shifts every index, so everything must be rebuilt
+        rebuild_all = old_start is not None and self.start < old_start
+
+        dirty: Dict[str, int] = {}
+        income_dirty = self.days
+        for t in transactions:
+            index = (t.date - self.start).days
+            if t.amount > 0:
+                self.income_daily[index] += sign * t.amount
+                income_dirty = min(income_dirty, index)
+                continue
+            category = t.category
+            if category not in self.daily:
+                self.daily[category] = [0.0] * self.days
+            self.daily[category][index] -= sign * t.amount
+            dirty[category] = min(dirty.get(category, index), index)
+
+        for category, daily in self.daily.items():
+            if rebuild_all:
+                self.prefix[category] = self._rebuild_prefix(daily, [], 0)
+            elif category in dirty or len(self.prefix.get(category, ())) != self.days + 1:
+                from_index = dirty.get(category, self.days)
+                self.prefix[category] = self._rebuild_prefix(daily, self.prefix.get(category, []), from_index)
+        self.income_prefix = self._rebuild_prefix(
+            self.income_daily, [] if rebuild_all else self.income_prefix, income_dirty
+        )
+
+    def _range_sum(self, prefix: List[float], first: date, last: date) -> float:
+        """Sum of the days first..last inclusive, clamped to the covered range"""
+        a = max((first - self.start).days, 0)
+        b = min((last - self.start).days + 1, self.days)
+        if b <= a:
+            return 0.0
+        return prefix[b] - prefix[a]
+
+    @staticmethod
+    def bucket_count(first: date, last: date, granularity: str) -> int:
+        """Number of buckets bucket_bounds would return, without building them"""
+        if granularity == "day":
+            return (last - first).days + 1
+        if granularity == "week":
+            return (last.toordinal() - (first.toordinal() - first.weekday())) // 7 + 1
+        return (last.year - first.year) * 12 + last.month - first.month + 1
+
+    @staticmethod
+    def bucket_bounds(first: date, last: date, granularity: str) -> List[tuple]:
+        """Inclusive (start, end) date pairs covering first..last"""
+        bounds = []
+        current = first
+        while True:
+            if granularity == "day":
+                days = 0
+            elif granularity == "week":
+                days = 6 - current.weekday()  # Weeks end on Sunday
+            else:
+                days = calendar.monthrange(current.year, current.month)[1] - current.day
+            # Clamped before adding so ranges ending at date.max do not overflow
+            end = current + timedelta(days=min(days, (last - current).days))
+            bounds.append((current, end))
+            if end == last:
+                return bounds
+            current = end + timedelta(days=1)
+
+    def timeseries(self, first: date, last: date, granularity: str = "day",
+                   categories: Optional[List[str]] = None) -> List[Dict]:
+        """Spending per category and income for each bucket between first and last"""
+        if self.start is None:
+            return []
+        categories = categories if categories is not None else list(self.daily)
+        buckets = []
+        for bucket_start, bucket_end in self.bucket_bounds(first, last, granularity):
+            by_category = {}
+            for category in categories:
+                prefix = self.prefix.get(category)
+                amount = self._range_sum(prefix, bucket_start, bucket_end) if prefix else 0.0
+                if amount:
+                    by_category[category] = round(amount, 2)
+            buckets.append({
+                "start": bucket_start.isoformat(),
+                "end": bucket_end.isoformat(),
+                "spending": round(sum(by_category.values(), 0.0), 2),
+                "income": round(self._range_sum(self.income_prefix, bucket_start, bucket_end), 2),
+                "categories": by_category,
+            })
+        return buckets
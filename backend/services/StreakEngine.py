@@ -0,0 +1,131 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+from array import array
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+import os
+from models.Mission import Mission
+
+# Time zone for day boundaries of users who have not set one
+STREAK_TIMEZONE = os.environ.get('STREAK_TIMEZONE', 'UTC')
+# Streak lengths in days that publish a streak_milestone feed event
+STREAK_MILESTONES = (3, 7, 14, 30, 60, 100, 180, 365)
+
+# Packed bulk-recompute keys: user index in the high bits, local day ordinal in the low ones
+_DAY_BITS = 32
+
+
+def _zone(name: str) -> ZoneInfo:
+    """ZoneInfo for an IANA name. Raises ValueError for unknown names."""
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"Unknown time zone: {name}")
+
+
+class StreakEngine:
+    """
+    Current and longest mission streaks per user: consecutive local days,
+    in the user's time zone, with at least one completed mission.
+
+    Each user keeps (last completion day, current streak, longest streak),
+    so recording a completion is O(1). A streak lapses once a full local
+    day passes without a completion; that is applied when it is read, so
+    nothing has to run at midnight. recompute() rebuilds every user from
+    completion history in one sort over packed integer keys.
+    """
+
+    def __init__(self, default_timezone: str = STREAK_TIMEZONE):
+        self._default = _zone(default_timezone)
+        self._zones: Dict[str, ZoneInfo] = {}
+        self._states: Dict[str, List[int]] = {}  # user_id -> [last day ordinal, current, longest]
+
+    def set_timezone(self, user_id: str, name: Optional[str]) -> None:
+        """Use an IANA time zone for a user's day boundaries; None resets to the default"""
+        if name:
+            self._zones[user_id] = _zone(name)
+        else:
+            self._zones.pop(user_id, None)
+
+    def local_day(self, user_id: str, moment: datetime) -> int:
+        """Ordinal of the user's local date at moment; naive datetimes are taken as UTC"""
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=timezone.utc)
+        return moment.astimezone(self._zones.get(user_id, self._default)).date().toordinal()
+
+    def today(self, user_id: str, now: Optional[datetime] = None) -> int:
+        return self.local_day(user_id, now or datetime.now(timezone.utc))
+
+    def record(self, user_id: str, completed_at: datetime) -> Optional[int]:
+        """
+        Count a completion. Returns the current streak if this completion
+        extended or started it, None if the day was already counted.
+        """
+        day = self.local_day(user_id, completed_at)
+        state = self._states.get(user_id)
+        if state is None:
+            self._states[user_id] = [day, 1, 1]
+            return 1
+        last_day, current, longest = state
+        if day <= last_day:
+            return None  # Same day, or a late completion for a day already past
+        current = current + 1 if day == last_day + 1 else 1
+        self._states[user_id] = [day, current, max(longest, current)]
+        return current
+
+    def streak(self, user_id: str, now: Optional[datetime] = None) -> Tuple[int, int]:
+        """(current, longest). The current streak is 0 once yesterday passed without a completion."""
+        state = self._states.get(user_id)
+        if state is None:
+            return 0, 0
+        last_day, current, longest = state
+        return (current if self.today(user_id, now) - last_day <= 1 else 0), longest
+
+    def recompute_user(self, user_id: str, completions: Iterable[datetime]) -> None:
+        """Rebuild one user's streaks, e.g. after a completion was undone"""
+        self._states.pop(user_id, None)
+        self.recompute((user_id, moment) for moment in completions)
+
+    def recompute(self, completions: Iterable[Tuple[str, datetime]]) -> None:
+        """
+        Rebuild streaks from (user_id, completed_at) history for backfills.
+        Users that appear are replaced; others are left alone.
+
+        Completions become one integer key each (user index, local day), so
+        a single sort groups them by user and day and one pass finds every
+        run of consecutive days.
+        """
+        users: Dict[str, int] = {}
+        keys = array('q')
+        for user_id, moment in completions:
+            index = users.setdefault(user_id, len(users))
+            keys.append(index << _DAY_BITS | self.local_day(user_id, moment))
+        names = list(users)
+        day_mask = (1 << _DAY_BITS) - 1
+
+        previous = -1
+        for key in sorted(keys):
+            if key == previous:
+                continue  # Another completion the same day
+            user_id = names[key >> _DAY_BITS]
+            day = key & day_mask
+            state = self._states.get(user_id) if key >> _DAY_BITS == previous >> _DAY_BITS else None
+            if state is None:
+                self._states[user_id] = [day, 1, 1]
+            else:
+                current = state[1] + 1 if day == state[0] + 1 else 1
+                self._states[user_id] = [day, current, max(state[2], current)]
+            previous = key
+
+    def rebuild(self, missions_db: Dict[str, Dict[str, List[Mission]]]) -> None:
+        """Recompute every user from the completion times of their stored missions"""
+        self.recompute(
+            (user_id, mission.completed_at)
+            for user_id, goals in missions_db.items()
+            for missions in goals.values()
+            for mission in missions
+            if mission.status == "completed" and mission.completed_at is not None
+        )
+
+
+# Updated from main.py wherever missions are completed
+streak_engine = StreakEngine()
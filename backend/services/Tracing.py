@@ -0,0 +1,253 @@
+from typing import Any, Dict, Optional
+from contextvars import ContextVar
+import functools
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+
+# Fraction of root spans (requests, scripts) that are recorded. 0 turns tracing off.
+TRACE_SAMPLE_RATE = float(os.environ.get('TRACE_SAMPLE_RATE', '0'))
+# Finished spans are appended here, one JSON object per line
+TRACE_EXPORT_PATH = os.environ.get('TRACE_EXPORT_PATH', 'traces.jsonl')
+# Sampled root spans slower than this get a stack profile exported with them. 0 turns it off.
+TRACE_PROFILE_SLOW_MS = float(os.environ.get('TRACE_PROFILE_SLOW_MS', '0'))
+PROFILE_INTERVAL_SECONDS = 0.005
+
+
+class Span:
+    """One timed stage. Attributes are only kept for sampled spans."""
+
+    __slots__ = ('name', 'trace_id', 'span_id', 'parent_id', 'sampled', 'attributes',
+                 'start', 'started_at', 'duration_ms', 'status')
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], sampled: bool):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16] if sampled else ''
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.attributes: Dict[str, Any] = {}
+        self.start = time.perf_counter()
+        self.started_at = time.time()
+        self.duration_ms = 0.0
+        self.status = 'ok'
+
+    def set(self, key: str, value: Any) -> None:
+        if self.sampled:
+            self.attributes[key] = value
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'type': 'span',
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start': self.started_at,
+            'duration_ms': round(self.duration_ms, 3),
+            'status': self.status,
+            'attributes': self.attributes,
+        }
+
+
+# The current span follows the code through awaits, and asyncio.create_task,
+# gather and to_thread copy it, so background work nests under the request
+# that started it
+_current_span: ContextVar[Optional[Span]] = ContextVar('moneytree_span', default=None)
+
+
+class JsonLinesExporter:
+    """Append finished spans and profiles to a local JSON-lines file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+        self._lock = threading.Lock()
+
+    def export(self, record: Dict[str, Any]) -> None:
+        line = json.dumps(record, default=str) + '\n'
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, 'a', buffering=1)
+            self._file.write(line)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class SamplingProfiler:
+    """
+    Samples one thread's Python stack at a fixed interval and counts collapsed
+    stacks ("module:function;module:function" root first). For the event loop
+    thread this shows where the loop spent its time while a slow request ran,
+    including other requests sharing the loop.
+    """
+
+    _active = threading.Lock()  # One profiler at a time keeps the overhead bounded
+
+    def __init__(self, thread_id: int, interval: float = PROFILE_INTERVAL_SECONDS):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Dict[str, int] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> bool:
+        """Start sampling unless another profiler is already running"""
+        if not SamplingProfiler._active.acquire(blocking=False):
+            return False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return True
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if names:
+                stack = ';'.join(reversed(names))
+                self.stacks[stack] = self.stacks.get(stack, 0) + 1
+
+    def stop(self) -> Dict[str, int]:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            SamplingProfiler._active.release()
+        return self.stacks
+
+
+class Tracer:
+    """
+    Nested spans with head sampling: the decision is made once at the root
+    span and inherited by every child, so unsampled requests only pay for a
+    context variable set and reset per stage.
+    """
+
+    def __init__(self, sample_rate: float, exporter: JsonLinesExporter, profile_slow_ms: float = 0.0):
+        self.sample_rate = sample_rate
+        self.exporter = exporter
+        self.profile_slow_ms = profile_slow_ms
+
+    def span(self, name: str, **attributes: Any) -> '_SpanScope':
+        """Time a block as a child of the current span, or as a new trace root"""
+        return _SpanScope(self, name, attributes)
+
+    def _finish(self, current: Span, stacks: Optional[Dict[str, int]]) -> None:
+        current.duration_ms = (time.perf_counter() - current.start) * 1000
+        if not current.sampled:
+            return
+        self.exporter.export(current.to_dict())
+        if stacks and current.duration_ms >= self.profile_slow_ms:
+            self.exporter.export({
+                'type': 'profile',
+                'trace_id': current.trace_id,
+                'span_id': current.span_id,
+                'name': current.name,
+                'duration_ms': round(current.duration_ms, 3),
+                'interval_ms': PROFILE_INTERVAL_SECONDS * 1000,
+                'stacks': dict(sorted(stacks.items(), key=lambda item: item[1], reverse=True)[:50]),
+            })
+
+
+class _SpanScope:
+    """Context manager behind Tracer.span"""
+
+    __slots__ = ('tracer', 'name', 'attributes', 'span', 'token', 'profiler')
+
+    def __init__(self, tracer: Tracer, name: str, attributes: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.attributes = attributes
+        self.span: Optional[Span] = None
+        self.token = None
+        self.profiler: Optional[SamplingProfiler] = None
+
+    def __enter__(self) -> Span:
+        parent = _current_span.get()
+        if parent is not None and not parent.sampled:
+            # Nothing below an unsampled root is recorded, so skip the bookkeeping
+            return parent
+        if parent is None:
+            sampled = self.tracer.sample_rate > 0 and random.random() < self.tracer.sample_rate
+            current = Span(self.name, uuid.uuid4().hex if sampled else '', None, sampled)
+            if sampled and self.tracer.profile_slow_ms > 0:
+                profiler = SamplingProfiler(threading.get_ident())
+                self.profiler = profiler if profiler.start() else None
+        else:
+            current = Span(self.name, parent.trace_id, parent.span_id, True)
+        if current.sampled and self.attributes:
+            current.attributes.update(self.attributes)
+        self.span = current
+        self.token = _current_span.set(current)
+        return current
+
+    def __exit__(self, exc_type, exc, traceback) -> bool:
+        if self.span is None:
+            return False
+        _current_span.reset(self.token)
+        if exc_type is not None:
+            self.span.status = 'error'
+            self.span.set('error', exc_type.__name__)
+        stacks = self.profiler.stop() if self.profiler is not None else None
+        self.tracer._finish(self.span, stacks)
+        return False
+
+
+tracer = Tracer(TRACE_SAMPLE_RATE, JsonLinesExporter(TRACE_EXPORT_PATH), TRACE_PROFILE_SLOW_MS)
+
+
+def span(name: str, **attributes: Any):
+    """Shorthand for tracer.span"""
+    return tracer.span(name, **attributes)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def traced(name: str):
+    """Decorator running an async function inside a span"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with tracer.span(name):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class TracingMiddleware:
+    """Pure ASGI middleware opening a root span per HTTP request, named after its route template"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        with tracer.span(f"{scope['method']} {scope['path']}") as root:
+            async def send_with_status(message):
+                if message['type'] == 'http.response.start':
+                    root.set('http.status', message['status'])
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                route = scope.get('route')
+                if route is not None and getattr(route, 'path', None):
+                    root.name = f"{scope['method']} {route.path}"
+                root.set('http.path', scope['path'])
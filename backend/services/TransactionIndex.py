@@ -0,0 +1,175 @@
+from typing import Dict, Iterator, List, Optional, Tuple
+from datetime import date
+from bisect import bisect_left, bisect_right
+import re
+from models.Transaction import Transaction
+
+_TOKEN = re.compile(r'[a-z0-9]+')
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in _TOKEN.findall(text.lower()) if len(token) > 1]
+
+
+def _contains(posting: List[int], tx_id: int) -> bool:
+    """Membership test on a sorted posting list without building a set"""
+    position = bisect_left(posting, tx_id)
+    return position < len(posting) and posting[position] == tx_id
+
+
+class TransactionIndex:
+    """
+    Search index over one user's transactions.
+
+    Transactions are identified by their position in the report, which only
+    ever grows by appending. The index keeps an inverted index from description
+    tokens and from categories to ids, plus (date, id) and (|amount|, id)
+    sorted arrays. A query starts from whichever of these is most selective, so
+    it touches the matching rows rather than the whole history. Results come
+    newest first and are paged with a (date, id) cursor.
+    """
+
+    def __init__(self, report_id: str):
+        self.report_id = report_id
+        self.transactions: List[Transaction] = []
+        self.tokens: Dict[str, List[int]] = {}
+        self.categories: Dict[str, List[int]] = {}
+        self.by_date: List[Tuple[int, int]] = []       # (date ordinal, id)
+        self.by_amount: List[Tuple[float, int]] = []   # (|amount|, id)
+
+    def __len__(self) -> int:
+        return len(self.transactions)
+
+    def add(self, transactions: List[Transaction]) -> None:
+        """Index appended transactions. Posting lists stay sorted because ids only grow."""
+        new_dates = []
+        new_amounts = []
+        for transaction in transactions:
+            tx_id = len(self.transactions)
+            self.transactions.append(transaction)
+            for token in set(tokenize(transaction.description)):
+                self.tokens.setdefault(token, []).append(tx_id)
+            self.categories.setdefault(transaction.category, []).append(tx_id)
+            new_dates.append((transaction.date.toordinal(), tx_id))
+            new_amounts.append((abs(transaction.amount), tx_id))
+        # Timsort merges the existing sorted run with the sorted delta in linear time
+        new_dates.sort()
+        new_amounts.sort()
+        self.by_date.extend(new_dates)
+        self.by_date.sort()
+        self.by_amount.extend(new_amounts)
+        self.by_amount.sort()
+
+    def recent(self, limit: int) -> List[Transaction]:
+        return [self.transactions[tx_id] for _, tx_id in reversed(self.by_date[-limit:])]
+
+    def in_date_range(self, date_from: Optional[date], date_to: Optional[date]) -> Iterator[Transaction]:
+        """Transactions between date_from and date_to inclusive, oldest first"""
+        lo, hi = self._date_slice(date_from, date_to, None)
+        # Copy the ids so a statement merged mid-iteration cannot shift the slice
+        for _, tx_id in self.by_date[lo:hi]:
+            yield self.transactions[tx_id]
+
+    def _date_slice(self, date_from: Optional[date], date_to: Optional[date],
+                    before: Optional[Tuple[int, int]]) -> Tuple[int, int]:
+        lo = bisect_left(self.by_date, (date_from.toordinal(), -1)) if date_from else 0
+        hi = bisect_right(self.by_date, (date_to.toordinal(), len(self.transactions))) if date_to else len(self.by_date)
+        if before is not None:
+            hi = min(hi, bisect_left(self.by_date, before))
+        return lo, hi
+
+    def _amount_slice(self, min_amount: Optional[float], max_amount: Optional[float]) -> Tuple[int, int]:
+        lo = bisect_left(self.by_amount, (min_amount, -1)) if min_amount is not None else 0
+        hi = bisect_right(self.by_amount, (max_amount, len(self.transactions))) if max_amount is not None else len(self.by_amount)
+        return lo, hi
+
+    def search(
+        self,
+        query: Optional[str] = None,
+        category: Optional[str] = None,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        min_amount: Optional[float] = None,
+        max_amount: Optional[float] = None,
+        before: Optional[Tuple[int, int]] = None,
+        limit: int = 50,
+    ) -> Tuple[List[Tuple[int, Transaction]], Optional[Tuple[int, int]]]:
+        """
+        Find transactions matching every given filter, newest first.
+        Amount bounds apply to the absolute amount.
+
+        Returns:
+            (page of (id, transaction), sort key to pass as `before` for the next page or None)
+        """
+        date_lo, date_hi = self._date_slice(date_from, date_to, before)
+        date_count = max(date_hi - date_lo, 0)
+
+        postings: List[List[int]] = []
+        if query:
+            for token in set(tokenize(query)):
+                posting = self.tokens.get(token)
+                if not posting:
+                    return [], None
+                postings.append(posting)
+        if category is not None:
+            posting = self.categories.get(category)
+            if not posting:
+                return [], None
+            postings.append(posting)
+
+        amount_filtered = min_amount is not None or max_amount is not None
+        amount_lo, amount_hi = self._amount_slice(min_amount, max_amount)
+        amount_count = max(amount_hi - amount_lo, 0)
+
+        smallest_posting = min(postings, key=len) if postings else None
+
+        def matches(tx_id: int) -> bool:
+            transaction = self.transactions[tx_id]
+            key = (transaction.date.toordinal(), tx_id)
+            if before is not None and key >= before:
+                return False
+            if date_from and transaction.date < date_from:
+                return False
+            if date_to and transaction.date > date_to:
+                return False
+            if amount_filtered:
+                amount = abs(transaction.amount)
+                if (min_amount is not None and amount < min_amount) or (max_amount is not None and amount > max_amount):
+                    return False
+            return True
+
+        if smallest_posting is not None and len(smallest_posting) < date_count \
+                and (not amount_filtered or len(smallest_posting) <= amount_count):
+            # Intersect the posting lists by probing the others for each id in the smallest
+            others = [posting for posting in postings if posting is not smallest_posting]
+            keys = sorted(
+                (
+                    (self.transactions[i].date.toordinal(), i)
+                    for i in smallest_posting
+                    if matches(i) and all(_contains(posting, i) for posting in others)
+                ),
+                reverse=True
+            )
+        elif amount_filtered and amount_count < date_count:
+            keys = sorted(
+                (
+                    (self.transactions[i].date.toordinal(), i)
+                    for _, i in self.by_amount[amount_lo:amount_hi]
+                    if matches(i) and all(_contains(posting, i) for posting in postings)
+                ),
+                reverse=True
+            )
+        else:
+            # Walk the date index backwards and stop as soon as the page is full
+            keys = []
+            for position in range(date_hi - 1, date_lo - 1, -1):
+                key = self.by_date[position]
+                tx_id = key[1]
+                if matches(tx_id) and all(_contains(posting, tx_id) for posting in postings):
+                    keys.append(key)
+                    if len(keys) > limit:
+                        break
+
+        page = keys[:limit]
+        next_key = page[-1] if len(keys) > limit else None
+        return [(tx_id, self.transactions[tx_id]) for _, tx_id in page], next_key
@@ -0,0 +1,81 @@
+from typing import Deque, Dict, List, Sequence, Tuple
+from collections import deque
+import os
+from models.Transaction import Transaction
+
+# Days a transfer may take to show up on the receiving account
+TRANSFER_WINDOW_DAYS = int(os.environ.get('TRANSFER_WINDOW_DAYS', '3'))
+
+
+class TransferMatcher:
+    """
+    Find internal transfers between a user's accounts: an outflow on one
+    account and an inflow of the same amount on another within a few days,
+    such as a checking account paying a card or moving money to savings.
+
+    Outflows and inflows are each sorted by (amount in cents, date) and walked
+    together like a sort-merge join, so only transactions of equal amount are
+    ever compared. Within a run of equal amounts the inflows wait in one
+    date-ordered queue per account; an outflow only looks at the head of each
+    other account's queue, and matched or expired inflows are popped, so the
+    whole pass is O(n log n) plus O(n * accounts).
+    """
+
+    @staticmethod
+    def _sorted(transactions: Sequence[Transaction], sign: int) -> List[Tuple[int, int, int]]:
+        """(cents, date ordinal, position) for the outflows (sign -1) or inflows (sign 1) with an account"""
+        return sorted(
+            (round(t.amount * sign * 100), t.date.toordinal(), position)
+            for position, t in enumerate(transactions)
+            if t.account and not t.is_transfer and t.amount * sign > 0
+        )
+
+    @staticmethod
+    def match(transactions: Sequence[Transaction], window_days: int = TRANSFER_WINDOW_DAYS) -> List[Tuple[int, int]]:
+        """
+        Pair transfers and mark both sides with is_transfer.
+        Each outflow takes the earliest unmatched inflow of the same amount on
+        a different account within window_days of it.
+
+        Returns:
+            (outflow position, inflow position) pairs into transactions
+        """
+        outflows = TransferMatcher._sorted(transactions, -1)
+        inflows = TransferMatcher._sorted(transactions, 1)
+        pairs = []
+        i = j = 0
+        while i < len(outflows) and j < len(inflows):
+            cents = outflows[i][0]
+            if cents < inflows[j][0]:
+                i += 1
+                continue
+            if cents > inflows[j][0]:
+                j += 1
+                continue
+            # Equal-amount runs on both sides, each in date order
+            i_end, j_end = i, j
+            while i_end < len(outflows) and outflows[i_end][0] == cents:
+                i_end += 1
+            waiting: Dict[str, Deque[Tuple[int, int]]] = {}  # account -> unmatched (day, position) inflows
+            while j_end < len(inflows) and inflows[j_end][0] == cents:
+                _, in_day, in_position = inflows[j_end]
+                waiting.setdefault(transactions[in_position].account, deque()).append((in_day, in_position))
+                j_end += 1
+            for _, out_day, out_position in outflows[i:i_end]:
+                account = transactions[out_position].account
+                best = None
+                for in_account, queue in waiting.items():
+                    # Later outflows never reach inflows that are already too early for this one
+                    while queue and queue[0][0] < out_day - window_days:
+                        queue.popleft()
+                    if in_account != account and queue and queue[0][0] <= out_day + window_days \
+                            and (best is None or queue[0] < waiting[best][0]):
+                        best = in_account
+                if best is not None:
+                    pairs.append((out_position, waiting[best].popleft()[1]))
+            i, j = i_end, j_end
+
+        for out_position, in_position in pairs:
+            transactions[out_position].is_transfer = True
+            transactions[in_position].is_transfer = True
+        return pairs
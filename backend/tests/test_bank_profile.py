@@ -0,0 +1,70 @@
+from datetime import date
+
+import pytest
+
+from services.BankProfile import CsvSchema, parse_amount, sniff_date_format
+
+
+def test_parse_amount_formats():
+    assert parse_amount("$1,234.56") == 1234.56
+    assert parse_amount("-12.00") == -12.0
+    assert parse_amount("(12.00)") == -12.0
+
+
+def test_sniff_date_format_prefers_the_format_that_parses_everything():
+    assert sniff_date_format(["2024-01-05", "2024-01-31"]) == "%Y-%m-%d"
+    assert sniff_date_format(["01/05/2024", "01/31/2024"]) == "%m/%d/%Y"
+    assert sniff_date_format(["13/01/2024", "31/01/2024"]) == "%d/%m/%Y"
+
+
+def test_sniff_date_format_tolerates_a_few_bad_values_but_not_a_wrong_guess():
+    assert sniff_date_format(["01/05/2024"] * 9 + ["Pending"]) == "%m/%d/%Y"
+    with pytest.raises(ValueError):
+        sniff_date_format(["01/05/2024", "Pending", "n/a"])
+
+
+def test_detects_a_builtin_profile_from_its_header():
+    header = ["Transaction Date", "Post Date", "Description", "Category", "Type", "Amount", "Memo"]
+    sample = [["01/05/2024", "01/06/2024", "COFFEE", "Food & Drink", "Sale", "-4.50", ""]]
+    schema = CsvSchema.detect(header, sample)
+    assert schema.profile == "chase_card"
+    assert schema.bind()(sample[0]) == (date(2024, 1, 5), "COFFEE", -4.5, "Food & Drink")
+
+
+def test_positive_charge_profiles_flip_the_sign():
+    header = ["Date", "Description", "Card Member", "Amount"]
+    sample = [["01/05/2024", "AIRLINE", "A MEMBER", "300.00"]]
+    schema = CsvSchema.detect(header, sample)
+    assert schema.profile == "amex"
+    assert schema.bind()(sample[0])[2] == -300.0
+
+
+def test_headerless_export_uses_the_first_row_as_data():
+    first = ["01/05/2024", "-20.00", "*", "", "GAS STATION"]
+    schema = CsvSchema.detect(first, [["01/06/2024", "1000.00", "*", "", "PAYROLL"]])
+    assert schema.headerless
+    assert schema.bind()(first) == (date(2024, 1, 5), "GAS STATION", -20.0, "")
+
+
+def test_generic_debit_and_credit_columns():
+    header = ["Date", "Payee", "Money Out", "Money In"]
+    sample = [["2024-01-05", "RENT", "1500.00", ""], ["2024-01-06", "PAYROLL", "", "2500.00"]]
+    parse_row = CsvSchema.detect(header, sample).bind()
+    assert parse_row(sample[0])[2] == -1500.0
+    assert parse_row(sample[1])[2] == 2500.0
+
+
+def test_a_pending_amount_does_not_discard_the_amount_column():
+    header = ["Date", "Description", "Amount"]
+    sample = [["01/%02d/2024" % day, "SHOP", "-%d.00" % day] for day in range(1, 10)]
+    sample.append(["01/10/2024", "HOLD", "Pending"])
+    schema = CsvSchema.detect(header, sample)
+    assert schema.amount_index == 2
+    parse_row = schema.bind()
+    with pytest.raises(ValueError):
+        parse_row(sample[-1])
+
+
+def test_header_without_date_or_amount_is_rejected():
+    with pytest.raises(ValueError):
+        CsvSchema.detect(["Name", "Notes"], [["a", "b"]])
@@ -0,0 +1,39 @@
+import pytest
+
+from services.Pagination import MAX_PAGE_SIZE, clamp_limit, decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip():
+    key = ["2024-01-05", "mission_goal_3"]
+    cursor = encode_cursor(key)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == key
+    assert decode_cursor(cursor, shape=(str, str)) == key
+
+
+def test_empty_cursor_means_first_page():
+    assert decode_cursor(None) is None
+    assert decode_cursor("") is None
+
+
+@pytest.mark.parametrize("cursor", ["not base64!", encode_cursor({"a": 1}), "e30"])
+def test_malformed_cursors_are_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+@pytest.mark.parametrize("key", [["2024-01-05"], ["2024-01-05", 3], [True, "x"]])
+def test_cursors_of_the_wrong_shape_are_rejected(key):
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor(key), shape=(str, str))
+
+
+def test_bool_is_not_accepted_as_an_int():
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor([True]), shape=(int,))
+
+
+def test_clamp_limit():
+    assert clamp_limit(0) == 1
+    assert clamp_limit(25) == 25
+    assert clamp_limit(MAX_PAGE_SIZE + 1) == MAX_PAGE_SIZE
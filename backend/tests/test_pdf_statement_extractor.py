@@ -0,0 +1,56 @@
+from datetime import date
+
+from services.PdfStatementExtractor import PdfPage, PdfStatementExtractor
+
+
+def _parse(text: str, statement_end: date = date(2024, 1, 31)) -> PdfPage:
+    page = PdfPage(number=0, text=text)
+    PdfStatementExtractor._parse_page(page, statement_end)
+    return page
+
+
+def test_section_headings_sign_unsigned_amounts():
+    page = _parse(
+        "Deposits and Additions\n"
+        "01/02 PAYROLL ACME CORP 2,500.00\n"
+        "Purchases\n"
+        "01/03 01/04 CAPRI PIZZA 12.50\n"
+    )
+    assert not page.needs_llm
+    assert [(r["description"], r["amount"]) for r in page.rows] == [
+        ("PAYROLL ACME CORP", 2500.0),
+        ("CAPRI PIZZA", -12.5),
+    ]
+
+
+def test_explicit_signs_win_and_running_balances_are_ignored():
+    page = _parse("01/05 REFUND STORE +20.00 1,020.00\n01/06 COFFEE (4.50) 1,015.50\n")
+    assert [r["amount"] for r in page.rows] == [20.0, -4.5]
+
+
+def test_dated_summary_lines_are_not_transactions():
+    page = _parse(
+        "Purchases\n"
+        "01/01 Beginning Balance 3,000.00\n"
+        "01/05 TOTAL WINE & MORE 30.00\n"
+        "01/31 Total Purchases 30.00\n"
+        "01/31 Ending Balance 2,970.00\n"
+    )
+    assert not page.needs_llm
+    assert [r["description"] for r in page.rows] == ["TOTAL WINE & MORE"]
+
+
+def test_december_rows_on_a_january_statement_belong_to_the_previous_year():
+    page = _parse("Purchases\n12/30 HOTEL 200.00\n01/02 TAXI 15.00\n")
+    assert [r["date"] for r in page.rows] == [date(2023, 12, 30), date(2024, 1, 2)]
+
+
+def test_unaccounted_amounts_send_the_whole_page_to_the_llm():
+    page = _parse("Purchases\n01/02 TAXI 15.00\nSomething odd $42.00 here\n")
+    assert page.needs_llm
+    assert page.rows == []
+
+
+def test_statement_end_comes_from_the_period_line():
+    text = "Statement period 12/01/2023 - 12/31/2023\n"
+    assert PdfStatementExtractor._statement_end(text) == date(2023, 12, 31)
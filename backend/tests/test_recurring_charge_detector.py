@@ -0,0 +1,58 @@
+from datetime import date, timedelta
+
+from models.Transaction import Transaction
+from services.RecurringChargeDetector import RecurringChargeDetector
+
+
+def _charges(description: str, amounts, start: date, every_days: int):
+    return [
+        Transaction(date=start + timedelta(days=i * every_days), description=description,
+                    amount=-amount, category="Shopping")
+        for i, amount in enumerate(amounts)
+    ]
+
+
+def test_normalize_merchant_strips_processor_prefixes_and_codes():
+    assert RecurringChargeDetector.normalize_merchant("SQ *BLUE BOTTLE #1234 OAKLAND") == "blue bottle oakland"
+    assert RecurringChargeDetector.normalize_merchant("POS DEBIT CARD PURCHASE NETFLIX.COM") == "netflix"
+
+
+def test_monthly_charge_with_a_stable_amount_is_a_subscription():
+    transactions = _charges("NETFLIX.COM 866-579-7172", [15.49] * 6, date(2024, 1, 5), 30)
+    subscriptions, repeat_purchases = RecurringChargeDetector.detect(transactions)
+    assert repeat_purchases == []
+    assert len(subscriptions) == 1
+    subscription = subscriptions[0]
+    assert subscription["frequency"] == "monthly"
+    assert subscription["occurrences"] == 6
+    assert subscription["amount"] == 15.49
+
+
+def test_irregular_visits_are_repeat_purchases():
+    transactions = [
+        Transaction(date=date(2024, 1, day), description="BLUE BOTTLE COFFEE", amount=-amount, category="Food")
+        for day, amount in ((2, 4.5), (3, 12.0), (9, 6.25), (20, 9.0))
+    ]
+    subscriptions, repeat_purchases = RecurringChargeDetector.detect(transactions)
+    assert subscriptions == []
+    assert len(repeat_purchases) == 1
+    assert repeat_purchases[0]["count"] == 4
+    assert repeat_purchases[0]["total"] == 31.75
+
+
+def test_fixed_plan_among_variable_purchases_is_split_out():
+    plan = _charges("COSTCO WHOLESALE", [65.0] * 4, date(2024, 1, 1), 30)
+    orders = [
+        Transaction(date=date(2024, 1, day), description="COSTCO WHOLESALE", amount=-amount, category="Shopping")
+        for day, amount in ((4, 120.0), (11, 87.3), (25, 240.1))
+    ]
+    subscriptions, repeat_purchases = RecurringChargeDetector.detect(plan + orders)
+    assert [s["amount"] for s in subscriptions] == [65.0]
+    assert [r["count"] for r in repeat_purchases] == [3]
+
+
+def test_income_is_never_recurring_spend():
+    transactions = _charges("PAYROLL", [2000.0] * 4, date(2024, 1, 1), 14)
+    for t in transactions:
+        t.amount = abs(t.amount)
+    assert RecurringChargeDetector.detect(transactions) == ([], [])
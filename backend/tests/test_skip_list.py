@@ -0,0 +1,39 @@
+import random
+
+import pytest
+
+from services.Leaderboard import SkipList
+
+
+def test_rank_and_iteration_match_sorted_order():
+    rng = random.Random(7)
+    skip_list = SkipList(seed=1)
+    keys = set()
+    for _ in range(500):
+        key = (-rng.randrange(100), -rng.randrange(5), f"user_{rng.randrange(300)}")
+        if key in keys:
+            skip_list.remove(key)
+            keys.remove(key)
+        else:
+            skip_list.insert(key)
+            keys.add(key)
+
+    ordered = sorted(keys)
+    assert len(skip_list) == len(ordered)
+    assert list(skip_list.iterate_from(0)) == ordered
+    for index in (0, 1, len(ordered) // 2, len(ordered) - 1):
+        assert skip_list.count_less(ordered[index]) == index
+        assert next(skip_list.iterate_from(index)) == ordered[index]
+
+
+def test_iterate_past_the_end_is_empty():
+    skip_list = SkipList(seed=1)
+    skip_list.insert((0, 0, "a"))
+    assert list(skip_list.iterate_from(1)) == []
+
+
+def test_remove_missing_key_raises():
+    skip_list = SkipList(seed=1)
+    skip_list.insert((-10, 0, "a"))
+    with pytest.raises(KeyError):
+        skip_list.remove((-10, 0, "b"))
@@ -0,0 +1,45 @@
+from datetime import date
+
+from models.Transaction import Transaction
+from services.TransferMatcher import TransferMatcher
+
+
+def _tx(day: int, amount: float, account: str, description: str = "transfer") -> Transaction:
+    return Transaction(date=date(2024, 3, day), description=description, amount=amount,
+                       category="Transfer", account=account)
+
+
+def test_pairs_equal_amounts_across_accounts_within_the_window():
+    transactions = [
+        _tx(1, -200.0, "checking"),
+        _tx(2, 200.0, "savings"),
+        _tx(5, -50.0, "checking", "groceries"),
+    ]
+    assert TransferMatcher.match(transactions, window_days=3) == [(0, 1)]
+    assert [t.is_transfer for t in transactions] == [True, True, False]
+
+
+def test_same_account_refund_is_not_a_transfer():
+    transactions = [_tx(1, -40.0, "checking", "store"), _tx(3, 40.0, "checking", "store refund")]
+    assert TransferMatcher.match(transactions) == []
+    assert not any(t.is_transfer for t in transactions)
+
+
+def test_inflow_outside_the_window_is_not_matched():
+    transactions = [_tx(1, -200.0, "checking"), _tx(10, 200.0, "savings")]
+    assert TransferMatcher.match(transactions, window_days=3) == []
+
+
+def test_each_outflow_takes_the_earliest_inflow_once():
+    transactions = [
+        _tx(1, -100.0, "checking"),
+        _tx(2, -100.0, "checking"),
+        _tx(2, 100.0, "savings"),
+        _tx(3, 100.0, "card"),
+    ]
+    assert TransferMatcher.match(transactions, window_days=3) == [(0, 2), (1, 3)]
+
+
+def test_transactions_without_an_account_are_ignored():
+    transactions = [_tx(1, -200.0, None), _tx(1, 200.0, "savings")]
+    assert TransferMatcher.match(transactions) == []
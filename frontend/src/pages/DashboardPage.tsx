@@ -28,14 +28,11 @@ export function DashboardPage() {
 
     const fetchDashboard = async () => {
       try {
-        // Fetch goals from the goals endpoint (same as GoalsPage)
-        const goalsData = await api.getGoals(userId);
-        setGoals(goalsData.goals || []);
-        
-        // Fetch other dashboard data
-        const data = await api.getDashboard(userId);
-        setMissions(data.missions || []);
-        setStreak(data.streak || null);
+        // Goals (same as GoalsPage) and the rest of the dashboard in one request
+        const data = await api.getBootstrap(userId, ["goals", "dashboard"]);
+        setGoals(data.goals?.goals || []);
+        setMissions(data.dashboard?.missions || []);
+        setStreak(data.dashboard?.streak || null);
       } catch (err) {
         console.error("Failed to fetch dashboard:", err);
       } finally {
@@ -7,6 +7,8 @@ import type {
   UserStreak,
 } from "../types";
 
+export type BootstrapSection = "dashboard" | "goals" | "budget" | "credit" | "missions";
+
 const API_BASE_URL = import.meta.env.VITE_API_URL || "http://localhost:8000";
 
 class ApiService {
@@ -238,6 +240,21 @@ class ApiService {
     return this.request(`/api/dashboard/${userId}`);
   }
 
+  // Get everything the app shows on startup in one request; include limits the sections
+  async getBootstrap(
+    userId: string,
+    include?: BootstrapSection[]
+  ): Promise<{
+    dashboard?: Awaited<ReturnType<ApiService["getDashboard"]>>;
+    goals?: Awaited<ReturnType<ApiService["getGoals"]>>;
+    budget?: Awaited<ReturnType<ApiService["getBudgetData"]>>;
+    credit?: Awaited<ReturnType<ApiService["getCreditConversation"]>>;
+    missions?: Awaited<ReturnType<ApiService["getMissions"]>>;
+  }> {
+    const query = include && include.length ? `?include=${include.join(",")}` : "";
+    return this.request(`/api/bootstrap/${userId}${query}`);
+  }
+
   // Health Check
   async healthCheck(): Promise<{ status: string; timestamp: string }> {
     return this.request("/health");
@@ -262,3 +279,6 @@ export const creditChat = (userId: string, message?: string) =>
 
 export const finalizeCreditStack = (userId: string) =>
   api.finalizeCreditStack(userId);
+
+export const getBootstrap = (userId: string, include?: BootstrapSection[]) =>
+  api.getBootstrap(userId, include);